@@ -1,120 +1,50 @@
 import tkinter as tk
 from tkinter import messagebox
+import os
+import tempfile
 import time
-import sys
-
-operations = 0  # counts recursive calls and validation checks
-max_recursion_depth = 0  # tracks the maximum recursion depth
-current_recursion_depth = 0 # tracks current depth
-
-def initialize_possibilities_bitmask(grid):
-    # initialize possibilities with bitmasking
-    possibilities = {}
-    for row in range(9):
-        for col in range(9):
-            if grid[row][col] == 0:
-                possibilities[(row, col)] = (1 << 9) - 1
-            else:
-                possibilities[(row, col)] = 0
-    return possibilities
-
-def update_possibilities_bitmask(possibilities, row, col, num, action="remove"):
-    # update possibilities with bitmasking
-    mask = ~(1 << (num - 1)) # mask to translate number to bitmask
-    start_row, start_col = 3 * (row // 3), 3 * (col // 3)
-
-    for x in range(9):
-        if action == "remove":
-            possibilities[(row, x)] &= mask # remove from row
-            possibilities[(x, col)] &= mask # remove from column
-        elif action == "restore":
-            possibilities[(row, x)] |= (1 << (num - 1)) # restore to row
-            possibilities[(x, col)] |= (1 << (num - 1)) # restore to column
-
-    for i in range(start_row, start_row + 3):
-        for j in range(start_col, start_col + 3):
-            if action == "remove":
-                possibilities[(i, j)] &= mask # remove from subgrid
-            elif action == "restore":
-                possibilities[(i, j)] |= (1 << (num - 1))  # restore to subgrid
-
-def is_valid_with_bitmask(row_mask, col_mask, subgrid_mask, row, col, num):
-    # check if placing number is valid
-    global operations
-    operations += 1  # Count as one validity check operation (worst-case operation)
-    subgrid_idx = (row // 3) * 3 + (col // 3)
-    mask = 1 << (num - 1)
-    return (row_mask[row] & mask) and (col_mask[col] & mask) and (subgrid_mask[subgrid_idx] & mask)
-
-def solve_sudoku_recursive_with_bitmask(grid):
-    # main solving function
-    global operations, current_recursion_depth, max_recursion_depth
-
-    row_mask = [0b111111111 for _ in range(9)]
-    col_mask = [0b111111111 for _ in range(9)]
-    subgrid_mask = [0b111111111 for _ in range(9)]
-
-    def place_number_with_bitmask(row, col, num):
-        subgrid_idx = (row // 3) * 3 + (col // 3)
-        mask = 1 << (num - 1)
-        row_mask[row] &= ~mask
-        col_mask[col] &= ~mask
-        subgrid_mask[subgrid_idx] &= ~mask
-        grid[row][col] = num
-
-    def remove_number_with_bitmask(row, col, num):
-        subgrid_idx = (row // 3) * 3 + (col // 3)
-        mask = 1 << (num - 1)
-        row_mask[row] |= mask
-        col_mask[col] |= mask
-        subgrid_mask[subgrid_idx] |= mask
-        grid[row][col] = 0
-
-    def backtrack():
-        # recursive backtracking
-        global operations, current_recursion_depth, max_recursion_depth
-
-        current_recursion_depth += 1
-        max_recursion_depth = max(max_recursion_depth, current_recursion_depth)
-
-        # find next empty cell
-        for row in range(9):
-            for col in range(9):
-                if grid[row][col] == 0:
-                    for num in range(1, 10):
-                        operations += 1  #count each backtracking attempt (worst-case operation)
-                        if is_valid_with_bitmask(row_mask, col_mask, subgrid_mask, row, col, num):
-                            place_number_with_bitmask(row, col, num)
-                            if backtrack():
-                                return True
-                            remove_number_with_bitmask(row, col, num)
-
-                    current_recursion_depth -= 1
-                    return False
-
-        current_recursion_depth -= 1
-        return True
-
-    # initialize bitmasks based on the given grid
-    for row in range(9):
-        for col in range(9):
-            if grid[row][col] != 0:
-                num = grid[row][col]
-                place_number_with_bitmask(row, col, num)
-
-    # reset tracking variables
-    current_recursion_depth = 0
-    max_recursion_depth = 0
-
-    solved = backtrack()
-    return solved, row_mask, col_mask, subgrid_mask
+
+from sudoku_solver import count_solutions, has_duplicates
+from sudoku_solver.background import BackgroundSolve
+from sudoku_solver.cache import SolveCache
+from sudoku_solver.hints import next_placement
+from sudoku_solver.session import CONFLICT, Session
+from sudoku_solver.trace import BACKTRACK, PLACE, TraceReader, record_trace
+from sudoku_solver.validation import unit_name
+
+# puzzles solved before, also under any symmetry, are answered from here
+solve_cache = SolveCache()
+solve_job = None  # the BackgroundSolve while a solve is running
+last_puzzle = None  # clues of the last solved puzzle, for replay
+replay_reader = None  # the TraceReader while a replay is running
+replay_path = None  # and the trace file it reads, deleted when the replay ends
+session = Session()  # the clues typed so far, checked after every edit
+
+POLL_INTERVAL_MS = 100  # how often the window checks on a running solve
+REPLAY_INTERVAL_MS = 30  # delay between replay frames
+REPLAY_FRAMES = 300  # long traces show several steps per frame to end in about this many
+CHECK_NODES = 2000  # search budget of the check after each edit
+CHECK_SECONDS = 0.05  # and its time limit, so typing never stalls
+
+
+def solve_and_check(grid, measure_memory, status, progress=None):
+    # runs on the worker thread: solve, then check that the solution is
+    # unique unless the checks while typing already found out (status).
+    # tracemalloc slows the solve down several times, so it only runs when
+    # the user asks for the peak memory
+    result = solve_cache.solve(grid, method="propagation", progress=progress,  # propagate, then branch with bitmasks
+                               measure_memory=measure_memory)
+    if status not in ("unique", "multiple"):
+        status = count_solutions(grid, progress=progress).status  # 17+ clues do not guarantee a unique solution
+    return result, result.solved and status == "unique"
 
 
 def solve_sudoku_gui():
     # solve and update GUI
-    global operations
-    operations = 0
-
+    global solve_job
+    if solve_job is not None:
+        return  # already solving
+    stop_replay()
     # read the grid from the GUI
     grid_copy = []
     original_grid = []
@@ -153,7 +83,7 @@ def solve_sudoku_gui():
     if filled_cells < 17:
         messagebox.showerror(
             "Insufficient Clues",
-            "The puzzle must have at least 17 clues to guarantee a unique solution."
+            "The puzzle must have at least 17 clues. No puzzle with fewer has a unique solution."
         )
         return
 
@@ -165,38 +95,239 @@ def solve_sudoku_gui():
         )
         return
 
-    # start the solving process
-    start_time = time.time()
-    solved, row_mask, col_mask, subgrid_mask = solve_sudoku_recursive_with_bitmask(grid_copy)  # Use the recursive bitmasking solver
-    end_time = time.time()
+    # solve on a worker thread so the window stays responsive and can cancel
+    status = session.status if session.grid() == grid_copy else None
+    solve_job = BackgroundSolve(solve_and_check, grid_copy, measure_memory.get(), status).start()
+    solve_button.config(state="disabled")
+    cancel_button.config(state="normal")
+    root.after(POLL_INTERVAL_MS, poll_solve, original_grid, filled_cells)
+
+
+def poll_solve(original_grid, filled_cells):
+    # show live progress until the worker finishes, then show the result
+    global solve_job
+    job = solve_job
+    if not job.done():
+        stats_label.config(
+            text=(
+                f"Solving...\n"
+                f"Operations: {job.operations}\n"
+                f"Nodes/sec: {job.nodes_per_second():.0f}\n"
+                f"Current Depth: {job.depth}\n"
+                f"Elapsed: {job.elapsed():.1f} seconds"
+            )
+        )
+        root.after(POLL_INTERVAL_MS, poll_solve, original_grid, filled_cells)
+        return
+
+    solve_job = None
+    solve_button.config(state="normal")
+    cancel_button.config(state="disabled")
+    if job.cancelled:
+        stats_label.config(text=f"Solve cancelled after {job.operations} operations.")
+        return
+    if job.error is not None:
+        messagebox.showerror("Error", f"The solver failed: {job.error}")
+        return
 
-    if solved:
+    global last_puzzle
+    result, unique = job.result
+    if result.solved:
+        last_puzzle = original_grid
+        replay_button.config(state="normal")
         # update the GUI with the solved grid
         for i in range(9):
             for j in range(9):
                 entries[i][j].config(state="normal")
                 entries[i][j].delete(0, tk.END)
-                entries[i][j].insert(0, str(grid_copy[i][j]))
+                entries[i][j].insert(0, str(result.grid[i][j]))
                 entries[i][j].config(state="readonly")
 
         # highlight the original cells in a different color
         highlight_original_cells(entries, original_grid)
 
         # display solving statistics
-        time_taken = end_time - start_time
-        space_complexity = (
-                sys.getsizeof(grid_copy) +
-                sys.getsizeof(row_mask) +
-                sys.getsizeof(col_mask) +
-                sys.getsizeof(subgrid_mask)
-        )
-        display_statistics(operations, time_taken, filled_cells, 81 - filled_cells, space_complexity)
+        display_statistics(result.metrics, filled_cells, 81 - filled_cells, unique)
     else:
         messagebox.showerror("No Solution", "This puzzle has no valid solution!")
 
 
+def record_replay(grid, path, progress=None):
+    # runs on the worker thread: solve grid again while recording a trace
+    # to path, then count the placements and backtracks the replay shows.
+    # the trace file is deleted if the recording fails or is cancelled
+    try:
+        record_trace(grid, path, progress=progress)
+        with TraceReader(path) as reader:
+            return sum(1 for kind, _, _, _ in reader if kind in (PLACE, BACKTRACK))
+    except BaseException:
+        os.remove(path)
+        raise
+
+
+def replay_solve():
+    # record a trace of the last puzzle on a worker thread, then play its
+    # placements and backtracks back on the board
+    global solve_job
+    if last_puzzle is None or solve_job is not None:
+        return
+    stop_replay()
+    handle, path = tempfile.mkstemp(suffix=".trace")
+    os.close(handle)
+    solve_job = BackgroundSolve(record_replay, last_puzzle, path).start()
+    solve_button.config(state="disabled")
+    replay_button.config(state="disabled")
+    cancel_button.config(state="normal")
+    root.after(POLL_INTERVAL_MS, poll_replay, path)
+
+
+def poll_replay(path):
+    # show live progress until the trace is recorded, then start the replay
+    global solve_job, replay_reader, replay_path
+    job = solve_job
+    if not job.done():
+        stats_label.config(text=f"Recording the solve...\nOperations: {job.operations}")
+        root.after(POLL_INTERVAL_MS, poll_replay, path)
+        return
+
+    solve_job = None
+    solve_button.config(state="normal")
+    replay_button.config(state="normal")
+    cancel_button.config(state="disabled")
+    if job.cancelled:
+        stats_label.config(text=f"Replay cancelled after {job.operations} operations.")
+        return
+    if job.error is not None:
+        messagebox.showerror("Error", f"The replay failed: {job.error}")
+        return
+
+    replay_reader, replay_path = TraceReader(path), path
+    for i in range(9):
+        for j in range(9):
+            if last_puzzle[i][j] == 0:
+                entries[i][j].config(state="normal")
+                entries[i][j].delete(0, tk.END)
+                entries[i][j].config(state="readonly")
+    root.after(REPLAY_INTERVAL_MS, replay_step, replay_reader, 0, max(1, job.result // REPLAY_FRAMES))
+
+
+def replay_step(reader, index, steps):
+    # show the next steps placements and backtracks of the trace
+    if reader is not replay_reader:
+        return  # stopped, or replaced by a newer replay
+    shown = 0
+    while index < len(reader) and shown < steps:
+        kind, digit, cell, _ = reader[index]
+        index += 1
+        if kind in (PLACE, BACKTRACK):
+            entry = entries[cell // 9][cell % 9]
+            entry.config(state="normal")
+            entry.delete(0, tk.END)
+            if kind == PLACE:
+                entry.insert(0, str(digit))
+            entry.config(state="readonly")
+            shown += 1
+    stats_label.config(text=f"Replaying: event {index} of {len(reader)}")
+    if index < len(reader):
+        root.after(REPLAY_INTERVAL_MS, replay_step, reader, index, steps)
+    else:
+        stop_replay()
+
+
+def stop_replay():
+    # end the running replay, if any, and delete its trace file
+    global replay_reader, replay_path
+    if replay_reader is not None:
+        replay_reader.close()
+        os.remove(replay_path)
+        replay_reader = replay_path = None
+
+
+def close_window():
+    # stop the worker and delete the trace of a running replay before the
+    # window goes away, as their callbacks will never run again
+    if solve_job is not None:
+        solve_job.cancel()
+    stop_replay()
+    root.destroy()
+
+
+def cancel_solve():
+    # stop the running solve; poll_solve() resets the buttons
+    if solve_job is not None:
+        solve_job.cancel()
+
+
+def cell_edited(row, col):
+    # keep the session in step with the one edited cell and show whether
+    # the clues are still consistent and solvable
+    entry = entries[row][col]
+    if solve_job is not None or entry.cget("state") == "readonly":
+        return  # the board shows a solution or a replay, not the user's clues
+    reset_highlights()
+    text = entry.get().strip()
+    session.set(row, col, int(text) if len(text) == 1 and text in "123456789" else 0)
+    status = session.check(max_nodes=CHECK_NODES, deadline=time.monotonic() + CHECK_SECONDS)
+    if status == CONFLICT:
+        message = f"Conflict: {unit_name(session.conflict())} repeats a number."
+    elif status == "none":
+        cell = session.blocked_cell()
+        if cell is None:
+            message = "No solution: these clues cannot be completed."
+        else:
+            message = f"No solution: row {cell // 9 + 1}, column {cell % 9 + 1} has no possible number left."
+    elif status == "unique":
+        message = "Unique solution."
+    elif status == "multiple":
+        message = "Several solutions so far, add more clues."
+    else:
+        message = "No conflicts so far (too many possibilities to check while typing)."
+    stats_label.config(text=f"Clues: {session.clues()}\n{message}")
+
+
+def show_hint():
+    # fill in one cell by the easiest deduction the clues allow and explain
+    # it, highlighting the cells it rests on
+    if solve_job is not None or entries[0][0].cget("state") == "readonly":
+        return  # nothing to hint while solving or once the board is solved
+    stop_replay()
+    reset_highlights()
+    if not session.consistent:
+        stats_label.config(text="Fix the conflicting numbers before asking for a hint.")
+        return
+    hints = next_placement(session.grid())
+    if not hints:
+        stats_label.config(text="No hint: this position needs a guess, or a technique beyond an X-Wing.")
+        return
+    for hint in hints:
+        for row, col in hint.cells:
+            entries[row][col].config(bg="#FFF2A8")  # yellow for the reasons
+    last = hints[-1]
+    if last.placements:
+        row, col, digit = last.placements[0]
+        entries[row][col].delete(0, tk.END)
+        entries[row][col].insert(0, str(digit))
+        entries[row][col].config(bg="#C8F7C5")  # green for the hinted cell
+        session.set(row, col, digit)
+    stats_label.config(text="\n".join(hint.explanation for hint in hints))
+
+
+def reset_highlights():
+    # back to white after a hint
+    for i in range(9):
+        for j in range(9):
+            if entries[i][j].cget("state") != "readonly":
+                entries[i][j].config(bg="white")
+
+
 def clear_board():
     # clear board reset stats
+    global last_puzzle, session
+    cancel_solve()
+    stop_replay()
+    last_puzzle = None
+    session = Session()
+    replay_button.config(state="disabled")
     for i in range(9):
         for j in range(9):
             entries[i][j].config(state="normal")
@@ -246,47 +377,27 @@ def navigate(event):
 
     entries[next_row][next_col].focus_set()
 
-def has_duplicates(grid):
-    # check rows and columns for duplicates
-    for i in range(9):
-        row_seen = set()
-        col_seen = set()
-        for j in range(9):
-            # check for duplicates in the row
-            if grid[i][j] != 0:
-                if grid[i][j] in row_seen:
-                    return True
-                row_seen.add(grid[i][j])
-            # check for duplicates in the column
-            if grid[j][i] != 0:
-                if grid[j][i] in col_seen:
-                    return True
-                col_seen.add(grid[j][i])
-
-    # check subgrids for duplicates
-    for start_row in range(0, 9, 3):
-        for start_col in range(0, 9, 3):
-            subgrid_seen = set()
-            for i in range(start_row, start_row + 3):
-                for j in range(start_col, start_col + 3):
-                    if grid[i][j] != 0:
-                        if grid[i][j] in subgrid_seen:
-                            return True
-                        subgrid_seen.add(grid[i][j])
-
-    return False
-
-def display_statistics(operations, time_taken, hints, empty_cells, space_complexity):
+def display_statistics(metrics, hints, empty_cells, unique=True):
     # display solving statistics
-    stats_label.config(
-        text=(
-            f"Operations: {operations}\n"
-            f"Time Taken: {time_taken:.6f} seconds\n"
-            f"Number of Hints: {hints}\n"
-            f"Empty Cells: {empty_cells}\n"
-            f"Space Complexity: {space_complexity} bytes"
-        )
+    if metrics.method == "cache":
+        peak_memory = "not measured (answered from the cache)"
+    elif metrics.peak_memory is None:
+        peak_memory = "not measured (tick Measure Memory)"
+    else:
+        peak_memory = f"{metrics.peak_memory} bytes"
+    text = (
+        f"Guesses: {metrics.nodes}\n"
+        f"Backtracks: {metrics.backtracks}\n"
+        f"Time Taken: {metrics.time_taken:.6f} seconds\n"
+        f"Number of Hints: {hints}\n"
+        f"Empty Cells: {empty_cells}\n"
+        f"Peak Memory: {peak_memory}\n"
+        f"Unique Solution: {'Yes' if unique else 'No, showing one of several'}"
     )
+    # deductions made by each propagation rule
+    for rule, count in metrics.propagations.items():
+        text += f"\n{rule.replace('_', ' ').title()}: {count}"
+    stats_label.config(text=text)
 
 def highlight_original_cells(entries, original_grid):
     # highlight solved cells for clarity
@@ -299,96 +410,141 @@ def highlight_original_cells(entries, original_grid):
                 entries[i][j].config(bg="#DFF2FF")  # light blue for solved cells
                 entries[i][j].config(readonlybackground="#DFF2FF")
 
-# GUI setup
-root = tk.Tk()
-root.title("Sudoku Solver")
-root.geometry("650x760")
-root.resizable(False, False)
-
-title_label = tk.Label(
-    root,
-    text="Sudoku Solver",
-    font=("Helvetica", 18, "bold"),
-    bg="#FFDEE9",
-    pady=10
-)
-title_label.pack(fill="x")
-
-main_frame = tk.Frame(
-    root,
-    bg="#FFF3D4",
-    padx=4,
-    pady=4,
-    relief="raised",
-    bd=2
-)
-main_frame.pack(padx=10, pady=10)
-
-entries = [[None for _ in range(9)] for _ in range(9)]
-
-for box_i in range(3):
-    for box_j in range(3):
-        box_frame = tk.Frame(
-            main_frame,
-            bg="#FFF3D4",
-            padx=1,
-            pady=1,
-            bd=1
-        )
-        box_frame.grid(row=box_i, column=box_j, padx=1, pady=1)
-
-        for i in range(3):
-            for j in range(3):
-                global_i = box_i * 3 + i
-                global_j = box_j * 3 + j
-                entry = tk.Entry(
-                    box_frame,
-                    width=2,
-                    font=("Helvetica", 14),
-                    justify="center",
-                    bg="white"
-                )
-                entry.grid(row=i, column=j, padx=1, pady=1, ipadx=5, ipady=5)
-                entry.bind("<KeyPress>", restrict_input)
-                entry.bind("<Up>", navigate)
-                entry.bind("<Down>", navigate)
-                entry.bind("<Left>", navigate)
-                entry.bind("<Right>", navigate)
-                entries[global_i][global_j] = entry
-
-button_frame = tk.Frame(root, bg="#FFDEE9")
-button_frame.pack(pady=20)
-
-solve_button = tk.Button(
-    button_frame,
-    text="Solve",
-    font=("Helvetica", 14),
-    bg="#A5FFAA",
-    width=20,
-    command=solve_sudoku_gui
-)
-solve_button.pack(pady=5)
-
-clear_button = tk.Button(
-    button_frame,
-    text="Clear Board",
-    font=("Helvetica", 14),
-    bg="#F88379",
-    width=20,
-    command=clear_board
-)
-clear_button.pack(pady=5)
-
-stats_label = tk.Label(
-    root,
-    text="",
-    font=("Helvetica", 12),
-    bg="#FFDEE9",
-    pady=5,
-    justify="left"
-)
-stats_label.pack(fill="x")
-
-root.configure(bg="#FFDEE9")
-
-root.mainloop()
+if __name__ == "__main__":
+    # GUI setup
+    root = tk.Tk()
+    root.title("Sudoku Solver")
+    root.geometry("650x945")
+    root.resizable(False, False)
+
+    title_label = tk.Label(
+        root,
+        text="Sudoku Solver",
+        font=("Helvetica", 18, "bold"),
+        bg="#FFDEE9",
+        pady=10
+    )
+    title_label.pack(fill="x")
+
+    main_frame = tk.Frame(
+        root,
+        bg="#FFF3D4",
+        padx=4,
+        pady=4,
+        relief="raised",
+        bd=2
+    )
+    main_frame.pack(padx=10, pady=10)
+
+    entries = [[None for _ in range(9)] for _ in range(9)]
+
+    for box_i in range(3):
+        for box_j in range(3):
+            box_frame = tk.Frame(
+                main_frame,
+                bg="#FFF3D4",
+                padx=1,
+                pady=1,
+                bd=1
+            )
+            box_frame.grid(row=box_i, column=box_j, padx=1, pady=1)
+
+            for i in range(3):
+                for j in range(3):
+                    global_i = box_i * 3 + i
+                    global_j = box_j * 3 + j
+                    entry = tk.Entry(
+                        box_frame,
+                        width=2,
+                        font=("Helvetica", 14),
+                        justify="center",
+                        bg="white"
+                    )
+                    entry.grid(row=i, column=j, padx=1, pady=1, ipadx=5, ipady=5)
+                    entry.bind("<KeyPress>", restrict_input)
+                    entry.bind("<KeyRelease>", lambda event, i=global_i, j=global_j: cell_edited(i, j))
+                    entry.bind("<Up>", navigate)
+                    entry.bind("<Down>", navigate)
+                    entry.bind("<Left>", navigate)
+                    entry.bind("<Right>", navigate)
+                    entries[global_i][global_j] = entry
+
+    button_frame = tk.Frame(root, bg="#FFDEE9")
+    button_frame.pack(pady=20)
+
+    solve_button = tk.Button(
+        button_frame,
+        text="Solve",
+        font=("Helvetica", 14),
+        bg="#A5FFAA",
+        width=20,
+        command=solve_sudoku_gui
+    )
+    solve_button.pack(pady=5)
+
+    clear_button = tk.Button(
+        button_frame,
+        text="Clear Board",
+        font=("Helvetica", 14),
+        bg="#F88379",
+        width=20,
+        command=clear_board
+    )
+    clear_button.pack(pady=5)
+
+    hint_button = tk.Button(
+        button_frame,
+        text="Hint",
+        font=("Helvetica", 14),
+        bg="#B5E8FF",
+        width=20,
+        command=show_hint
+    )
+    hint_button.pack(pady=5)
+
+    cancel_button = tk.Button(
+        button_frame,
+        text="Cancel",
+        font=("Helvetica", 14),
+        bg="#FFD580",
+        width=20,
+        state="disabled",
+        command=cancel_solve
+    )
+    cancel_button.pack(pady=5)
+
+    replay_button = tk.Button(
+        button_frame,
+        text="Replay Solve",
+        font=("Helvetica", 14),
+        bg="#C9B6FF",
+        width=20,
+        state="disabled",
+        command=replay_solve
+    )
+    replay_button.pack(pady=5)
+
+    measure_memory = tk.BooleanVar(value=False)
+    memory_check = tk.Checkbutton(
+        button_frame,
+        text="Measure Memory (slower)",
+        font=("Helvetica", 12),
+        bg="#FFDEE9",
+        variable=measure_memory
+    )
+    memory_check.pack(pady=5)
+
+    stats_label = tk.Label(
+        root,
+        text="",
+        font=("Helvetica", 12),
+        bg="#FFDEE9",
+        pady=5,
+        justify="left"
+    )
+    stats_label.pack(fill="x")
+
+    root.configure(bg="#FFDEE9")
+    root.protocol("WM_DELETE_WINDOW", close_window)
+
+    root.mainloop()
@@ -1,87 +1,30 @@
 import tkinter as tk
 from tkinter import messagebox
-import time
-import sys
-
-
-def is_valid(grid, row, col, num):
-    # check if placing number is valid
-    global operations
-    for x in range(9):
-        operations += 1
-        if grid[row][x] == num or grid[x][col] == num:
-            return False
-    start_row, start_col = 3 * (row // 3), 3 * (col // 3)
-    for i in range(start_row, start_row + 3):
-        for j in range(start_col, start_col + 3):
-            operations += 1
-            if grid[i][j] == num:
-                return False
-    return True
-
-
-def has_duplicates(grid):
-    # checking for duplicates
-    for i in range(9):
-        row_seen = set()
-        col_seen = set()
-        for j in range(9):
-            if grid[i][j] != 0:
-                if grid[i][j] in row_seen:
-                    return True
-                row_seen.add(grid[i][j])
-            if grid[j][i] != 0:
-                if grid[j][i] in col_seen:
-                    return True
-                col_seen.add(grid[j][i])
-    for start_row in range(0, 9, 3):
-        for start_col in range(0, 9, 3):
-            subgrid_seen = set()
-            for i in range(start_row, start_row + 3):
-                for j in range(start_col, start_col + 3):
-                    if grid[i][j] != 0:
-                        if grid[i][j] in subgrid_seen:
-                            return True
-                        subgrid_seen.add(grid[i][j])
-    return False
-
-
-operations = 0  # counts recursive calls and validation checks
-max_recursion_depth = 0  # tracks the maximum recursion depth
-current_recursion_depth = 0
-
-def solve_sudoku(grid):
-    # recursive solver
-    global operations, max_recursion_depth, current_recursion_depth
-
-    current_recursion_depth += 1
-    max_recursion_depth = max(max_recursion_depth, current_recursion_depth)
-
-    for row in range(9):
-        for col in range(9):
-            if grid[row][col] == 0:  # find empty cell
-                for num in range(1, 10):  # try numbers 1-9
-                    if is_valid(grid, row, col, num):  # check if valid
-                        grid[row][col] = num
-                        operations += 1  # count operation
-                        if solve_sudoku(grid):  # recursive call
-                            current_recursion_depth -= 1
-                            return True
-                        grid[row][col] = 0  # backtracking
-                current_recursion_depth -= 1
-                return False  # if no solution
-    current_recursion_depth -= 1
-    return True
 
-def solve_sudoku_gui():
-    # solve sudoku and update GUI
-    global operations, max_recursion_depth, current_recursion_depth
+from sudoku_solver import Metrics, has_duplicates
+from sudoku_solver.background import BackgroundSolve
+from sudoku_solver.backtracking import solve_backtracking
+
+last_metrics = None  # counters of the last solve
+solve_job = None  # the BackgroundSolve while a solve is running
+
+POLL_INTERVAL_MS = 100  # how often the window checks on a running solve
+
+
+def solve_sudoku(grid, progress=None):
+    # solve grid in place with the plain backtracking engine and keep its stats
+    global last_metrics
+    metrics = Metrics(method="backtracking")
+    solved = solve_backtracking(grid, progress, metrics)[0]
+    last_metrics = metrics
+    return solved
 
-    # reset counters
-    operations = 0
-    max_recursion_depth = 0
-    current_recursion_depth = 0
 
+def solve_sudoku_gui():
+    # solve sudoku and update GUI
+    global solve_job
+    if solve_job is not None:
+        return  # already solving
     # read the user-filled grid
     grid_copy = []
     filled_cells = 0
@@ -116,11 +59,38 @@ def solve_sudoku_gui():
         messagebox.showerror("Error", "The grid contains duplicates and cannot be solved.")
         return
 
-    # start the solving process
-    start_time = time.time()
-    if solve_sudoku(grid_copy):  # solve using backtracking
-        end_time = time.time()
+    # solve on a worker thread so the window stays responsive and can cancel
+    solve_job = BackgroundSolve(solve_sudoku, grid_copy).start()
+    solve_button.config(state="disabled")
+    cancel_button.config(state="normal")
+    root.after(POLL_INTERVAL_MS, poll_solve, grid_copy, filled_cells)
+
+
+def poll_solve(grid_copy, filled_cells):
+    # show live progress until the worker finishes, then show the result
+    global solve_job
+    job = solve_job
+    if not job.done():
+        stats_label.config(
+            text=(
+                f"Solving...\n"
+                f"Operations: {job.operations}\n"
+                f"Nodes/sec: {job.nodes_per_second():.0f}\n"
+                f"Current Depth: {job.depth}\n"
+                f"Elapsed: {job.elapsed():.1f} seconds"
+            )
+        )
+        root.after(POLL_INTERVAL_MS, poll_solve, grid_copy, filled_cells)
+        return
 
+    solve_job = None
+    solve_button.config(state="normal")
+    cancel_button.config(state="disabled")
+    if job.cancelled:
+        stats_label.config(text=f"Solve cancelled after {job.operations} operations.")
+    elif job.error is not None:
+        messagebox.showerror("Error", f"The solver failed: {job.error}")
+    elif job.result:
         # update the GUI with the solved grid
         for i in range(9):
             for j in range(9):
@@ -129,31 +99,36 @@ def solve_sudoku_gui():
                 entries[i][j].insert(0, str(grid_copy[i][j]))
                 entries[i][j].config(state="disabled", bg="#DFF2FF")
 
-        # calculate statistics
-        time_taken = end_time - start_time
-        space_complexity = sys.getsizeof(grid_copy) + max_recursion_depth * sys.getsizeof(grid_copy[0])
-
         # display statistics
-        display_statistics(operations, time_taken, filled_cells, 81 - filled_cells, space_complexity)
+        display_statistics(last_metrics, job.time_taken, filled_cells, 81 - filled_cells)
     else:
         messagebox.showerror("Error", "No solution exists for this puzzle!")
 
 
-def display_statistics(operations, time_taken, hints, empty_cells, space_complexity):
+def cancel_solve():
+    # stop the running solve; poll_solve() resets the buttons
+    if solve_job is not None:
+        solve_job.cancel()
+
+
+def display_statistics(metrics, time_taken, hints, empty_cells):
     # display statistics such as num operations, time taken, etc.
     stats_label.config(
         text=(
-            f"Operations: {operations}\n"
+            f"Placements: {metrics.nodes}\n"
+            f"Validity Checks: {metrics.checks}\n"
+            f"Backtracks: {metrics.backtracks}\n"
             f"Time Taken: {time_taken:.6f} seconds\n"
             f"Number of Hints: {hints}\n"
             f"Empty Cells: {empty_cells}\n"
-            f"Space Complexity: {space_complexity} bytes"
+            f"Max Recursion Depth: {metrics.max_depth}"
         )
     )
 
 
 def clear_board():
     # clear the board
+    cancel_solve()
     for i in range(9):
         for j in range(9):
             entries[i][j].config(state="normal")
@@ -186,62 +161,74 @@ def navigate(event):
         current_col = (current_col + 1) % 9
     entries[current_row][current_col].focus_set()
 
-# GUI setup
-root = tk.Tk()
-root.title("Sudoku Solver")
-root.geometry("650x760")
-root.resizable(False, False)
-
-title_label = tk.Label(root, text="Sudoku Solver", font=("Helvetica", 18, "bold"), bg="#FFDEE9", pady=10)
-title_label.pack(fill="x")
-
-frame = tk.Frame(root)
-frame.pack()
-
-entries = [[None for _ in range(9)] for _ in range(9)]
-for i in range(9):
-    for j in range(9):
-        entry = tk.Entry(frame, width=2, font=("Helvetica", 14), justify="center", bg="white")
-        entry.grid(row=i, column=j, padx=5, pady=5, ipadx=5, ipady=5)
-        entry.bind("<KeyRelease>", restrict_input)
-        entries[i][j] = entry
-
-button_frame = tk.Frame(root, bg="#FFDEE9")
-button_frame.pack(pady=20)
-
-solve_button = tk.Button(
-    button_frame,
-    text="Solve",
-    font=("Helvetica", 14),
-    bg="#A5FFAA",
-    width=20,
-    command=solve_sudoku_gui,
-)
-solve_button.pack(pady=5)
-
-clear_button = tk.Button(
-    button_frame,
-    text="Clear Board",
-    font=("Helvetica", 14),
-    bg="#FFD580",
-    width=20,
-    command=clear_board,
-)
-clear_button.pack(pady=5)
-
-stats_label = tk.Label(
-    root, text="", font=("Helvetica", 12), bg="#FFDEE9", pady=5, justify="left"
-)
-stats_label.pack(fill="x")
-
-root.configure(bg="#FFDEE9")
-frame.configure(bg="#FFDEE9")
-
-current_row, current_col = 0, 0
-entries[current_row][current_col].focus_set()
-root.bind("<Up>", navigate)
-root.bind("<Down>", navigate)
-root.bind("<Left>", navigate)
-root.bind("<Right>", navigate)
-
-root.mainloop()
+if __name__ == "__main__":
+    # GUI setup
+    root = tk.Tk()
+    root.title("Sudoku Solver")
+    root.geometry("650x810")
+    root.resizable(False, False)
+
+    title_label = tk.Label(root, text="Sudoku Solver", font=("Helvetica", 18, "bold"), bg="#FFDEE9", pady=10)
+    title_label.pack(fill="x")
+
+    frame = tk.Frame(root)
+    frame.pack()
+
+    entries = [[None for _ in range(9)] for _ in range(9)]
+    for i in range(9):
+        for j in range(9):
+            entry = tk.Entry(frame, width=2, font=("Helvetica", 14), justify="center", bg="white")
+            entry.grid(row=i, column=j, padx=5, pady=5, ipadx=5, ipady=5)
+            entry.bind("<KeyRelease>", restrict_input)
+            entries[i][j] = entry
+
+    button_frame = tk.Frame(root, bg="#FFDEE9")
+    button_frame.pack(pady=20)
+
+    solve_button = tk.Button(
+        button_frame,
+        text="Solve",
+        font=("Helvetica", 14),
+        bg="#A5FFAA",
+        width=20,
+        command=solve_sudoku_gui,
+    )
+    solve_button.pack(pady=5)
+
+    clear_button = tk.Button(
+        button_frame,
+        text="Clear Board",
+        font=("Helvetica", 14),
+        bg="#FFD580",
+        width=20,
+        command=clear_board,
+    )
+    clear_button.pack(pady=5)
+
+    cancel_button = tk.Button(
+        button_frame,
+        text="Cancel",
+        font=("Helvetica", 14),
+        bg="#FF9AA2",
+        width=20,
+        state="disabled",
+        command=cancel_solve,
+    )
+    cancel_button.pack(pady=5)
+
+    stats_label = tk.Label(
+        root, text="", font=("Helvetica", 12), bg="#FFDEE9", pady=5, justify="left"
+    )
+    stats_label.pack(fill="x")
+
+    root.configure(bg="#FFDEE9")
+    frame.configure(bg="#FFDEE9")
+
+    current_row, current_col = 0, 0
+    entries[current_row][current_col].focus_set()
+    root.bind("<Up>", navigate)
+    root.bind("<Down>", navigate)
+    root.bind("<Left>", navigate)
+    root.bind("<Right>", navigate)
+
+    root.mainloop()
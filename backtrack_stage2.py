@@ -1,134 +1,30 @@
 import tkinter as tk
 from tkinter import messagebox
-import random
-import time
-import sys
-
-
-def is_valid(grid, row, col, num):
-    # check if placing number is valid
-    global operations
-    for x in range(9):
-        operations += 1
-        if grid[row][x] == num or grid[x][col] == num:
-            return False
-    start_row, start_col = 3 * (row // 3), 3 * (col // 3)
-    for i in range(start_row, start_row + 3):
-        for j in range(start_col, start_col + 3):
-            operations += 1
-            if grid[i][j] == num:
-                return False
-    return True
-
-
-def has_duplicates(grid):
-    # checking for duplicates in rows, columns, subgrids
-    for i in range(9):
-        row_seen = set()
-        col_seen = set()
-        for j in range(9):
-            if grid[i][j] != 0:
-                if grid[i][j] in row_seen:
-                    return True
-                row_seen.add(grid[i][j])
-            if grid[j][i] != 0:
-                if grid[j][i] in col_seen:
-                    return True
-                col_seen.add(grid[j][i])
-    for start_row in range(0, 9, 3):
-        for start_col in range(0, 9, 3):
-            subgrid_seen = set()
-            for i in range(start_row, start_row + 3):
-                for j in range(start_col, start_col + 3):
-                    if grid[i][j] != 0:
-                        if grid[i][j] in subgrid_seen:
-                            return True
-                        subgrid_seen.add(grid[i][j])
-    return False
-
-
-operations = 0  # counts recursive calls and validation checks
-max_recursion_depth = 0  # tracks the maximum recursion depth
-current_recursion_depth = 0 # tracks current depth
-
-def initialize_possibilities(grid):
-    # initialize possibilities for each cell based on rules
-    possibilities = {}
-    for row in range(9):
-        for col in range(9):
-            if grid[row][col] == 0:
-                possibilities[(row, col)] = {num for num in range(1, 10) if is_valid(grid, row, col, num)}
-            else:
-                possibilities[(row, col)] = set()  # filled cells have no possibilities
-    return possibilities
-
-
-def update_possibilities(grid, possibilities, row, col, num):
-    # update possibilities
-    for x in range(9):
-        possibilities.get((row, x), set()).discard(num)  # row
-        possibilities.get((x, col), set()).discard(num)  # column
-
-    start_row, start_col = 3 * (row // 3), 3 * (col // 3)
-    for i in range(start_row, start_row + 3):
-        for j in range(start_col, start_col + 3):
-            possibilities.get((i, j), set()).discard(num)
-
 
-def solve_sudoku(grid):
-    """Solve the Sudoku puzzle using optimized backtracking with constraint propagation."""
-    global operations, max_recursion_depth, current_recursion_depth
-    possibilities = initialize_possibilities(grid)
+from sudoku_solver import Metrics, has_duplicates
+from sudoku_solver.background import BackgroundSolve
+from sudoku_solver.mrv import solve_mrv
 
-    def backtrack(possibilities):
-        global operations, max_recursion_depth, current_recursion_depth
-        # increment recursion
-        current_recursion_depth += 1
-        max_recursion_depth = max(max_recursion_depth, current_recursion_depth)
+last_metrics = None  # counters of the last solve
+solve_job = None  # the BackgroundSolve while a solve is running
 
-        if all(grid[row][col] != 0 for row in range(9) for col in range(9)):
-            current_recursion_depth -= 1 # backtracking recursion
-            return True  # puzzle is solved
+POLL_INTERVAL_MS = 100  # how often the window checks on a running solve
 
-        # select minimum possibilities
-        row, col = min((cell for cell in possibilities if grid[cell[0]][cell[1]] == 0),
-                       key=lambda cell: len(possibilities[cell]),
-                       default=(None, None))
 
-        if row is None:  # no more cells to solve
-            current_recursion_depth -= 1  # backtracking recursion before returning
-            return True
-
-        for num in sorted(possibilities[(row, col)]):  # try possible values
-            if is_valid(grid, row, col, num):
-                grid[row][col] = num  # place number
-                operations += 1
-                # backup possibilities and update
-                backup = {key: set(values) for key, values in possibilities.items()}
-                update_possibilities(grid, possibilities, row, col, num)
-
-                if backtrack(possibilities):
-                    current_recursion_depth -= 1  # backtracking recursion before returning
-                    return True  # puzzle solved
-                # backtrack
-                grid[row][col] = 0
-                possibilities = backup  # restore possibilities
-
-        current_recursion_depth -= 1  # backtrack recursion depth before returning
-        return False  # no solution found
-
-    return backtrack(possibilities)
+def solve_sudoku(grid, progress=None):
+    # solve grid in place with the MRV backtracking engine and keep its stats
+    global last_metrics
+    metrics = Metrics(method="mrv")
+    solved = solve_mrv(grid, progress, metrics)[0]
+    last_metrics = metrics
+    return solved
 
 
 def solve_sudoku_gui():
     # solve sudoku and update GUI
-    global operations, max_recursion_depth, current_recursion_depth
-
-    # reset counters
-    operations = 0
-    max_recursion_depth = 0
-    current_recursion_depth = 0
-
+    global solve_job
+    if solve_job is not None:
+        return  # already solving
     # read the filled grid
     grid_copy = []
     filled_cells = 0
@@ -163,11 +59,38 @@ def solve_sudoku_gui():
         messagebox.showerror("Error", "The grid contains duplicates and cannot be solved.")
         return
 
-    # start the solving process
-    start_time = time.time()
-    if solve_sudoku(grid_copy):  # solve using backtracking
-        end_time = time.time()
+    # solve on a worker thread so the window stays responsive and can cancel
+    solve_job = BackgroundSolve(solve_sudoku, grid_copy).start()
+    solve_button.config(state="disabled")
+    cancel_button.config(state="normal")
+    root.after(POLL_INTERVAL_MS, poll_solve, grid_copy, filled_cells)
+
+
+def poll_solve(grid_copy, filled_cells):
+    # show live progress until the worker finishes, then show the result
+    global solve_job
+    job = solve_job
+    if not job.done():
+        stats_label.config(
+            text=(
+                f"Solving...\n"
+                f"Operations: {job.operations}\n"
+                f"Nodes/sec: {job.nodes_per_second():.0f}\n"
+                f"Current Depth: {job.depth}\n"
+                f"Elapsed: {job.elapsed():.1f} seconds"
+            )
+        )
+        root.after(POLL_INTERVAL_MS, poll_solve, grid_copy, filled_cells)
+        return
 
+    solve_job = None
+    solve_button.config(state="normal")
+    cancel_button.config(state="disabled")
+    if job.cancelled:
+        stats_label.config(text=f"Solve cancelled after {job.operations} operations.")
+    elif job.error is not None:
+        messagebox.showerror("Error", f"The solver failed: {job.error}")
+    elif job.result:
         # update the GUI with the solved grid
         for i in range(9):
             for j in range(9):
@@ -176,32 +99,36 @@ def solve_sudoku_gui():
                 entries[i][j].insert(0, str(grid_copy[i][j]))
                 entries[i][j].config(state="disabled", bg="#DFF2FF")
 
-        # calculate statistics
-        time_taken = end_time - start_time
-        space_complexity = sys.getsizeof(grid_copy) + max_recursion_depth * sys.getsizeof(grid_copy[0])
-
         # display statistics
-        display_statistics(operations, time_taken, filled_cells, 81 - filled_cells, space_complexity)
+        display_statistics(last_metrics, job.time_taken, filled_cells, 81 - filled_cells)
     else:
         messagebox.showerror("Error", "No solution exists for this puzzle!")
 
 
-def display_statistics(operations, time_taken, hints, empty_cells, space_complexity):
+def cancel_solve():
+    # stop the running solve; poll_solve() resets the buttons
+    if solve_job is not None:
+        solve_job.cancel()
+
+
+def display_statistics(metrics, time_taken, hints, empty_cells):
     # display statistics such as num operations, time taken, etc.
     stats_label.config(
         text=(
-            f"Operations: {operations}\n"
+            f"Placements: {metrics.nodes}\n"
+            f"Validity Checks: {metrics.checks}\n"
+            f"Backtracks: {metrics.backtracks}\n"
             f"Time Taken: {time_taken:.6f} seconds\n"
             f"Number of Hints: {hints}\n"
             f"Empty Cells: {empty_cells}\n"
-            f"Space Complexity: {space_complexity} bytes\n"
-            f"Max Recursion Depth: {max_recursion_depth}"
+            f"Max Recursion Depth: {metrics.max_depth}"
         )
     )
 
 
 def clear_board():
     # clear the board
+    cancel_solve()
     for i in range(9):
         for j in range(9):
             entries[i][j].config(state="normal")
@@ -235,83 +162,95 @@ def navigate(event):
     entries[current_row][current_col].focus_set()
 
 
-# GUI
-root = tk.Tk()
-root.title("Sudoku Solver")
-root.geometry("650x760")
-root.resizable(False, False)
+if __name__ == "__main__":
+    # GUI
+    root = tk.Tk()
+    root.title("Sudoku Solver")
+    root.geometry("650x810")
+    root.resizable(False, False)
+
+    title_label = tk.Label(root, text="Sudoku Solver", font=("Helvetica", 18, "bold"), bg="#FFDEE9", pady=10)
+    title_label.pack(fill="x")
+
+    frame = tk.Frame(root, bg="#FFDEE9")
+    frame.pack()
+
+    entries = [[None for _ in range(9)] for _ in range(9)]
+
+    for grid_row in range(3):
+        for grid_col in range(3):
+            subgrid_frame = tk.Frame(
+                frame,
+                bg="#FFDEE9",
+                highlightbackground="black",
+                highlightthickness=2,
+                padx=1,
+                pady=1,
+            )
+            subgrid_frame.grid(row=grid_row, column=grid_col, padx=1, pady=1)
+
+            for i in range(3):
+                for j in range(3):
+                    row = grid_row * 3 + i
+                    col = grid_col * 3 + j
+                    entry = tk.Entry(
+                        subgrid_frame,
+                        width=2,
+                        font=("Helvetica", 14),
+                        justify="center",
+                        bg="white",
+                    )
+                    entry.grid(row=i, column=j, padx=1, pady=1, ipadx=5, ipady=5)
+                    entry.bind("<KeyRelease>", restrict_input)  # restrict input to single digits
+                    entries[row][col] = entry
+
+    button_frame = tk.Frame(root, bg="#FFDEE9")
+    button_frame.pack(pady=20)
+
+    solve_button = tk.Button(
+        button_frame,
+        text="Solve",
+        font=("Helvetica", 14),
+        bg="#A5FFAA",
+        width=20,
+        command=solve_sudoku_gui,
+    )
+    solve_button.pack(pady=5)
+
+    clear_button = tk.Button(
+        button_frame,
+        text="Clear Board",
+        font=("Helvetica", 14),
+        bg="#FFD580",
+        width=20,
+        command=clear_board,
+    )
+    clear_button.pack(pady=5)
+
+    cancel_button = tk.Button(
+        button_frame,
+        text="Cancel",
+        font=("Helvetica", 14),
+        bg="#FF9AA2",
+        width=20,
+        state="disabled",
+        command=cancel_solve,
+    )
+    cancel_button.pack(pady=5)
 
-title_label = tk.Label(root, text="Sudoku Solver", font=("Helvetica", 18, "bold"), bg="#FFDEE9", pady=10)
-title_label.pack(fill="x")
+    stats_label = tk.Label(
+        root, text="", font=("Helvetica", 12), bg="#FFDEE9", pady=5, justify="left"
+    )
+    stats_label.pack(fill="x")
 
-frame = tk.Frame(root, bg="#FFDEE9")
-frame.pack()
+    root.configure(bg="#FFDEE9")
+    frame.configure(bg="#FFDEE9")
 
-entries = [[None for _ in range(9)] for _ in range(9)]
+    current_row, current_col = 0, 0
+    entries[current_row][current_col].focus_set()
+    root.bind("<Up>", navigate)
+    root.bind("<Down>", navigate)
+    root.bind("<Left>", navigate)
+    root.bind("<Right>", navigate)
 
-for grid_row in range(3):
-    for grid_col in range(3):
-        subgrid_frame = tk.Frame(
-            frame,
-            bg="#FFDEE9",
-            highlightbackground="black",
-            highlightthickness=2,
-            padx=1,
-            pady=1,
-        )
-        subgrid_frame.grid(row=grid_row, column=grid_col, padx=1, pady=1)
-
-        for i in range(3):
-            for j in range(3):
-                row = grid_row * 3 + i
-                col = grid_col * 3 + j
-                entry = tk.Entry(
-                    subgrid_frame,
-                    width=2,
-                    font=("Helvetica", 14),
-                    justify="center",
-                    bg="white",
-                )
-                entry.grid(row=i, column=j, padx=1, pady=1, ipadx=5, ipady=5)
-                entry.bind("<KeyRelease>", restrict_input)  # restrict input to single digits
-                entries[row][col] = entry
-
-button_frame = tk.Frame(root, bg="#FFDEE9")
-button_frame.pack(pady=20)
-
-solve_button = tk.Button(
-    button_frame,
-    text="Solve",
-    font=("Helvetica", 14),
-    bg="#A5FFAA",
-    width=20,
-    command=solve_sudoku_gui,
-)
-solve_button.pack(pady=5)
-
-clear_button = tk.Button(
-    button_frame,
-    text="Clear Board",
-    font=("Helvetica", 14),
-    bg="#FFD580",
-    width=20,
-    command=clear_board,
-)
-clear_button.pack(pady=5)
-
-stats_label = tk.Label(
-    root, text="", font=("Helvetica", 12), bg="#FFDEE9", pady=5, justify="left"
-)
-stats_label.pack(fill="x")
-
-root.configure(bg="#FFDEE9")
-frame.configure(bg="#FFDEE9")
-
-current_row, current_col = 0, 0
-entries[current_row][current_col].focus_set()
-root.bind("<Up>", navigate)
-root.bind("<Down>", navigate)
-root.bind("<Left>", navigate)
-root.bind("<Right>", navigate)
-
-root.mainloop()
+    root.mainloop()
@@ -0,0 +1,25 @@
+"""Headless Sudoku solvers used by the Tk front ends.
+
+Importing this package never touches tkinter, so it can be used from
+worker processes and scripts without a display.
+"""
+
+from .grid import copy_grid, count_clues, format_line, has_duplicates, parse_line
+from .metrics import Metrics, MetricsTotals
+from .result import CountResult, SolveResult
+from .solver import METHODS, count_solutions, solve
+
+__all__ = [
+    "METHODS",
+    "CountResult",
+    "Metrics",
+    "MetricsTotals",
+    "SolveResult",
+    "copy_grid",
+    "count_clues",
+    "count_solutions",
+    "format_line",
+    "has_duplicates",
+    "parse_line",
+    "solve",
+]
@@ -0,0 +1,29 @@
+import argparse
+import sys
+
+from .batch import add_batch_arguments
+from .benchmark import add_benchmark_arguments
+from .generator import add_generate_arguments
+from .service import add_serve_arguments
+from .store import add_store_arguments
+from .trace import add_trace_arguments
+from .validation import add_validate_arguments
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m sudoku_solver", description="Headless Sudoku solver tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add_batch_arguments(commands.add_parser("batch", help="solve a file of puzzles on a process pool"))
+    add_benchmark_arguments(commands.add_parser("bench", help="benchmark the engines on the bundled corpora"))
+    add_generate_arguments(commands.add_parser("generate", help="generate unique-solution puzzles"))
+    add_serve_arguments(commands.add_parser("serve", help="run the local HTTP/JSON solve service"))
+    add_store_arguments(commands.add_parser("store", help="pack puzzle lines into a binary store or unpack one"))
+    add_trace_arguments(commands.add_parser("trace", help="record a solve trace or summarize one"))
+    add_validate_arguments(commands.add_parser("validate", help="check grids or solutions for conflicts"))
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
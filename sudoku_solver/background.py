@@ -0,0 +1,68 @@
+# running a solve on a worker thread so a GUI stays responsive. the worker
+# only updates plain attributes; the GUI reads them from its own thread (with
+# tkinter, from a root.after() loop) and never has to share widgets
+import threading
+import time
+
+from .progress import SolveCancelled
+
+
+class BackgroundSolve:
+    """Call function(*args, progress=...) on a daemon thread.
+
+    While it runs, operations, depth and nodes_per_second describe the
+    latest progress report. cancel() makes the next report raise
+    SolveCancelled, which ends the search within a few thousand operations.
+    Once done() is true, result holds the return value, or cancelled or
+    error says why there is none.
+    """
+
+    def __init__(self, function, *args):
+        self.function = function
+        self.args = args
+        self.operations = 0
+        self.depth = 0
+        self.result = None
+        self.error = None
+        self.cancelled = False
+        self.start_time = None
+        self.time_taken = 0.0  # seconds, final once done
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def done(self):
+        return self.start_time is not None and not self._thread.is_alive()
+
+    def elapsed(self):
+        # seconds since start, frozen at the end of the solve
+        if self.done():
+            return self.time_taken
+        return time.perf_counter() - self.start_time if self.start_time else 0.0
+
+    def nodes_per_second(self):
+        elapsed = self.elapsed()
+        return self.operations / elapsed if elapsed else 0.0
+
+    def _progress(self, operations, depth):
+        # called by the engine on the worker thread
+        self.operations = operations
+        self.depth = depth
+        if self._cancel.is_set():
+            raise SolveCancelled
+
+    def _run(self):
+        try:
+            self.result = self.function(*self.args, progress=self._progress)
+        except SolveCancelled:
+            self.cancelled = True
+        except Exception as error:  # reported to the GUI instead of lost on the thread
+            self.error = error
+        self.time_taken = time.perf_counter() - self.start_time
@@ -0,0 +1,65 @@
+# stage 1: plain row-major backtracking over the grid itself
+from .progress import NEVER, PROGRESS_INTERVAL
+
+
+def solve_backtracking(grid, progress=None, metrics=None):
+    """Solve grid in place. Returns (solved, operations, max_depth).
+
+    progress, if given, is called as progress(operations, depth) every few
+    thousand operations. metrics, a Metrics, receives the separate counters.
+    """
+    operations = 0  # counts placements and the cells compared by validity checks
+    checks = 0
+    backtracks = 0
+    empty_cells = sum(row.count(0) for row in grid)
+    depth = 0
+    max_depth = 0
+    report_at = PROGRESS_INTERVAL if progress else NEVER
+
+    def is_valid(row, col, num):
+        # check if placing number is valid
+        nonlocal operations, checks
+        checks += 1
+        for x in range(9):
+            operations += 1
+            if grid[row][x] == num or grid[x][col] == num:
+                return False
+        start_row, start_col = 3 * (row // 3), 3 * (col // 3)
+        for i in range(start_row, start_row + 3):
+            for j in range(start_col, start_col + 3):
+                operations += 1
+                if grid[i][j] == num:
+                    return False
+        return True
+
+    def backtrack():
+        nonlocal operations, depth, max_depth, report_at, backtracks
+        depth += 1
+        max_depth = max(max_depth, depth)
+        if operations >= report_at:
+            progress(operations, depth)
+            report_at = operations + PROGRESS_INTERVAL
+
+        for row in range(9):
+            for col in range(9):
+                if grid[row][col] == 0:  # find empty cell
+                    for num in range(1, 10):  # try numbers 1-9
+                        if is_valid(row, col, num):
+                            grid[row][col] = num
+                            operations += 1  # count operation
+                            if backtrack():
+                                depth -= 1
+                                return True
+                            grid[row][col] = 0  # backtracking
+                            backtracks += 1
+                    depth -= 1
+                    return False  # if no solution
+        depth -= 1
+        return True
+
+    solved = backtrack()
+    if metrics is not None:
+        # every placement that stayed filled a cell that was empty
+        placements = backtracks + (empty_cells if solved else 0)
+        metrics.count(placements, checks, backtracks, max_depth)
+    return solved, operations, max_depth
@@ -0,0 +1,364 @@
+# batch solving of puzzle files on a process pool. puzzles are read lazily
+# and sent to the workers in chunks, with a bounded number of chunks in
+# flight so memory stays flat for files of any size
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from .grid import copy_grid, format_line, has_duplicates, parse_line
+from .metrics import Metrics, MetricsTotals
+from .progress import Budget, BudgetExceeded
+from .solver import ANY_SIZE_METHODS, METHODS, REJECTS_REPEATS, count_solutions
+
+INVALID = "invalid"  # not a puzzle line, or a board size the method cannot solve
+UNSOLVABLE = "unsolvable"  # conflicting clues or no solution
+BUDGET_EXCEEDED = "budget_exceeded"  # ran past max_nodes or the timeout, with no fallback to finish it
+
+
+def read_puzzles(lines):
+    # puzzle lines from an iterable of text lines, skipping blanks and # comments
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+
+def solve_lines(lines, method="propagation", vectorized=False, totals=None, max_nodes=None, timeout=None,
+                fallback=None):
+    # solution line (or INVALID / UNSOLVABLE / BUDGET_EXCEEDED) for each
+    # puzzle line. the metrics of every solve are added to totals, a
+    # MetricsTotals, if given. with max_nodes or timeout (seconds) a puzzle
+    # that runs past its budget is solved again from scratch with the
+    # fallback method, if given, so hard puzzles go to a heavier engine
+    if vectorized:
+        return _solve_lines_vectorized(lines, method)
+    return solve_grids(_parse_lines(lines), method, totals, max_nodes, timeout, fallback)
+
+
+def solve_grids(grids, method="propagation", totals=None, max_nodes=None, timeout=None, fallback=None):
+    # solve_lines() for grids already parsed, None standing for an invalid
+    # line. the grids are solved in place
+    bounded = max_nodes is not None or timeout is not None
+    results = []
+    for grid in grids:
+        if grid is None or len(grid) != 9 and method not in ANY_SIZE_METHODS:
+            results.append(INVALID)
+            continue
+        if method not in REJECTS_REPEATS and has_duplicates(grid):
+            # the row-major engines would search forever, or to the end of the budget
+            results.append(UNSOLVABLE)
+            continue
+        if not bounded:
+            solved = _solve_one(grid, method, totals)
+        else:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            retry = fallback if len(grid) == 9 or fallback in ANY_SIZE_METHODS else None
+            try:
+                solved = _solve_one(grid, method, totals, Budget(max_nodes, deadline), retry)
+            except BudgetExceeded:
+                results.append(BUDGET_EXCEEDED)
+                continue
+        results.append(format_line(grid) if solved else UNSOLVABLE)
+    return results
+
+
+def _solve_one(grid, method, totals, budget=None, fallback=None):
+    # solve grid in place, adding the solve's metrics to totals if given. a
+    # solve abandoned by budget is solved again from the clues with
+    # fallback, if given, and both attempts go into one entry so totals
+    # count every puzzle once. without a fallback the abandoned solve
+    # still adds the operations it got through
+    metrics = None if totals is None else Metrics(method=method)
+    clues = None if fallback is None else copy_grid(grid)
+    start = time.perf_counter()
+    try:
+        solved = METHODS[method](grid, budget, metrics)[0]
+    except BudgetExceeded:
+        if fallback is None:
+            if metrics is not None:
+                metrics.nodes = budget.operations
+                metrics.max_depth = budget.max_depth
+                metrics.time_taken = time.perf_counter() - start
+                totals.add(metrics)
+            raise
+        for row, values in zip(grid, clues):
+            row[:] = values  # the abandoned search leaves the grid half filled
+        retry = None if metrics is None else Metrics(method=f"{method}+{fallback}")
+        solved = METHODS[fallback](grid, None, retry)[0]
+        if retry is not None:
+            retry.nodes += budget.operations
+            retry.max_depth = max(retry.max_depth, budget.max_depth)
+            metrics = retry
+    if metrics is not None:
+        metrics.solved = solved
+        metrics.time_taken = time.perf_counter() - start
+        totals.add(metrics)
+    return solved
+
+
+def _parse_lines(lines):
+    # grid of every puzzle line, None for a line that is not a puzzle
+    grids = []
+    for line in lines:
+        try:
+            grids.append(parse_line(line))
+        except ValueError:
+            grids.append(None)
+    return grids
+
+
+def count_lines(lines):
+    # "none", "unique" or "multiple" (or INVALID) for each puzzle line
+    return count_grids(_parse_lines(lines))
+
+
+def count_grids(grids):
+    # count_lines() for grids already parsed, None standing for an invalid line
+    return [INVALID if grid is None else count_solutions(grid).status for grid in grids]
+
+
+def _solve_lines_vectorized(lines, fallback):
+    # propagate the whole chunk with numpy, finishing leftovers with fallback
+    from .vectorized import solve_many
+
+    results = [INVALID] * len(lines)
+    valid, grids = [], []
+    for index, line in enumerate(lines):
+        try:
+            grid = parse_line(line)
+        except ValueError:
+            continue
+        if len(grid) != 9:
+            results[index] = solve_lines([line], fallback)[0]  # larger boards are solved one by one
+            continue
+        grids.append(grid)
+        valid.append(index)
+    for index, grid in zip(valid, solve_many(grids, fallback)):
+        results[index] = format_line(grid) if grid is not None else UNSOLVABLE
+    return results
+
+
+def _solve_boards_vectorized(boards, statuses, fallback):
+    # _solve_lines_vectorized() for the unpacked records of a packed store
+    from .vectorized import solve_array
+
+    results = [INVALID] * len(boards)
+    valid = (statuses == 0).nonzero()[0]
+    if not len(valid):
+        return results
+    solutions, solved = solve_array(boards[valid], fallback)
+    text = (solutions + ord("0")).tobytes().decode("ascii")
+    for row, (index, ok) in enumerate(zip(valid.tolist(), solved.tolist())):
+        results[index] = text[row * 81:row * 81 + 81] if ok else UNSOLVABLE
+    return results
+
+
+def _solve_chunk(start, lines, method, vectorized, count, metrics, max_nodes, timeout, fallback):
+    # worker entry point; start lets unordered results be matched to inputs.
+    # lines is a list of puzzle lines or a store.StoreSlice, which the worker
+    # reads from the store file itself. with metrics, the chunk's
+    # MetricsTotals comes back too
+    from .store import StoreSlice
+
+    if isinstance(lines, StoreSlice):
+        if vectorized and not count:
+            return start, _solve_boards_vectorized(*lines.boards(), method), None
+        grids = lines.grids()
+    elif vectorized and not count:
+        return start, _solve_lines_vectorized(lines, method), None
+    else:
+        grids = _parse_lines(lines)
+    if count:
+        return start, count_grids(grids), None
+    totals = MetricsTotals() if metrics else None
+    return start, solve_grids(grids, method, totals, max_nodes, timeout, fallback), totals
+
+
+def _chunks(puzzles, chunk_size):
+    # (index of first puzzle, list of puzzle lines) for consecutive chunks
+    chunk = []
+    start = 0
+    for line in puzzles:
+        chunk.append(line)
+        if len(chunk) == chunk_size:
+            yield start, chunk
+            start += chunk_size
+            chunk = []
+    if chunk:
+        yield start, chunk
+
+
+def _store_chunks(store, chunk_size):
+    # (index of first puzzle, StoreSlice) for consecutive chunks of a store
+    from .store import StoreSlice
+
+    for start in range(0, len(store), chunk_size):
+        yield start, StoreSlice(store.path, start, min(start + chunk_size, len(store)))
+
+
+def solve_batch(puzzles, method="propagation", workers=None, chunk_size=256, ordered=True, vectorized=False,
+                count=False, totals=None, max_nodes=None, timeout=None, fallback=None):
+    """Solve puzzle lines on a process pool, yielding (index, result line).
+
+    puzzles is an iterable of lines or a store.PuzzleStore. The workers read
+    a store's records from the file themselves, so only index ranges are
+    sent to them.
+
+    Results come back in input order unless ordered=False, in which case
+    each chunk is yielded as soon as it finishes. With vectorized=True each
+    chunk is propagated as one numpy array and method only finishes the
+    puzzles propagation leaves open. With count=True the result is whether
+    the puzzle has no, a unique or multiple solutions instead. The metrics
+    of every solve are added to totals, a MetricsTotals, if given (not with
+    vectorized or count, which solve in other ways).
+
+    max_nodes and timeout (seconds) bound the solve of each puzzle; one that
+    runs past them is finished by the fallback method if given, and is
+    reported as BUDGET_EXCEEDED otherwise. The budget applies to plain
+    solves only, not with vectorized or count.
+    """
+    for name in (method, fallback):
+        if name is not None and name not in METHODS:
+            raise ValueError(f"unknown solver method {name!r}, expected one of {sorted(METHODS)}")
+    if totals is not None and (vectorized or count):
+        raise ValueError("metrics are only collected for plain solves, not with vectorized or count")
+    if (max_nodes is not None or timeout is not None) and (vectorized or count):
+        raise ValueError("a solve budget only applies to plain solves, not with vectorized or count")
+    workers = workers or os.cpu_count() or 1
+    max_pending = workers * 2  # keep every worker busy without reading ahead unboundedly
+    from .store import PuzzleStore
+
+    if isinstance(puzzles, PuzzleStore):
+        chunks = _store_chunks(puzzles, chunk_size)
+    else:
+        chunks = _chunks(puzzles, chunk_size)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        def submit_next():
+            chunk = next(chunks, None)
+            if chunk is None:
+                return None
+            return executor.submit(_solve_chunk, chunk[0], chunk[1], method, vectorized, count, totals is not None,
+                                   max_nodes, timeout, fallback)
+
+        if ordered:
+            pending = deque()
+            while True:
+                while len(pending) < max_pending:
+                    future = submit_next()
+                    if future is None:
+                        break
+                    pending.append(future)
+                if not pending:
+                    return
+                start, results, chunk_totals = pending.popleft().result()
+                if chunk_totals is not None:
+                    totals.add(chunk_totals)
+                for offset, result in enumerate(results):
+                    yield start + offset, result
+        else:
+            pending = set()
+            while True:
+                while len(pending) < max_pending:
+                    future = submit_next()
+                    if future is None:
+                        break
+                    pending.add(future)
+                if not pending:
+                    return
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    start, results, chunk_totals = future.result()
+                    if chunk_totals is not None:
+                        totals.add(chunk_totals)
+                    for offset, result in enumerate(results):
+                        yield start + offset, result
+
+
+def run_batch(args):
+    # "batch" command: solve a puzzle file and write one result per line
+    if args.metrics and (args.vectorized or args.count):
+        print("--metrics cannot be combined with --vectorized or --count", file=sys.stderr)
+        return 2
+    if (args.max_nodes is not None or args.timeout is not None) and (args.vectorized or args.count):
+        print("--max-nodes and --timeout cannot be combined with --vectorized or --count", file=sys.stderr)
+        return 2
+    if args.fallback and args.max_nodes is None and args.timeout is None:
+        print("--fallback needs --max-nodes or --timeout", file=sys.stderr)
+        return 2
+    if args.binary and (args.output == "-" or args.unordered or args.count):
+        print("--binary needs an --output file and cannot be combined with --unordered or --count", file=sys.stderr)
+        return 2
+    from .store import SOLUTIONS, PuzzleStore, StoreWriter, is_store
+
+    if is_store(args.input):
+        source = PuzzleStore(args.input)
+        puzzles = source
+    else:
+        source = sys.stdin if args.input == "-" else open(args.input)
+        puzzles = read_puzzles(source)
+    if args.binary:
+        output = StoreWriter(args.output, SOLUTIONS)
+        write = output.write_result
+    else:
+        output = sys.stdout if args.output == "-" else open(args.output, "w")
+        write = output.write
+    totals = MetricsTotals() if args.metrics else None
+    solved = total = 0
+    start_time = time.perf_counter()
+    try:
+        results = solve_batch(puzzles, args.method, args.workers, args.chunk_size,
+                              ordered=not args.unordered, vectorized=args.vectorized, count=args.count,
+                              totals=totals, max_nodes=args.max_nodes, timeout=args.timeout, fallback=args.fallback)
+        for index, result in results:
+            total += 1
+            if result not in (INVALID, UNSOLVABLE, BUDGET_EXCEEDED, "none"):
+                solved += 1
+            if args.binary:
+                write(result)
+            elif args.unordered:
+                write(f"{index}\t{result}\n")
+            else:
+                write(result + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+
+    elapsed = time.perf_counter() - start_time
+    rate = total / elapsed if elapsed else 0.0
+    outcome = "have a solution" if args.count else "solved"
+    print(f"{solved}/{total} puzzles {outcome} in {elapsed:.3f} seconds ({rate:.0f} puzzles/sec)", file=sys.stderr)
+    if totals is not None:
+        with open(args.metrics, "w") as report:
+            report.write(totals.to_json() + "\n")
+    return 0
+
+
+def add_batch_arguments(parser):
+    parser.add_argument("input", help="puzzle file, one 81-character puzzle per line ('-' for stdin); "
+                                      "256 or 625 characters for 16x16 or 25x25. a packed store "
+                                      "(see the store command) is read directly")
+    parser.add_argument("-o", "--output", default="-", help="where to write the results (default: stdout)")
+    parser.add_argument("-m", "--method", default="propagation", choices=sorted(METHODS))
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=256, help="puzzles sent to a worker at a time")
+    parser.add_argument("--binary", action="store_true",
+                        help="write the results to the --output file as a packed solution store")
+    parser.add_argument("--unordered", action="store_true",
+                        help="write results as they finish, prefixed with the puzzle index")
+    parser.add_argument("--vectorized", action="store_true",
+                        help="propagate each chunk with numpy first (requires numpy)")
+    parser.add_argument("--count", action="store_true",
+                        help="check uniqueness instead: write none, unique or multiple per puzzle")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="write the solve counters summed over all puzzles to FILE as JSON")
+    parser.add_argument("--max-nodes", type=int, default=None,
+                        help="give up on a puzzle after this many operations of the method")
+    parser.add_argument("--timeout", type=float, default=None, help="give up on a puzzle after this many seconds")
+    parser.add_argument("--fallback", default=None, choices=sorted(METHODS),
+                        help="solve puzzles that ran out of budget again with this method, without a budget")
+    parser.set_defaults(func=run_batch)
@@ -0,0 +1,264 @@
+# reproducible benchmarks of the solver engines over the bundled corpora.
+# latency comes from perf_counter_ns around each solve and peak memory from
+# a separate tracemalloc pass, so tracing does not distort the timings
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from .batch import read_puzzles
+from .grid import copy_grid, parse_line
+from .metrics import Metrics, measure_peak_memory
+from .solver import ANY_SIZE_METHODS, METHODS
+from .techniques import TECHNIQUES, solve_with_techniques
+
+CORPORA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpora")
+CORPORA = ("easy", "hard", "17clue", "adversarial", "16x16", "25x25")
+
+# "backtracking" and "mrv" are the engines behind backtrack_stage1.solve_sudoku
+# and backtrack_stage2.solve_sudoku, "bitmask" the original final solver. the
+# row-major generations take minutes (or far longer) per puzzle on the harder
+# corpora, so by default they only run on these
+ROW_MAJOR_CORPORA = ("easy",)
+ROW_MAJOR_METHODS = ("backtracking", "bitmask", "iterative")
+
+# on 16x16 and 25x25 boards even bitmask-mrv can search for hours without
+# propagation, so by default only these engines run on them
+LARGE_BOARD_METHODS = ("propagation", "techniques")
+
+# the corpora where the basic rules leave something to branch on
+TECHNIQUE_CORPORA = ("hard", "adversarial", "16x16")
+
+
+def load_corpus(name):
+    # puzzle lines of a bundled corpus, or of a file path
+    path = name if os.path.exists(name) else os.path.join(CORPORA_DIR, name + ".txt")
+    with open(path) as source:
+        return list(read_puzzles(source))
+
+
+def percentile(sorted_values, fraction):
+    # nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return 0
+    return sorted_values[max(1, math.ceil(len(sorted_values) * fraction)) - 1]
+
+
+def benchmark(method, puzzles, repeat=1, memory=True):
+    """Solve every puzzle with method and return a dict of statistics.
+
+    Each puzzle is solved repeat times and its fastest run is kept.
+    """
+    engine = METHODS[method]
+    grids = [parse_line(line) for line in puzzles]
+    latencies = []
+    nodes = 0
+    solved = 0
+    for grid in grids:
+        best = None
+        for _ in range(repeat):
+            work = copy_grid(grid)
+            # nodes from the metrics rather than the engine's operations,
+            # which for the row-major engines also count validity checks
+            metrics = Metrics(method=method)
+            start = time.perf_counter_ns()
+            outcome = engine(work, None, metrics)
+            elapsed = time.perf_counter_ns() - start
+            best = elapsed if best is None else min(best, elapsed)
+        latencies.append(best)
+        nodes += metrics.nodes
+        solved += bool(outcome[0])
+
+    peak_memory = None
+    if memory:
+        # largest allocation peak of any single solve; measure_peak_memory
+        # leaves a tracemalloc session of the caller running
+        peak_memory = 0
+        for grid in grids:
+            peak_memory = max(peak_memory, measure_peak_memory(engine, copy_grid(grid))[1])
+
+    latencies.sort()
+    total_ns = sum(latencies)
+    return {
+        "method": method,
+        "puzzles": len(grids),
+        "solved": solved,
+        "p50_ms": percentile(latencies, 0.50) / 1e6,
+        "p95_ms": percentile(latencies, 0.95) / 1e6,
+        "p99_ms": percentile(latencies, 0.99) / 1e6,
+        "mean_nodes": nodes / len(grids) if grids else 0,
+        "puzzles_per_sec": len(grids) / (total_ns / 1e9) if total_ns else 0.0,
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+def benchmark_techniques(puzzles, techniques=TECHNIQUES, repeat=1):
+    """Compare the techniques on puzzles: none, each one alone, then all of them.
+
+    Returns a list of dicts, one per setting: mean nodes, the node reduction
+    against no techniques, the time per node (a puzzle's root counts as a
+    node, so puzzles solved without branching still have a cost) and the
+    share of the time spent in the techniques themselves.
+    """
+    grids = [parse_line(line) for line in puzzles]
+    settings = [("none", ())] + [(name, (name,)) for name in techniques]
+    if len(techniques) > 1:
+        settings.append(("all", tuple(techniques)))
+    rows = []
+    for name, enabled in settings:
+        nodes = 0
+        total_ns = 0
+        technique_seconds = 0.0
+        eliminations = 0
+        for grid in grids:
+            best = None
+            for _ in range(repeat):
+                work = copy_grid(grid)
+                metrics = Metrics(method="techniques")
+                start = time.perf_counter_ns()
+                solve_with_techniques(work, None, metrics, enabled)
+                elapsed = time.perf_counter_ns() - start
+                if best is None or elapsed < best[0]:
+                    best = elapsed, metrics
+            elapsed, metrics = best
+            total_ns += elapsed
+            nodes += metrics.nodes
+            technique_seconds += sum(metrics.rule_seconds.values())
+            eliminations += sum(metrics.propagations.get(technique, 0) for technique in enabled)
+        rows.append({
+            "techniques": name,
+            "puzzles": len(grids),
+            "mean_nodes": nodes / len(grids) if grids else 0,
+            "eliminations": eliminations,
+            "us_per_node": total_ns / 1e3 / (nodes + len(grids)) if grids else 0.0,
+            "ms_per_puzzle": total_ns / 1e6 / len(grids) if grids else 0.0,
+            "technique_share": technique_seconds * 1e9 / total_ns if total_ns else 0.0,
+        })
+    baseline = rows[0]["mean_nodes"]
+    for row in rows:
+        row["node_reduction"] = 1 - row["mean_nodes"] / baseline if baseline else 0.0
+    return rows
+
+
+def format_techniques(corpus, rows):
+    # human readable table of benchmark_techniques() on one corpus
+    lines = [f"{corpus}: {rows[0]['puzzles'] if rows else 0} puzzles",
+             f"  {'techniques':<16} {'nodes':>9} {'reduction':>9} {'us/node':>9} {'ms/puzzle':>10} "
+             f"{'in rules':>8} {'removed':>8}"]
+    for row in rows:
+        lines.append(f"  {row['techniques']:<16} {row['mean_nodes']:>9.1f} {row['node_reduction']:>9.1%} "
+                     f"{row['us_per_node']:>9.1f} {row['ms_per_puzzle']:>10.3f} {row['technique_share']:>8.1%} "
+                     f"{row['eliminations']:>8}")
+    return "\n".join(lines)
+
+
+def _git_commit():
+    # commit of the working tree, if this is a git checkout
+    try:
+        output = subprocess.run(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(CORPORA_DIR),
+                                capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return output.stdout.strip() or None
+
+
+def run_suite(methods=None, corpora=CORPORA, repeat=1, memory=True, run_all=False):
+    # benchmark every method on every corpus; returns the JSON report
+    methods = methods or list(METHODS)
+    results = []
+    for corpus in corpora:
+        puzzles = load_corpus(corpus)
+        large = any(len(line) != 81 for line in puzzles)
+        for method in methods:
+            if large and method not in ANY_SIZE_METHODS:
+                continue  # a 9x9-only engine
+            if not run_all and large and method not in LARGE_BOARD_METHODS:
+                continue
+            if not run_all and method in ROW_MAJOR_METHODS and corpus not in ROW_MAJOR_CORPORA:
+                continue
+            entry = benchmark(method, puzzles, repeat, memory)
+            entry["corpus"] = corpus
+            results.append(entry)
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold=0.10):
+    # (corpus, method, old p50, new p50) for every entry whose median got
+    # slower than the baseline by more than threshold
+    previous = {(entry["corpus"], entry["method"]): entry for entry in baseline["results"]}
+    regressions = []
+    for entry in report["results"]:
+        old = previous.get((entry["corpus"], entry["method"]))
+        if old and old["p50_ms"] and entry["p50_ms"] > old["p50_ms"] * (1 + threshold):
+            regressions.append((entry["corpus"], entry["method"], old["p50_ms"], entry["p50_ms"]))
+    return regressions
+
+
+def format_report(report):
+    # human readable table of a report
+    lines = [f"{'corpus':<12} {'method':<13} {'solved':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+             f"{'nodes':>10} {'puzzles/s':>10} {'peak KiB':>9}"]
+    for entry in report["results"]:
+        peak = entry["peak_memory_bytes"]
+        lines.append(
+            f"{entry['corpus']:<12} {entry['method']:<13} {entry['solved']:>4}/{entry['puzzles']:<4} "
+            f"{entry['p50_ms']:>9.3f} {entry['p95_ms']:>9.3f} {entry['p99_ms']:>9.3f} "
+            f"{entry['mean_nodes']:>10.1f} {entry['puzzles_per_sec']:>10.1f} "
+            f"{'-' if peak is None else f'{peak / 1024:.1f}':>9}"
+        )
+    return "\n".join(lines)
+
+
+def run_benchmark(args):
+    # "bench" command
+    if args.techniques:
+        report = {}
+        for corpus in args.corpora or TECHNIQUE_CORPORA:
+            rows = report[corpus] = benchmark_techniques(load_corpus(corpus), repeat=args.repeat)
+            print(format_techniques(corpus, rows))
+        if args.json:
+            with open(args.json, "w") as output:
+                json.dump(report, output, indent=2)
+        return 0
+    report = run_suite(args.methods, args.corpora or CORPORA, args.repeat, not args.no_memory, args.all)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(report, output, indent=2)
+    if args.compare:
+        with open(args.compare) as source:
+            regressions = compare(report, json.load(source), args.threshold)
+        for corpus, method, old, new in regressions:
+            print(f"regression: {method} on {corpus}: p50 {old:.3f} ms -> {new:.3f} ms", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+def add_benchmark_arguments(parser):
+    parser.add_argument("--methods", nargs="+", choices=sorted(METHODS), help="engines to run (default: all)")
+    parser.add_argument("--corpora", nargs="+",
+                        help=f"bundled corpora ({', '.join(CORPORA)}) or puzzle files (default: all, or "
+                             f"{', '.join(TECHNIQUE_CORPORA)} with --techniques)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per puzzle, the fastest is kept")
+    parser.add_argument("--all", action="store_true",
+                        help="also run the row-major engines on the hard corpora and the other "
+                             "size-independent engines on the large boards (very slow)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--techniques", action="store_true",
+                        help="instead compare the elimination techniques: nodes saved against time per node")
+    parser.add_argument("--json", help="write the report as JSON to this file")
+    parser.add_argument("--compare", help="earlier JSON report; exit 1 if any median got slower")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="allowed relative slowdown for --compare (default: 0.10)")
+    parser.set_defaults(func=run_benchmark)
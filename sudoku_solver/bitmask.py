@@ -0,0 +1,256 @@
+# final generation: row, column and subgrid masks where bit (num - 1) is set
+# while num is still available in that unit. the iterative solvers and the
+# candidate helpers work on any board size, with masks of up to 25 bits
+
+from array import array
+
+from .progress import NEVER, PROGRESS_INTERVAL
+from .tables import PEERS, geometry_of
+
+FULL_MASK = (1 << 9) - 1
+
+
+def initialize_possibilities_bitmask(grid, tables=None):
+    # candidate mask of every cell in a flat array indexed by row * side + col,
+    # with the clues already removed from their peers (of tables, by
+    # default the plain board of the grid's size)
+    tables = tables or geometry_of(grid)
+    side = tables.side
+    # 16-bit masks hold up to 16 candidates, larger boards need 32 bits
+    possibilities = array("H" if side <= 16 else "L", [tables.full_mask] * tables.cells)
+    for cell in range(tables.cells):
+        num = grid[cell // side][cell % side]
+        if num != 0:
+            possibilities[cell] = 0
+            update_possibilities_bitmask(possibilities, cell, num, tables.peers)
+    return possibilities
+
+
+def update_possibilities_bitmask(possibilities, cell, num, peers=PEERS):
+    # remove num from the peers of cell (peers: the table of the board size,
+    # 9x9 by default). there is deliberately no "restore": or-ing the bit
+    # back is wrong when a peer had lost it for another reason, so searches
+    # undo changes with the trail in propagation.py
+    keep = ~(1 << (num - 1))
+    for peer in peers[cell]:
+        possibilities[peer] &= keep
+
+
+def solve_sudoku_recursive_with_bitmask(grid, progress=None, metrics=None, trace=None):
+    """Solve grid in place. Returns (solved, operations, max_depth).
+
+    progress, if given, is called as progress(operations, depth) every few
+    thousand operations. metrics, a Metrics, receives the separate
+    counters. trace, a trace.TraceWriter, records every placement and
+    backtrack of the search.
+    """
+    operations = 0  # counts candidates tried, each with one validity check
+    backtracks = 0
+    empty_cells = sum(row.count(0) for row in grid)
+    depth = 0
+    max_depth = 0
+    report_at = PROGRESS_INTERVAL if progress else NEVER
+
+    row_mask = [FULL_MASK] * 9
+    col_mask = [FULL_MASK] * 9
+    subgrid_mask = [FULL_MASK] * 9
+
+    def is_valid_with_bitmask(row, col, num):
+        # check if placing number is valid
+        subgrid_idx = (row // 3) * 3 + (col // 3)
+        mask = 1 << (num - 1)
+        return (row_mask[row] & mask) and (col_mask[col] & mask) and (subgrid_mask[subgrid_idx] & mask)
+
+    def place_number_with_bitmask(row, col, num):
+        subgrid_idx = (row // 3) * 3 + (col // 3)
+        mask = 1 << (num - 1)
+        row_mask[row] &= ~mask
+        col_mask[col] &= ~mask
+        subgrid_mask[subgrid_idx] &= ~mask
+        grid[row][col] = num
+
+    def remove_number_with_bitmask(row, col, num):
+        subgrid_idx = (row // 3) * 3 + (col // 3)
+        mask = 1 << (num - 1)
+        row_mask[row] |= mask
+        col_mask[col] |= mask
+        subgrid_mask[subgrid_idx] |= mask
+        grid[row][col] = 0
+
+    def backtrack():
+        # recursive backtracking
+        nonlocal operations, depth, max_depth, report_at, backtracks
+        depth += 1
+        max_depth = max(max_depth, depth)
+        if operations >= report_at:
+            progress(operations, depth)
+            report_at = operations + PROGRESS_INTERVAL
+
+        # find next empty cell
+        for row in range(9):
+            for col in range(9):
+                if grid[row][col] == 0:
+                    for num in range(1, 10):
+                        operations += 1  # count each backtracking attempt
+                        if is_valid_with_bitmask(row, col, num):
+                            place_number_with_bitmask(row, col, num)
+                            if backtrack():
+                                return True
+                            remove_number_with_bitmask(row, col, num)
+                            backtracks += 1
+
+                    depth -= 1
+                    return False
+
+        depth -= 1
+        return True
+
+    # initialize bitmasks based on the given grid
+    for row in range(9):
+        for col in range(9):
+            if grid[row][col] != 0:
+                place_number_with_bitmask(row, col, grid[row][col])
+
+    if trace is not None:
+        # wrap the two hooks so the search reports to the trace; without one
+        # the search calls the plain hooks and pays nothing
+        from .trace import BACKTRACK, PLACE
+        place, remove, record = place_number_with_bitmask, remove_number_with_bitmask, trace.record
+
+        def place_number_with_bitmask(row, col, num):
+            place(row, col, num)
+            record(PLACE, row * 9 + col, num, depth)
+
+        def remove_number_with_bitmask(row, col, num):
+            remove(row, col, num)
+            record(BACKTRACK, row * 9 + col, num, depth)
+
+    solved = backtrack()
+    if metrics is not None:
+        placements = backtracks + (empty_cells if solved else 0)
+        metrics.count(placements, operations, backtracks, max_depth)
+    return solved, operations, max_depth
+
+
+def solve_iterative_with_bitmask(grid, progress=None, metrics=None, mrv=False):
+    """Solve grid in place without recursion. Returns (solved, operations, max_depth).
+
+    With mrv=True each level branches on the empty cell with the fewest
+    candidates instead of the next one in row-major order. progress, if
+    given, is called as progress(operations, depth) every few thousand
+    placements. metrics, a Metrics, receives the separate counters; the
+    candidates come from the masks, so there are no validity checks.
+    """
+    tables = geometry_of(grid)
+    side, box = tables.side, tables.box
+    row_mask = [tables.full_mask] * side
+    col_mask = [tables.full_mask] * side
+    subgrid_mask = [tables.full_mask] * side
+
+    # place the clues, rejecting grids that repeat a number in a unit
+    empty_rows, empty_cols, empty_subgrids = [], [], []
+    for row in range(side):
+        for col in range(side):
+            subgrid_idx = (row // box) * box + (col // box)
+            num = grid[row][col]
+            if num == 0:
+                empty_rows.append(row)
+                empty_cols.append(col)
+                empty_subgrids.append(subgrid_idx)
+                continue
+            mask = 1 << (num - 1)
+            if not (row_mask[row] & col_mask[col] & subgrid_mask[subgrid_idx] & mask):
+                return False, 0, 0
+            row_mask[row] &= ~mask
+            col_mask[col] &= ~mask
+            subgrid_mask[subgrid_idx] &= ~mask
+
+    empty_count = len(empty_rows)
+    if empty_count == 0:
+        return True, 0, 0
+
+    # one preallocated stack entry per empty cell: the candidates still to
+    # try there and the bit currently placed. the empty cell lists are kept
+    # in branching order, so positions >= depth are the still-empty cells
+    candidates = [0] * empty_count
+    placed = [0] * empty_count
+
+    operations = 0  # counts placements tried
+    max_depth = 0
+    depth = 0
+    report_at = PROGRESS_INTERVAL if progress else NEVER
+    if mrv:
+        candidates[0] = _select_fewest_candidates(
+            0, empty_rows, empty_cols, empty_subgrids, row_mask, col_mask, subgrid_mask)
+    else:
+        candidates[0] = row_mask[empty_rows[0]] & col_mask[empty_cols[0]] & subgrid_mask[empty_subgrids[0]]
+
+    while True:
+        remaining = candidates[depth]
+        if remaining:
+            # place the lowest remaining candidate and descend
+            bit = remaining & -remaining
+            candidates[depth] = remaining ^ bit
+            placed[depth] = bit
+            row_mask[empty_rows[depth]] ^= bit
+            col_mask[empty_cols[depth]] ^= bit
+            subgrid_mask[empty_subgrids[depth]] ^= bit
+            operations += 1
+            depth += 1
+            if depth > max_depth:
+                max_depth = depth
+            if depth == empty_count:
+                break
+            if operations >= report_at:
+                progress(operations, depth)
+                report_at = operations + PROGRESS_INTERVAL
+            if mrv:
+                candidates[depth] = _select_fewest_candidates(
+                    depth, empty_rows, empty_cols, empty_subgrids, row_mask, col_mask, subgrid_mask)
+            else:
+                candidates[depth] = (row_mask[empty_rows[depth]] & col_mask[empty_cols[depth]]
+                                     & subgrid_mask[empty_subgrids[depth]])
+        else:
+            # no candidates left here: undo the placement one level up
+            depth -= 1
+            if depth < 0:
+                if metrics is not None:
+                    metrics.count(operations, 0, operations, max_depth)
+                return False, operations, max_depth
+            bit = placed[depth]
+            row_mask[empty_rows[depth]] ^= bit
+            col_mask[empty_cols[depth]] ^= bit
+            subgrid_mask[empty_subgrids[depth]] ^= bit
+
+    # write the placed numbers back into the grid
+    for i in range(empty_count):
+        grid[empty_rows[i]][empty_cols[i]] = placed[i].bit_length()
+    if metrics is not None:
+        metrics.count(operations, 0, operations - empty_count, max_depth)
+    return True, operations, max_depth
+
+
+def solve_mrv_with_bitmask(grid, progress=None, metrics=None):
+    """Iterative bitmask solver branching on the most constrained cell."""
+    return solve_iterative_with_bitmask(grid, progress, metrics, mrv=True)
+
+
+def _select_fewest_candidates(depth, empty_rows, empty_cols, empty_subgrids, row_mask, col_mask, subgrid_mask):
+    # move the still-empty cell with the lowest candidate popcount to
+    # position depth and return its candidate mask
+    best = depth
+    best_mask = row_mask[empty_rows[depth]] & col_mask[empty_cols[depth]] & subgrid_mask[empty_subgrids[depth]]
+    best_count = best_mask.bit_count()
+    for i in range(depth + 1, len(empty_rows)):
+        if best_count <= 1:
+            break  # cannot do better than a forced (or impossible) cell
+        mask = row_mask[empty_rows[i]] & col_mask[empty_cols[i]] & subgrid_mask[empty_subgrids[i]]
+        count = mask.bit_count()
+        if count < best_count:
+            best, best_mask, best_count = i, mask, count
+
+    if best != depth:
+        empty_rows[depth], empty_rows[best] = empty_rows[best], empty_rows[depth]
+        empty_cols[depth], empty_cols[best] = empty_cols[best], empty_cols[depth]
+        empty_subgrids[depth], empty_subgrids[best] = empty_subgrids[best], empty_subgrids[depth]
+    return best_mask
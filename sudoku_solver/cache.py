@@ -0,0 +1,234 @@
+# solve cache keyed by a canonical form of the puzzle, so grids that are the
+# same up to a symmetry share one entry. the symmetries are digit relabeling,
+# row swaps within a band, band swaps, the same for columns and stacks, and
+# transposition. the canonical form is the lexicographically smallest
+# 81-character line over all of them, with digits relabeled 1, 2, ... in the
+# order they first appear and empty cells sorting after every digit (so the
+# search is steered by the clues rather than by the many ties among empties)
+import sqlite3
+import time
+from collections import OrderedDict
+
+from .grid import format_line, parse_line
+from .metrics import Metrics
+from .result import SolveResult
+from .solver import solve
+
+
+# partial transforms canonical_form() keeps tied at most. sparse grids tie
+# on almost every choice, so the ties multiply (an empty grid took most of a
+# minute) and the search would cost far more than a solve; past this many
+# the grid is solved without the cache instead
+MAX_STATES = 256
+
+
+def canonical_form(grid, max_states=MAX_STATES):
+    """Return (canonical line, transform) for a 9x9 grid, or None.
+
+    The transform is (transposed, rows, cols, labels): row i of the
+    canonical grid is row rows[i] of the (possibly transposed) grid read in
+    column order cols, and digit d is written as labels[d]. None means the
+    search kept more than max_states tied transforms, as on sparse grids.
+    Raises ValueError for grids other than 9x9, which the symmetries here
+    do not cover.
+    """
+    if len(grid) != 9 or any(len(row) != 9 for row in grid):
+        raise ValueError(f"the solve cache handles 9x9 grids only, got {len(grid)} rows")
+    orientations = (tuple(tuple(row) for row in grid), tuple(zip(*grid)))
+
+    # the first row and the column order: build the row one column at a
+    # time, keeping every partial transform that ties for the smallest prefix
+    states = [(o, (r,), (), (0,) * 10, 1) for o in (0, 1) for r in range(9)]
+    for position in range(9):
+        best = 11
+        kept = []
+        for state in states:
+            o, rows, cols, labels, next_label = state
+            line = orientations[o][rows[0]]
+            if position % 3 == 0:
+                used = {col // 3 for col in cols}
+                choices = [col for col in range(9) if col // 3 not in used]
+            else:
+                stack = cols[position - position % 3] // 3
+                choices = [col for col in range(3 * stack, 3 * stack + 3) if col not in cols]
+            for col in choices:
+                value = line[col]
+                label = labels[value] or next_label if value else 10
+                if label < best:
+                    best = label
+                    kept = [(state, col, value)]
+                elif label == best:
+                    kept.append((state, col, value))
+        if len(kept) > max_states:
+            return None
+        states = []
+        for (o, rows, cols, labels, next_label), col, value in kept:
+            if value and not labels[value]:
+                labels = labels[:value] + (next_label,) + labels[value + 1:]
+                next_label += 1
+            states.append((o, rows, cols + (col,), labels, next_label))
+
+    # the remaining rows, one at a time, with the column order now fixed
+    for position in range(1, 9):
+        best = None
+        kept = []
+        for o, rows, cols, labels, next_label in states:
+            if position % 3 == 0:
+                used = {row // 3 for row in rows}
+                choices = [row for row in range(9) if row // 3 not in used]
+            else:
+                band = rows[position - position % 3] // 3
+                choices = [row for row in range(3 * band, 3 * band + 3) if row not in rows]
+            for row in choices:
+                line = orientations[o][row]
+                new_labels = list(labels)
+                label_count = next_label
+                key = []
+                for col in cols:
+                    value = line[col]
+                    if value and not new_labels[value]:
+                        new_labels[value] = label_count
+                        label_count += 1
+                    key.append(new_labels[value] if value else 10)
+                if best is None or key < best:
+                    best = key
+                    kept = []
+                if key == best:
+                    kept.append((o, rows + (row,), cols, tuple(new_labels), label_count))
+                    if len(kept) > max_states:
+                        return None
+        states = kept
+
+    o, rows, cols, labels, next_label = states[0]
+    # digits missing from the puzzle get the remaining labels in order
+    labels = list(labels)
+    for digit in range(1, 10):
+        if not labels[digit]:
+            labels[digit] = next_label
+            next_label += 1
+    transform = (o, rows, cols, labels)
+    return format_line(apply_transform(grid, transform)), transform
+
+
+def apply_transform(grid, transform):
+    # grid as seen through a transform from canonical_form()
+    o, rows, cols, labels = transform
+    source = grid if o == 0 else [list(column) for column in zip(*grid)]
+    return [[labels[source[row][col]] for col in cols] for row in rows]
+
+
+def invert_transform(grid, transform):
+    # undo apply_transform(): map a canonical grid back to the original one
+    o, rows, cols, labels = transform
+    digits = [0] * 10
+    for digit in range(1, 10):
+        digits[labels[digit]] = digit
+    result = [[0] * 9 for _ in range(9)]
+    for i, row in enumerate(rows):
+        for j, col in enumerate(cols):
+            if o == 0:
+                result[row][col] = digits[grid[i][j]]
+            else:
+                result[col][row] = digits[grid[i][j]]
+    return result
+
+
+class SolveCache:
+    """Solutions by canonical form, in a bounded LRU and optionally on disk.
+
+    With a path, entries are also kept in a SQLite file that outlives the
+    process; memory misses fall back to it. An unsolvable puzzle is cached
+    as such, with an empty solution line. Grids too sparse for
+    canonical_form() are not cached at all and count as skipped.
+    """
+
+    def __init__(self, maxsize=1024, path=None):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.connection = None
+        if path is not None:
+            self.connection = sqlite3.connect(path, isolation_level=None)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS solutions (key TEXT PRIMARY KEY, solution TEXT)")
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def _lookup(self, key):
+        # cached canonical solution line for key ("" if unsolvable), or None
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        if self.connection is not None:
+            row = self.connection.execute("SELECT solution FROM solutions WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._remember(key, row[0])
+                return row[0]
+        return None
+
+    def _remember(self, key, solution):
+        self.entries[key] = solution
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def _store(self, key, transform, solution):
+        # cache a solved grid (or None) under the canonical key of its puzzle
+        line = format_line(apply_transform(solution, transform)) if solution else ""
+        self._remember(key, line)
+        if self.connection is not None:
+            self.connection.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?)", (key, line))
+
+    def get(self, grid):
+        """Cached solution of grid as a new grid, False if known unsolvable, None on a miss."""
+        canonical = canonical_form(grid)
+        if canonical is None:
+            self.skipped += 1
+            return None
+        key, transform = canonical
+        solution = self._lookup(key)
+        if solution is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if not solution:
+            return False
+        return invert_transform(parse_line(solution), transform)
+
+    def put(self, grid, solution):
+        # cache solution (a solved grid, or None if unsolvable) for grid
+        canonical = canonical_form(grid)
+        if canonical is not None:
+            self._store(*canonical, solution)
+
+    def solve(self, grid, method="propagation", progress=None, measure_memory=False):
+        """solve() through the cache. Hits return a SolveResult with method "cache".
+
+        measure_memory applies to the solve of a miss; a hit allocates too
+        little to be worth measuring.
+        """
+        start = time.perf_counter()
+        canonical = canonical_form(grid)
+        if canonical is None:
+            self.skipped += 1
+            return solve(grid, method, progress, measure_memory)
+        key, transform = canonical
+        solution = self._lookup(key)
+        if solution is not None:
+            self.hits += 1
+            time_taken = time.perf_counter() - start
+            return SolveResult(
+                solved=bool(solution),
+                grid=invert_transform(parse_line(solution), transform) if solution else None,
+                time_taken=time_taken,
+                method="cache",
+                metrics=Metrics(method="cache", solved=bool(solution), time_taken=time_taken),
+            )
+        self.misses += 1
+        result = solve(grid, method, progress, measure_memory)
+        self._store(key, transform, result.grid)
+        return result
@@ -0,0 +1,152 @@
+# exact cover with Knuth's dancing links (algorithm X) over the standard
+# 729-row x 324-column sudoku matrix. a row is a (cell, digit) choice and the
+# columns are the constraints: every cell, and every digit in every row,
+# column and subgrid, is covered exactly once.
+#
+# nodes live in flat int lists (left, right, up, down, column, matrix row)
+# instead of one python object per node. node 0 is the root, nodes 1-324 are
+# the column headers and the four nodes of matrix row r start at ROW_START + 4 * r
+
+from .grid import has_duplicates
+from .progress import NEVER, PROGRESS_INTERVAL
+from .tables import COL_OF, ROW_OF, SUBGRID_OF
+
+COLUMNS = 324
+ROW_START = COLUMNS + 1
+
+
+def _build_matrix():
+    # the untouched matrix every solve starts from
+    left = [(i - 1) % ROW_START for i in range(ROW_START)]
+    right = [(i + 1) % ROW_START for i in range(ROW_START)]
+    up = list(range(ROW_START))
+    down = list(range(ROW_START))
+    column = list(range(ROW_START))
+    matrix_row = [-1] * ROW_START
+
+    for row_id in range(729):
+        cell, digit = divmod(row_id, 9)
+        columns = (
+            1 + cell,
+            1 + 81 + ROW_OF[cell] * 9 + digit,
+            1 + 162 + COL_OF[cell] * 9 + digit,
+            1 + 243 + SUBGRID_OF[cell] * 9 + digit,
+        )
+        first = len(left)
+        for k, col in enumerate(columns):
+            node = first + k
+            left.append(first + (k - 1) % 4)
+            right.append(first + (k + 1) % 4)
+            # append the node at the bottom of its column
+            up.append(up[col])
+            down.append(col)
+            down[up[col]] = node
+            up[col] = node
+            column.append(col)
+            matrix_row.append(row_id)
+
+    sizes = [0] + [9] * COLUMNS  # every constraint has 9 candidate rows
+    return left, right, up, down, column, matrix_row, sizes
+
+
+LEFT, RIGHT, UP, DOWN, COLUMN, MATRIX_ROW, SIZES = _build_matrix()
+
+
+def solve_with_dlx(grid, progress=None, metrics=None):
+    """Solve grid in place. Returns (solved, operations, max_depth).
+
+    progress, if given, is called as progress(operations, depth) every few
+    thousand rows tried. metrics, a Metrics, receives the separate counters.
+    """
+    if has_duplicates(grid):
+        return False, 0, 0
+
+    # links change during the search, so every solve works on its own copy
+    left, right, up, down, sizes = list(LEFT), list(RIGHT), list(UP), list(DOWN), list(SIZES)
+    column = COLUMN
+
+    def cover(col):
+        # unlink col from the header list and its rows from the other columns
+        left[right[col]] = left[col]
+        right[left[col]] = right[col]
+        i = down[col]
+        while i != col:
+            j = right[i]
+            while j != i:
+                up[down[j]] = up[j]
+                down[up[j]] = down[j]
+                sizes[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def uncover(col):
+        # exact reverse of cover(col)
+        i = up[col]
+        while i != col:
+            j = left[i]
+            while j != i:
+                sizes[column[j]] += 1
+                up[down[j]] = j
+                down[up[j]] = j
+                j = left[j]
+            i = up[i]
+        left[right[col]] = col
+        right[left[col]] = col
+
+    # the clues are rows that are part of every solution
+    for cell in range(81):
+        num = grid[ROW_OF[cell]][COL_OF[cell]]
+        if num != 0:
+            node = ROW_START + 4 * (cell * 9 + num - 1)
+            for k in range(4):
+                cover(column[node + k])
+
+    # iterative algorithm X; stack holds the row node chosen at each level
+    stack = []
+    operations = 0  # counts rows tried
+    max_depth = 0
+    report_at = PROGRESS_INTERVAL if progress else NEVER
+    while right[0] != 0:
+        # choose the column with the fewest remaining rows
+        col = right[0]
+        best = sizes[col]
+        j = right[col]
+        while j != 0 and best > 1:
+            if sizes[j] < best:
+                col, best = j, sizes[j]
+            j = right[j]
+        cover(col)
+        node = down[col]
+
+        # while the current column has no rows left, back up a level and
+        # move to the next row there
+        while node < ROW_START:
+            uncover(node)
+            if not stack:
+                if metrics is not None:
+                    metrics.count(operations, 0, operations, max_depth)
+                return False, operations, max_depth
+            node = stack.pop()
+            j = left[node]
+            while j != node:
+                uncover(column[j])
+                j = left[j]
+            node = down[node]
+
+        stack.append(node)
+        operations += 1
+        max_depth = max(max_depth, len(stack))
+        if operations >= report_at:
+            progress(operations, len(stack))
+            report_at = operations + PROGRESS_INTERVAL
+        j = right[node]
+        while j != node:
+            cover(column[j])
+            j = right[j]
+
+    for node in stack:
+        cell, digit = divmod(MATRIX_ROW[node], 9)
+        grid[ROW_OF[cell]][COL_OF[cell]] = digit + 1
+    if metrics is not None:
+        metrics.count(operations, 0, operations - len(stack), max_depth)
+    return True, operations, max_depth
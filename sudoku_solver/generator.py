@@ -0,0 +1,152 @@
+# puzzle generation: a random full grid from the bitmask solver, then clues
+# are removed in random order for as long as the puzzle keeps a unique
+# solution. puzzles are graded by the propagation rules and branch nodes the
+# solve needed. every puzzle has its own seed, so a run is reproducible no
+# matter how many worker processes share the work
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from .bitmask import solve_mrv_with_bitmask
+from .grid import format_line
+from .propagation import Propagator
+from .tables import BOX_OF_SIDE
+
+# easiest first: singles by elimination only, also hidden singles, also
+# locked candidates, and puzzles propagation alone cannot finish
+DIFFICULTIES = ("easy", "medium", "hard", "expert")
+
+
+def random_solution(rng, box=3):
+    # a random complete grid of box x box subgrids. the subgrids on the
+    # diagonal share no unit, so each gets an independent random permutation
+    # and the bitmask solver fills in the rest
+    side = box * box
+    while True:
+        grid = [[0] * side for _ in range(side)]
+        for diagonal in range(box):
+            digits = rng.sample(range(1, side + 1), side)
+            for i in range(side):
+                grid[box * diagonal + i // box][box * diagonal + i % box] = digits[i]
+        if solve_mrv_with_bitmask(grid)[0]:
+            return grid
+
+
+def grade(counts, operations):
+    # difficulty from the rule counts and branch nodes of a solve
+    if operations:
+        return "expert"
+    if counts["locked_candidates"]:
+        return "hard"
+    if counts["hidden_singles"]:
+        return "medium"
+    return "easy"
+
+
+def rate(grid):
+    """Grade a puzzle in one search. Returns (unique, difficulty, branch nodes).
+
+    difficulty and branch nodes describe the search for the first solution
+    and are None when the puzzle has no solution.
+    """
+    state = Propagator.from_grid(grid)
+    if state is None:
+        return False, None, None
+    difficulty = operations = None
+    for _ in state.search():
+        if difficulty is not None:
+            return False, difficulty, operations  # a second solution
+        operations = state.operations
+        difficulty = grade(state.counts, operations)
+    return difficulty is not None, difficulty, operations
+
+
+def generate(rng, difficulty=None, max_attempts=100, box=3):
+    """Generate a puzzle with a unique solution. Returns (grid, difficulty, branch nodes).
+
+    Clues are removed until none can go without losing uniqueness or, with
+    a target difficulty, without grading above it. Puzzles that end up
+    easier than the target are discarded and generation starts over, up to
+    max_attempts times before the last puzzle is returned anyway. box
+    sets the board size, 9x9 by default.
+    """
+    limit = DIFFICULTIES.index(difficulty) if difficulty else len(DIFFICULTIES) - 1
+    side = box * box
+    for _ in range(max_attempts):
+        grid = random_solution(rng, box)
+        level, operations = DIFFICULTIES[0], 0
+        cells = list(range(side * side))
+        rng.shuffle(cells)
+        for cell in cells:
+            row, col = divmod(cell, side)
+            value = grid[row][col]
+            grid[row][col] = 0
+            unique, removed_level, removed_operations = rate(grid)
+            if unique and DIFFICULTIES.index(removed_level) <= limit:
+                level, operations = removed_level, removed_operations
+            else:
+                grid[row][col] = value
+        if difficulty is None or level == difficulty:
+            break
+    return grid, level, operations
+
+
+def _generate_chunk(seeds, difficulty, box):
+    # worker entry point: one puzzle line and difficulty per seed
+    results = []
+    for seed in seeds:
+        grid, level, _ = generate(random.Random(seed), difficulty, box=box)
+        results.append((format_line(grid), level))
+    return results
+
+
+def generate_many(count, difficulty=None, seed=None, workers=None, chunk_size=16, box=3):
+    """Generate count puzzles on a process pool, yielding (puzzle line, difficulty).
+
+    The seed of every puzzle is drawn from seed up front, so the same seed
+    gives the same puzzles in the same order with any number of workers.
+    """
+    master = random.Random(seed)
+    seeds = [master.getrandbits(64) for _ in range(count)]
+    chunks = [seeds[i:i + chunk_size] for i in range(0, count, chunk_size)]
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for results in executor.map(_generate_chunk, chunks, [difficulty] * len(chunks), [box] * len(chunks)):
+            yield from results
+
+
+def run_generate(args):
+    # "generate" command: write one puzzle line per generated puzzle
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    levels = Counter()
+    start_time = time.perf_counter()
+    try:
+        results = generate_many(args.count, args.difficulty, args.seed, args.workers, args.chunk_size,
+                                BOX_OF_SIDE[args.size])
+        for line, level in results:
+            levels[level] += 1
+            output.write(line + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    elapsed = time.perf_counter() - start_time
+    rate_per_minute = args.count / elapsed * 60 if elapsed else 0.0
+    summary = ", ".join(f"{levels[level]} {level}" for level in DIFFICULTIES if levels[level])
+    print(f"{args.count} puzzles ({summary}) in {elapsed:.3f} seconds ({rate_per_minute:.0f} puzzles/min)",
+          file=sys.stderr)
+    return 0
+
+
+def add_generate_arguments(parser):
+    parser.add_argument("-n", "--count", type=int, default=100, help="puzzles to generate (default: 100)")
+    parser.add_argument("-d", "--difficulty", choices=DIFFICULTIES, help="target difficulty (default: any)")
+    parser.add_argument("--size", type=int, default=9, choices=(9, 16, 25), help="board side (default: 9)")
+    parser.add_argument("-s", "--seed", type=int, default=None, help="seed for reproducible output")
+    parser.add_argument("-o", "--output", default="-", help="where to write the puzzles (default: stdout)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=16, help="puzzles generated by a worker at a time")
+    parser.set_defaults(func=run_generate)
@@ -0,0 +1,106 @@
+# helpers for grids stored as grid[row][col] with 0 for an empty cell. grids
+# are 9x9 unless noted; the larger 16x16 and 25x25 boards write the values
+# 10 and up as letters in puzzle lines
+from math import isqrt
+
+from .tables import BOX_OF_SIDE
+
+SYMBOLS = "123456789ABCDEFGHIJKLMNOP"  # puzzle line character of each value
+
+
+def copy_grid(grid):
+    # copy a grid so the solvers can work in place
+    return [list(row) for row in grid]
+
+
+def count_clues(grid):
+    # number of pre-filled cells
+    return sum(1 for row in grid for value in row if value != 0)
+
+
+def check_grid(grid):
+    # ValueError unless grid is a square board of a supported size whose
+    # cells all hold 0 (empty) to side
+    side = len(grid)
+    if side not in BOX_OF_SIDE:
+        raise ValueError(f"expected a 4x4, 9x9, 16x16 or 25x25 grid, got {side} rows")
+    for row, values in enumerate(grid):
+        if len(values) != side:
+            raise ValueError(f"row {row + 1} has {len(values)} cells, expected {side}")
+        for col, value in enumerate(values):
+            if not isinstance(value, int) or not 0 <= value <= side:
+                raise ValueError(f"row {row + 1}, column {col + 1} holds {value!r}, expected 0 to {side}")
+
+
+def has_duplicates(grid):
+    # check rows and columns for duplicates
+    side = len(grid)
+    box = isqrt(side)
+    for i in range(side):
+        row_seen = set()
+        col_seen = set()
+        for j in range(side):
+            # check for duplicates in the row
+            if grid[i][j] != 0:
+                if grid[i][j] in row_seen:
+                    return True
+                row_seen.add(grid[i][j])
+            # check for duplicates in the column
+            if grid[j][i] != 0:
+                if grid[j][i] in col_seen:
+                    return True
+                col_seen.add(grid[j][i])
+
+    # check subgrids for duplicates
+    for start_row in range(0, side, box):
+        for start_col in range(0, side, box):
+            subgrid_seen = set()
+            for i in range(start_row, start_row + box):
+                for j in range(start_col, start_col + box):
+                    if grid[i][j] != 0:
+                        if grid[i][j] in subgrid_seen:
+                            return True
+                        subgrid_seen.add(grid[i][j])
+
+    return False
+
+
+def parse_line(line):
+    # grid from an 81-character puzzle line, '0' or '.' for empty cells.
+    # lines of 256 or 625 characters are 16x16 or 25x25 boards
+    line = line.strip()
+    side = isqrt(len(line))
+    if len(line) != 81:
+        if side * side != len(line) or side not in BOX_OF_SIDE:
+            raise ValueError(f"expected 81 characters (256 or 625 for 16x16 or 25x25), got {len(line)}")
+        return _parse_symbols(line.upper(), side)
+    grid = []
+    for row in range(9):
+        grid_row = []
+        for ch in line[row * 9:row * 9 + 9]:
+            if ch == "." or ch == "0":
+                grid_row.append(0)
+            elif "1" <= ch <= "9":
+                grid_row.append(ord(ch) - 48)
+            else:
+                raise ValueError(f"invalid character {ch!r} in puzzle line")
+        grid.append(grid_row)
+    return grid
+
+
+def _parse_symbols(line, side):
+    # grid of any size from a line using SYMBOLS
+    values = {ch: value for value, ch in enumerate(SYMBOLS[:side], 1)}
+    values["."] = values["0"] = 0
+    try:
+        cells = [values[ch] for ch in line]
+    except KeyError as error:
+        raise ValueError(f"invalid character {error.args[0]!r} in puzzle line") from None
+    return [cells[row * side:row * side + side] for row in range(side)]
+
+
+def format_line(grid):
+    # 81-character line for a grid, '0' for empty cells
+    if len(grid) != 9:
+        return "".join(SYMBOLS[value - 1] if value else "0" for row in grid for value in row)
+    return "".join(str(value) for row in grid for value in row)
@@ -0,0 +1,287 @@
+# next-step hints: the easiest deduction that applies to a grid, with the
+# cells it rests on, found by looking at the candidates rather than by
+# searching. besides the candidate mask of every cell the engine indexes,
+# for every unit and digit, the positions in the unit where the digit can
+# still go, so hidden singles, hidden subsets and fish are read off those
+# position masks directly
+from dataclasses import dataclass, field
+
+from .bitmask import initialize_possibilities_bitmask
+from .grid import has_duplicates
+from .propagation import intersections
+from .tables import geometry_of, unit_positions
+from .techniques import find_fish, find_hidden_subsets, find_naked_subsets, unit_places
+from .validation import unit_name
+
+# from easiest to hardest, the order next_hint() tries them in
+TECHNIQUES = (
+    "naked_single",
+    "hidden_single",
+    "locked_candidates",
+    "naked_pair",
+    "hidden_pair",
+    "naked_triple",
+    "hidden_triple",
+    "x_wing",
+)
+SUBSET_NAMES = {2: "pair", 3: "triple"}
+
+
+@dataclass
+class Hint:
+    # one deduction: the digits it places or the candidates it rules out
+    technique: str  # one of TECHNIQUES, or "contradiction" for a cell without candidates
+    placements: list = field(default_factory=list)  # (row, col, digit) to fill in
+    eliminations: list = field(default_factory=list)  # (row, col, digit) no longer possible
+    cells: list = field(default_factory=list)  # (row, col) of the cells the deduction rests on
+    explanation: str = ""
+
+
+def _listing(items):
+    # "a", "a and b" or "a, b and c"
+    items = [str(item) for item in items]
+    return items[0] if len(items) == 1 else f"{', '.join(items[:-1])} and {items[-1]}"
+
+
+def _digits(mask):
+    # the digits (1-based) of a candidate mask, in order
+    digits = []
+    while mask:
+        bit = mask & -mask
+        digits.append(bit.bit_length())
+        mask ^= bit
+    return digits
+
+
+class HintEngine:
+    """Candidates of a grid, indexed by cell and by unit and digit.
+
+    next_hint() returns the easiest deduction that applies, or None when
+    none of TECHNIQUES does (or the grid is full). apply(hint) records a
+    hint, so the next one builds on the candidates it ruled out. Raises
+    ValueError for clues that repeat a digit.
+    """
+
+    __slots__ = ("tables", "positions", "values", "possibilities", "places")
+
+    def __init__(self, grid):
+        if has_duplicates(grid):
+            raise ValueError("the grid repeats a digit in a row, column or subgrid")
+        tables = self.tables = geometry_of(grid)
+        side = tables.side
+        self.positions = unit_positions(tables.box)
+        self.values = bytearray(grid[cell // side][cell % side] for cell in range(tables.cells))
+        self.possibilities = initialize_possibilities_bitmask(grid, tables)
+        # places[unit * side + digit - 1]: positions in the unit where digit can go
+        self.places = unit_places(self.possibilities, tables)
+
+    def _cell(self, cell):
+        side = self.tables.side
+        return cell // side, cell % side
+
+    def _name(self, cell):
+        row, col = self._cell(cell)
+        return f"R{row + 1}C{col + 1}"
+
+    def remove(self, cell, bits):
+        # rule the digits of bits out of cell
+        bits &= self.possibilities[cell]
+        self.possibilities[cell] ^= bits
+        places, side = self.places, self.tables.side
+        for digit in _digits(bits):
+            for unit, position in self.positions[cell]:
+                places[unit * side + digit - 1] &= ~(1 << position)
+
+    def place(self, cell, digit):
+        self.remove(cell, self.possibilities[cell])
+        self.values[cell] = digit
+        bit = 1 << (digit - 1)
+        for peer in self.tables.peers[cell]:
+            if self.possibilities[peer] & bit:
+                self.remove(peer, bit)
+
+    def apply(self, hint):
+        side = self.tables.side
+        for row, col, digit in hint.placements:
+            self.place(row * side + col, digit)
+        for row, col, digit in hint.eliminations:
+            self.remove(row * side + col, 1 << (digit - 1))
+
+    def grid(self):
+        side = self.tables.side
+        return [list(self.values[start:start + side]) for start in range(0, self.tables.cells, side)]
+
+    def next_hint(self, techniques=TECHNIQUES):
+        """The first hint found by the first of techniques that applies, or None."""
+        for technique in techniques:
+            hint = getattr(self, "_" + technique)()
+            if hint is not None:
+                return hint
+        return None
+
+    def _witnesses(self, targets, digit):
+        # placed cells holding digit that see one of targets: why digit
+        # cannot go there
+        values, peers = self.values, self.tables.peers
+        witnesses = []
+        for target in targets:
+            for peer in peers[target]:
+                if values[peer] == digit and peer not in witnesses:
+                    witnesses.append(peer)
+                    break
+        return witnesses
+
+    def _hint(self, technique, explanation, cells, placements=(), eliminations=()):
+        return Hint(technique,
+                    [(*self._cell(cell), digit) for cell, digit in placements],
+                    [(*self._cell(cell), digit) for cell, digit in eliminations],
+                    [self._cell(cell) for cell in cells],
+                    explanation)
+
+    def _naked_single(self):
+        values, possibilities, side = self.values, self.possibilities, self.tables.side
+        for cell in range(self.tables.cells):
+            mask = possibilities[cell]
+            if values[cell] or mask & (mask - 1):
+                continue
+            if not mask:
+                return self._hint("contradiction", f"{self._name(cell)} has no candidates left.", [cell])
+            digit = mask.bit_length()
+            others = [other for other in range(1, side + 1) if other != digit]
+            witnesses = []
+            for other in others:
+                witnesses += self._witnesses([cell], other)
+            return self._hint("naked_single", f"{self._name(cell)} has one candidate left: {digit}. Its row, "
+                              f"column and subgrid rule out every other digit.", witnesses, [(cell, digit)])
+        return None
+
+    def _hidden_single(self):
+        places, units, side = self.places, self.tables.units, self.tables.side
+        for index, positions in enumerate(places):
+            if positions and not positions & (positions - 1):
+                unit, digit = divmod(index, side)
+                digit += 1
+                cell = units[unit][positions.bit_length() - 1]
+                blocked = [other for other in units[unit] if other != cell and not self.values[other]]
+                return self._hint("hidden_single", f"{self._name(cell)} is the only place for {digit} in "
+                                  f"{unit_name(unit, self.tables.side)}.",
+                                  self._witnesses(blocked, digit), [(cell, digit)])
+        return None
+
+    def _locked_candidates(self):
+        possibilities, tables = self.possibilities, self.tables
+        unit_intersections = intersections(tables.box)
+        # pointing (from a subgrid into a line) first, then claiming
+        order = list(range(2 * tables.side, 3 * tables.side)) + list(range(2 * tables.side))
+        for unit in order:
+            for partition in unit_intersections[unit]:
+                masks = []
+                once = twice = 0
+                for segment, _ in partition:
+                    mask = 0
+                    for cell in segment:
+                        mask |= possibilities[cell]
+                    twice |= once & mask
+                    once |= mask
+                    masks.append(mask)
+                confined = once & ~twice
+                for (segment, targets), mask in zip(partition, masks):
+                    for digit in _digits(mask & confined):
+                        bit = 1 << (digit - 1)
+                        removed = [(cell, digit) for cell in targets if possibilities[cell] & bit]
+                        if removed:
+                            cells = [cell for cell in segment if possibilities[cell] & bit]
+                            crossing = tables.cell_units[removed[0][0]]
+                            other = next(crossing_unit for crossing_unit in crossing
+                                         if set(segment) <= set(tables.units[crossing_unit]))
+                            return self._hint("locked_candidates", f"In {unit_name(unit, tables.side)}, {digit} can "
+                                              f"only go where it meets {unit_name(other, tables.side)}, so {digit} "
+                                              f"is removed from the rest of {unit_name(other, tables.side)}.",
+                                              cells, eliminations=removed)
+        return None
+
+    def _naked_subset(self, size):
+        possibilities, tables = self.possibilities, self.tables
+        for unit, subset, union, empty in find_naked_subsets(possibilities, tables.units, size):
+            removed = [(cell, digit) for cell in empty if cell not in subset
+                       for digit in _digits(possibilities[cell] & union)]
+            if removed:
+                digits = _listing(_digits(union))
+                names = _listing(self._name(cell) for cell in subset)
+                return self._hint(f"naked_{SUBSET_NAMES[size]}", f"{names} can only hold {digits} between "
+                                  f"them, so no other cell of {unit_name(unit, tables.side)} can.",
+                                  subset, eliminations=removed)
+        return None
+
+    def _hidden_subset(self, size):
+        places, possibilities, tables = self.places, self.possibilities, self.tables
+        side = tables.side
+        for unit, digits, union in find_hidden_subsets(places, tables.units, side, size):
+            keep = sum(1 << digit for digit in digits)
+            holders = [tables.units[unit][position] for position in range(side) if union >> position & 1]
+            removed = [(cell, digit) for cell in holders for digit in _digits(possibilities[cell] & ~keep)]
+            if removed:
+                names = _listing(self._name(cell) for cell in holders)
+                return self._hint(f"hidden_{SUBSET_NAMES[size]}", f"In {unit_name(unit, tables.side)}, the "
+                                  f"digits {_listing(digit + 1 for digit in digits)} can only go in {names}, so "
+                                  f"those cells hold nothing else.", holders, eliminations=removed)
+        return None
+
+    def _naked_pair(self):
+        return self._naked_subset(2)
+
+    def _hidden_pair(self):
+        return self._hidden_subset(2)
+
+    def _naked_triple(self):
+        return self._naked_subset(3)
+
+    def _hidden_triple(self):
+        return self._hidden_subset(3)
+
+    def _fish(self, size, technique):
+        # a digit confined to size columns within size rows (or the other
+        # way round) is removed from the rest of those columns
+        possibilities, tables = self.possibilities, self.tables
+        side = tables.side
+        for base, digit, lines, union in find_fish(self.places, side, size):
+            cover = side - base  # the crossing lines
+            bit = 1 << digit
+            digit += 1
+            crossing = [line for line in range(side) if union >> line & 1]
+            removed = [(cell, digit) for line in crossing for position, cell in enumerate(tables.units[cover + line])
+                       if position not in lines and possibilities[cell] & bit]
+            if removed:
+                cells = [cell for line in lines for cell in tables.units[base + line] if possibilities[cell] & bit]
+                bases = _listing(unit_name(base + line, tables.side) for line in lines)
+                covers = _listing(unit_name(cover + line, tables.side) for line in crossing)
+                return self._hint(technique, f"In {bases}, {digit} can only go in {covers}, so "
+                                  f"{digit} is removed from the rest of {covers}.", cells, eliminations=removed)
+        return None
+
+    def _x_wing(self):
+        return self._fish(2, "x_wing")
+
+
+def next_hint(grid):
+    """The easiest deduction for grid (see HintEngine), or None."""
+    return HintEngine(grid).next_hint()
+
+
+def next_placement(grid):
+    """Hints up to and including the first that places a digit.
+
+    Candidates ruled out by the earlier hints are what makes the last one
+    possible. Returns [] when no technique finds a placement, and stops at
+    a contradiction.
+    """
+    engine = HintEngine(grid)
+    hints = []
+    while True:
+        hint = engine.next_hint()
+        if hint is None:
+            return []
+        hints.append(hint)
+        if hint.placements or hint.technique == "contradiction":
+            return hints
+        engine.apply(hint)
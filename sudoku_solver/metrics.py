@@ -0,0 +1,97 @@
+# structured solve statistics. the engines keep their counters in local
+# variables and copy them into a Metrics only when a solve ends, so asking
+# for metrics costs nothing inside the search. peak memory needs tracemalloc,
+# which slows a solve down several times, so it is only measured on request
+import json
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+
+
+@dataclass
+class Metrics:
+    # counters of one solve; engines fill in the ones that apply to them
+    method: str = ""
+    solved: bool = False
+    nodes: int = 0  # placements made by the search (guesses, not deductions)
+    checks: int = 0  # validity checks of a candidate against its units
+    backtracks: int = 0  # placements the search undid
+    max_depth: int = 0
+    propagations: dict = field(default_factory=dict)  # deductions per propagation rule
+    rule_seconds: dict = field(default_factory=dict)  # time spent in each optional technique
+    peak_memory: int = None  # bytes allocated at the peak, None unless measured
+    time_taken: float = 0.0  # seconds
+
+    def count(self, nodes, checks, backtracks, max_depth, propagations=None):
+        # called once by an engine at the end of its search
+        self.nodes = nodes
+        self.checks = checks
+        self.backtracks = backtracks
+        self.max_depth = max_depth
+        if propagations is not None:
+            self.propagations = dict(propagations)
+
+    def as_dict(self):
+        return asdict(self)
+
+    def to_json(self):
+        return json.dumps(self.as_dict())
+
+
+@dataclass
+class MetricsTotals:
+    # Metrics summed over many solves, for batches
+    solves: int = 0
+    solved: int = 0
+    nodes: int = 0
+    checks: int = 0
+    backtracks: int = 0
+    max_depth: int = 0  # deepest of any solve
+    propagations: dict = field(default_factory=dict)
+    rule_seconds: dict = field(default_factory=dict)
+    peak_memory: int = None  # largest of any measured solve
+    time_taken: float = 0.0
+
+    def add(self, metrics):
+        """Add one solve's Metrics, or merge another MetricsTotals (say from a worker)."""
+        if isinstance(metrics, MetricsTotals):
+            self.solves += metrics.solves
+            self.solved += metrics.solved
+        else:
+            self.solves += 1
+            self.solved += bool(metrics.solved)
+        self.nodes += metrics.nodes
+        self.checks += metrics.checks
+        self.backtracks += metrics.backtracks
+        self.max_depth = max(self.max_depth, metrics.max_depth)
+        for rule, count in metrics.propagations.items():
+            self.propagations[rule] = self.propagations.get(rule, 0) + count
+        for rule, seconds in metrics.rule_seconds.items():
+            self.rule_seconds[rule] = self.rule_seconds.get(rule, 0.0) + seconds
+        if metrics.peak_memory is not None:
+            self.peak_memory = max(self.peak_memory or 0, metrics.peak_memory)
+        self.time_taken += metrics.time_taken
+        return self
+
+    def as_dict(self):
+        return asdict(self)
+
+    def to_json(self):
+        return json.dumps(self.as_dict())
+
+
+def measure_peak_memory(function, *args):
+    # call function(*args) under tracemalloc. returns (return value, peak bytes
+    # allocated during the call); works when tracemalloc is already running
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+    else:
+        tracemalloc.start()
+        start = 0
+    try:
+        value = function(*args)
+        return value, tracemalloc.get_traced_memory()[1] - start
+    finally:
+        if not tracing:
+            tracemalloc.stop()
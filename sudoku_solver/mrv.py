@@ -0,0 +1,99 @@
+# stage 2: backtracking on the cell with the fewest possibilities (MRV),
+# with the candidates of every cell kept as python sets
+from .progress import NEVER, PROGRESS_INTERVAL
+
+
+def solve_mrv(grid, progress=None, metrics=None):
+    """Solve grid in place. Returns (solved, operations, max_depth).
+
+    progress, if given, is called as progress(operations, depth) every few
+    thousand operations. metrics, a Metrics, receives the separate counters.
+    """
+    operations = 0  # counts placements and the cells compared by validity checks
+    checks = 0
+    backtracks = 0
+    empty_cells = sum(row.count(0) for row in grid)
+    depth = 0
+    max_depth = 0
+    report_at = PROGRESS_INTERVAL if progress else NEVER
+
+    def is_valid(row, col, num):
+        # check if placing number is valid
+        nonlocal operations, checks
+        checks += 1
+        for x in range(9):
+            operations += 1
+            if grid[row][x] == num or grid[x][col] == num:
+                return False
+        start_row, start_col = 3 * (row // 3), 3 * (col // 3)
+        for i in range(start_row, start_row + 3):
+            for j in range(start_col, start_col + 3):
+                operations += 1
+                if grid[i][j] == num:
+                    return False
+        return True
+
+    def initialize_possibilities():
+        # initialize possibilities for each cell based on rules
+        possibilities = {}
+        for row in range(9):
+            for col in range(9):
+                if grid[row][col] == 0:
+                    possibilities[(row, col)] = {num for num in range(1, 10) if is_valid(row, col, num)}
+                else:
+                    possibilities[(row, col)] = set()  # filled cells have no possibilities
+        return possibilities
+
+    def update_possibilities(possibilities, row, col, num):
+        # remove num from the row, column and subgrid of (row, col)
+        for x in range(9):
+            possibilities[(row, x)].discard(num)  # row
+            possibilities[(x, col)].discard(num)  # column
+
+        start_row, start_col = 3 * (row // 3), 3 * (col // 3)
+        for i in range(start_row, start_row + 3):
+            for j in range(start_col, start_col + 3):
+                possibilities[(i, j)].discard(num)
+
+    def backtrack(possibilities):
+        nonlocal operations, depth, max_depth, report_at, backtracks
+        depth += 1
+        max_depth = max(max_depth, depth)
+        if operations >= report_at:
+            progress(operations, depth)
+            report_at = operations + PROGRESS_INTERVAL
+
+        # select minimum possibilities
+        row, col = min((cell for cell in possibilities if grid[cell[0]][cell[1]] == 0),
+                       key=lambda cell: len(possibilities[cell]),
+                       default=(None, None))
+
+        if row is None:  # no more cells to solve
+            depth -= 1
+            return True
+
+        for num in sorted(possibilities[(row, col)]):  # try possible values
+            if is_valid(row, col, num):
+                grid[row][col] = num  # place number
+                operations += 1
+                # backup possibilities and update
+                backup = {key: set(values) for key, values in possibilities.items()}
+                update_possibilities(possibilities, row, col, num)
+
+                if backtrack(possibilities):
+                    depth -= 1
+                    return True  # puzzle solved
+                # backtrack
+                grid[row][col] = 0
+                backtracks += 1
+                possibilities = backup  # restore possibilities
+
+        depth -= 1
+        return False  # no solution found
+
+    solved = backtrack(initialize_possibilities())
+    if metrics is not None:
+        # every placement that stayed filled a cell that was empty
+        placements = backtracks + (empty_cells if solved else 0)
+        metrics.count(placements, checks, backtracks, max_depth)
+    return solved, operations, max_depth
@@ -0,0 +1,48 @@
+# progress reporting shared by the engines. an engine given a progress
+# callback calls progress(operations, depth) roughly every PROGRESS_INTERVAL
+# operations; without one the check is a single integer comparison per node.
+# budgets are progress callbacks too, so they cost nothing when unused
+import sys
+import time
+
+PROGRESS_INTERVAL = 4096
+# the propagation engine counts branches, each one a whole round of
+# propagation, so it reports far more often to keep deadlines accurate
+BRANCH_PROGRESS_INTERVAL = 64
+NEVER = sys.maxsize  # report threshold when there is no callback
+
+
+class SolveCancelled(Exception):
+    """Raised from a progress callback to abandon a solve."""
+
+
+class BudgetExceeded(SolveCancelled):
+    """Raised by a Budget when a solve runs past its node budget or deadline."""
+
+
+class Budget:
+    """Progress callback that stops a solve after max_nodes operations or at deadline.
+
+    deadline is a time.monotonic() value. Both are checked at every progress
+    report, so a solve can overrun its node budget by one report interval.
+    operations and max_depth keep what the reports said, as the partial
+    statistics of an abandoned solve. progress, if given, still receives
+    every report.
+    """
+
+    __slots__ = ("max_nodes", "deadline", "progress", "operations", "max_depth")
+
+    def __init__(self, max_nodes=None, deadline=None, progress=None):
+        self.max_nodes = NEVER if max_nodes is None else max_nodes
+        self.deadline = deadline
+        self.progress = progress
+        self.operations = 0
+        self.max_depth = 0
+
+    def __call__(self, operations, depth):
+        self.operations = operations
+        self.max_depth = max(self.max_depth, depth)
+        if self.progress is not None:
+            self.progress(operations, depth)
+        if operations >= self.max_nodes or self.deadline is not None and time.monotonic() >= self.deadline:
+            raise BudgetExceeded
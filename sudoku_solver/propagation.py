@@ -0,0 +1,342 @@
+# constraint propagation on the bitmask candidates: naked singles, hidden
+# singles and locked candidates (pointing / claiming) are applied to a
+# fixpoint before every branch, driven by a queue of units whose candidates
+# changed. works on every board size the tables support
+from collections import deque
+from functools import lru_cache
+
+from .bitmask import initialize_possibilities_bitmask
+from .grid import has_duplicates
+from .progress import BRANCH_PROGRESS_INTERVAL, NEVER
+from .tables import geometry, geometry_of
+
+RULES = ("naked_singles", "hidden_singles", "locked_candidates")
+
+
+def _intersections(tables, unit):
+    # split a unit into its line/subgrid intersections. each partition is a
+    # list of (segment cells, cells outside the unit that see the whole
+    # segment), so a digit confined to one segment can be removed from them
+    units, box, side = tables.units, tables.box, tables.side
+    cells = units[unit]
+    if unit < 2 * side:
+        # a row or column: one segment per subgrid it crosses
+        partitions = [([cells[i:i + box] for i in range(0, side, box)], 2)]
+    else:
+        # a subgrid: one segment per row and per column it crosses
+        partitions = [([cells[i:i + box] for i in range(0, side, box)], 0),
+                      ([cells[i::box] for i in range(box)], 1)]
+
+    result = []
+    for segments, crossing in partitions:
+        result.append(tuple(
+            (segment, tuple(cell for cell in units[tables.cell_units[segment[0]][crossing]] if cell not in cells))
+            for segment in segments
+        ))
+    return result
+
+
+@lru_cache(maxsize=None)
+def intersections(box):
+    # intersections of every unit of the board with box x box subgrids
+    tables = geometry(box)
+    return [_intersections(tables, unit) for unit in range(3 * tables.side)]
+
+
+class Propagator:
+    """Flat cell values and candidate masks with a trail of changed masks.
+
+    Every mask change is pushed on the trail as (cell << shift | old mask),
+    so a search can return to an earlier state with undo(height) at a cost
+    proportional to the changes made since, instead of copying all cells.
+    """
+
+    __slots__ = ("tables", "intersections", "shift", "values", "possibilities", "queue", "queued", "trail",
+                 "counts", "operations", "depth", "max_depth")
+
+    def __init__(self, values, possibilities, tables=None):
+        self.tables = tables or geometry(3)
+        self.intersections = intersections(self.tables.box)
+        units = len(self.tables.units)
+        if units > len(self.intersections):
+            # extra units of a variant take no part in locked candidates
+            self.intersections = self.intersections + [()] * (units - len(self.intersections))
+        self.shift = 16 if self.tables.side <= 16 else 32  # trail bits reserved for the mask
+        self.values = values
+        self.possibilities = possibilities
+        self.queue = deque(range(units))  # units to examine, all of them at first
+        self.queued = bytearray(b"\x01" * units)
+        self.trail = []
+        self.counts = {rule: 0 for rule in RULES}
+        self.operations = 0  # branch placements made by search()
+        self.depth = 0  # branch placements still in place at the last solution
+        self.max_depth = 0
+
+    @classmethod
+    def from_grid(cls, grid, tables=None):
+        """Propagator for grid, or None if the clues conflict.
+
+        tables defaults to the plain board of the grid's size; variants
+        pass tables with extra units (see variants.py).
+        """
+        if tables is None:
+            tables = geometry_of(grid)
+        elif len(grid) != tables.side:
+            raise ValueError(f"expected a {tables.side}x{tables.side} grid, got {len(grid)} rows")
+        side = tables.side
+        if has_duplicates(grid):
+            return None
+        values = bytearray(grid[cell // side][cell % side] for cell in range(tables.cells))
+        for unit in tables.units[3 * side:]:
+            digits = [values[cell] for cell in unit if values[cell]]
+            if len(digits) != len(set(digits)):
+                return None
+        possibilities = initialize_possibilities_bitmask(grid, tables)
+        for cell in range(tables.cells):
+            if possibilities[cell] == 0 and values[cell] == 0:
+                return None
+        return cls(values, possibilities, tables)
+
+    def write_grid(self, grid):
+        # copy the cell values into grid[row][col]
+        values, side = self.values, self.tables.side
+        for cell in range(self.tables.cells):
+            grid[cell // side][cell % side] = values[cell]
+
+    def undo(self, height):
+        # restore every mask changed since the trail had the given height
+        trail, possibilities, values = self.trail, self.possibilities, self.values
+        shift = self.shift
+        low = (1 << shift) - 1
+        for _ in range(len(trail) - height):
+            entry = trail.pop()
+            cell, mask = entry >> shift, entry & low
+            possibilities[cell] = mask
+            if mask:
+                values[cell] = 0  # the cell was still empty before the change
+        # work left over from a contradiction no longer applies
+        if self.queue:
+            for unit in self.queue:
+                self.queued[unit] = 0
+            self.queue.clear()
+
+    def eliminate(self, cell, bits):
+        # remove bits from an empty cell; False if it has no candidates left
+        mask = self.possibilities[cell]
+        if not mask & bits:
+            return True
+        self.trail.append(cell << self.shift | mask)
+        mask &= ~bits
+        self.possibilities[cell] = mask
+        if mask == 0:
+            return False
+        queued = self.queued
+        for unit in self.tables.cell_units[cell]:
+            if not queued[unit]:
+                queued[unit] = 1
+                self.queue.append(unit)
+        return True
+
+    def assign(self, cell, bit):
+        # place the digit of bit in cell and remove it from all peers
+        # (eliminate() inlined, this is the hottest loop of the search)
+        possibilities, trail, queue, queued = self.possibilities, self.trail, self.queue, self.queued
+        shift, cell_units = self.shift, self.tables.cell_units
+        trail.append(cell << shift | possibilities[cell])
+        self.values[cell] = bit.bit_length()
+        possibilities[cell] = 0
+        for peer in self.tables.peers[cell]:
+            mask = possibilities[peer]
+            if mask & bit:
+                trail.append(peer << shift | mask)
+                mask ^= bit
+                possibilities[peer] = mask
+                if mask == 0:
+                    return False
+                for unit in cell_units[peer]:
+                    if not queued[unit]:
+                        queued[unit] = 1
+                        queue.append(unit)
+        return True
+
+    def _eliminate_locked(self, targets, locked):
+        # remove the digits locked into a segment from the cells that see it
+        possibilities = self.possibilities
+        for cell in targets:
+            removed = possibilities[cell] & locked
+            if removed:
+                self.counts["locked_candidates"] += removed.bit_count()
+                if not self.eliminate(cell, removed):
+                    return False
+        return True
+
+    def propagate(self):
+        """Apply the rules until the queue is empty. False on a contradiction."""
+        values, possibilities, queue, queued, counts = (
+            self.values, self.possibilities, self.queue, self.queued, self.counts)
+        assign, eliminate_locked = self.assign, self._eliminate_locked
+        units, full_mask, unit_intersections = self.tables.units, self.tables.full_mask, self.intersections
+        while queue:
+            unit = queue.popleft()
+            queued[unit] = 0
+            cells = units[unit]
+
+            # naked singles: a cell with exactly one candidate
+            for cell in cells:
+                mask = possibilities[cell]
+                if mask and not mask & (mask - 1):
+                    counts["naked_singles"] += 1
+                    if not assign(cell, mask):
+                        return False
+
+            # hidden singles: a digit with exactly one place left in the unit
+            once = twice = placed = 0
+            for cell in cells:
+                mask = possibilities[cell]
+                if mask:
+                    twice |= once & mask
+                    once |= mask
+                else:
+                    placed |= 1 << (values[cell] - 1)
+            if once | placed != full_mask:
+                return False  # some digit can no longer go anywhere in this unit
+            singles = once & ~twice
+            if singles:
+                for cell in cells:
+                    mask = possibilities[cell] & singles
+                    if mask:
+                        if mask & (mask - 1):
+                            return False  # one cell is the only place for two digits
+                        counts["hidden_singles"] += 1
+                        if not assign(cell, mask):
+                            return False
+
+            # locked candidates: a digit confined to one line/subgrid
+            # intersection is removed from the rest of the crossing line
+            # (pointing) or subgrid (claiming)
+            for partition in unit_intersections[unit]:
+                masks = []
+                once = twice = 0
+                for segment, _ in partition:
+                    mask = 0
+                    for cell in segment:
+                        mask |= possibilities[cell]
+                    twice |= once & mask
+                    once |= mask
+                    masks.append(mask)
+                confined = once & ~twice  # digits left in a single segment
+                if confined:
+                    for (_, targets), mask in zip(partition, masks):
+                        locked = mask & confined
+                        if locked and not eliminate_locked(targets, locked):
+                            return False
+        return True
+
+    def select_cell(self):
+        # the empty cell with the fewest candidates, or -1 if none is left
+        possibilities = self.possibilities
+        cell, best_count = -1, self.tables.side + 1
+        for candidate_cell in range(self.tables.cells):
+            mask = possibilities[candidate_cell]
+            if mask and mask.bit_count() < best_count:
+                cell, best_count = candidate_cell, mask.bit_count()
+                if best_count == 2:
+                    break  # singles were already placed by propagation
+        return cell
+
+    def search(self, progress=None):
+        """Depth-first search from the current state.
+
+        Yields every time all cells are filled (read them from values);
+        resuming the generator continues with the next branch, so further
+        solutions reuse the stack and trail built for the earlier ones.
+        progress, if given, is called as progress(operations, depth) every
+        BRANCH_PROGRESS_INTERVAL branch placements.
+        """
+        report_at = self.operations + BRANCH_PROGRESS_INTERVAL if progress else NEVER
+        if not self.propagate():
+            return
+        # explicit stack of (cell, candidates left to try, trail height before branching)
+        stack = []
+        cell = self.select_cell()
+        while True:
+            if cell < 0:
+                self.depth = len(stack)
+                yield  # every cell is filled
+            else:
+                stack.append((cell, self.possibilities[cell], len(self.trail)))
+                self.max_depth = max(self.max_depth, len(stack))
+
+            # try candidates, popping exhausted levels, until one propagates cleanly
+            while stack:
+                cell, remaining, height = stack[-1]
+                if not remaining:
+                    stack.pop()
+                    continue
+                bit = remaining & -remaining
+                stack[-1] = (cell, remaining ^ bit, height)
+                self.undo(height)
+                self.operations += 1
+                if self.operations >= report_at:
+                    progress(self.operations, len(stack))
+                    report_at = self.operations + BRANCH_PROGRESS_INTERVAL
+                if self.assign(cell, bit) and self.propagate():
+                    break
+            else:
+                return
+            cell = self.select_cell()
+
+
+def solve_with_propagation(grid, progress=None, metrics=None):
+    """Solve grid in place. Returns (solved, operations, max_depth, eliminations).
+
+    operations counts branch placements; eliminations maps each rule to the
+    placements (singles) or candidate removals (locked candidates) it made.
+    progress is passed on to Propagator.search(). metrics, a Metrics,
+    receives the separate counters.
+    """
+    state = Propagator.from_grid(grid)
+    if state is None:
+        return False, 0, 0, {rule: 0 for rule in RULES}
+    solved = False
+    for _ in state.search(progress):
+        state.write_grid(grid)
+        solved = True
+        break
+    if metrics is not None:
+        live = state.depth if solved else 0
+        metrics.count(state.operations, 0, state.operations - live, state.max_depth, state.counts)
+    return solved, state.operations, state.max_depth, state.counts
+
+
+def count_solutions_with_propagation(grid, limit=2, progress=None):
+    """Count the solutions of grid, stopping at limit.
+
+    Returns (count, first solution or None, operations). The search for the
+    next solution resumes where the previous one was found. progress is
+    passed on to Propagator.search().
+    """
+    state = Propagator.from_grid(grid)
+    if state is None:
+        return 0, None, 0
+    count, values, operations = count_state_solutions(state, limit, progress)
+    solution = None
+    if values is not None:
+        side = state.tables.side
+        solution = [list(values[start:start + side]) for start in range(0, state.tables.cells, side)]
+    return count, solution, operations
+
+
+def count_state_solutions(state, limit=2, progress=None):
+    # count_solutions_with_propagation() for a Propagator set up by the
+    # caller. returns (count, flat values of the first solution or None,
+    # operations)
+    count = 0
+    values = None
+    for _ in state.search(progress):
+        count += 1
+        if values is None:
+            values = bytearray(state.values)
+        if count >= limit:
+            break
+    return count, values, state.operations
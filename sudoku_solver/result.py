@@ -0,0 +1,27 @@
+from dataclasses import dataclass, field
+
+from .metrics import Metrics
+
+
+@dataclass
+class SolveResult:
+    # outcome of a single solve plus the statistics the GUI displays
+    solved: bool
+    grid: list  # solved grid, or None when there is no solution
+    operations: int = 0
+    max_depth: int = 0
+    time_taken: float = 0.0  # seconds
+    method: str = ""
+    eliminations: dict = field(default_factory=dict)  # per propagation rule
+    metrics: Metrics = None  # the separate counters of the solve
+    budget_exceeded: bool = False  # abandoned at max_nodes or the deadline
+
+
+@dataclass
+class CountResult:
+    # outcome of counting solutions up to a limit
+    count: int  # solutions found, never more than the limit
+    status: str  # "none", "unique", "multiple" or "budget_exceeded"
+    solution: list  # first solution found, or None
+    operations: int = 0
+    time_taken: float = 0.0  # seconds
@@ -0,0 +1,402 @@
+# a small local HTTP/JSON service on asyncio. POST /solve, /count and
+# /validate take {"puzzle": line} or {"puzzles": [lines]}; GET /stats reports
+# latency histograms and counters. the event loop only parses requests:
+# puzzles from all concurrent requests are gathered into micro-batches that
+# run on a process pool, and every puzzle runs under a node budget and a
+# timeout so one adversarial puzzle cannot hold a worker for long
+import asyncio
+import json
+import math
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+
+from .batch import BUDGET_EXCEEDED, INVALID, UNSOLVABLE
+from .grid import format_line, parse_line
+from .solver import ANY_SIZE_METHODS, METHODS, count_solutions, solve
+from .validation import VALID, find_conflict, unit_name
+
+ENDPOINTS = ("/solve", "/count", "/validate")
+
+MAX_BODY = 16 * 1024 * 1024  # bytes of JSON a request may send
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+BAD_BUDGET = '"max_nodes" and "timeout" must be positive and finite'
+
+
+class LatencyHistogram:
+    """Request latencies counted in power-of-two millisecond buckets.
+
+    Percentiles are reported as the upper bound of the bucket they fall in.
+    """
+
+    BOUNDS_MS = tuple(2 ** k for k in range(16))  # 1 ms up to about 33 s; slower goes in the last bucket
+
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0  # seconds
+
+    def observe(self, seconds):
+        milliseconds = seconds * 1000
+        bucket = 0
+        while bucket < len(self.BOUNDS_MS) and milliseconds > self.BOUNDS_MS[bucket]:
+            bucket += 1
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, fraction):
+        # upper bound in ms of the bucket holding the given fraction, None if empty
+        if not self.count:
+            return None
+        rank = max(1, round(self.count * fraction))
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.BOUNDS_MS[bucket] if bucket < len(self.BOUNDS_MS) else None
+        return None
+
+    def as_dict(self):
+        labels = [f"<={bound}ms" for bound in self.BOUNDS_MS] + [f">{self.BOUNDS_MS[-1]}ms"]
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else None,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "buckets": {label: count for label, count in zip(labels, self.counts) if count},
+        }
+
+
+def run_job(endpoint, line, method, max_nodes, timeout):
+    """Handle one puzzle of a request and return its JSON result. Runs in a worker process."""
+    try:
+        grid = parse_line(line)
+    except (ValueError, AttributeError):
+        return {"status": INVALID}
+    if endpoint == "/validate":
+        unit = find_conflict(grid)
+        return {"status": VALID} if unit is None else {"status": "conflict", "unit": unit_name(unit, len(grid))}
+
+    deadline = time.monotonic() + timeout
+    if endpoint == "/count":
+        result = count_solutions(grid, max_nodes=max_nodes, deadline=deadline)
+        return {"status": result.status, "nodes": result.operations}
+    if len(grid) != 9 and method not in ANY_SIZE_METHODS:
+        return {"status": INVALID}
+    result = solve(grid, method, max_nodes=max_nodes, deadline=deadline)
+    if result.budget_exceeded:
+        return {"status": BUDGET_EXCEEDED, "nodes": result.operations}
+    if not result.solved:
+        return {"status": UNSOLVABLE, "nodes": result.metrics.nodes}
+    return {"status": "solved", "solution": format_line(result.grid), "nodes": result.metrics.nodes,
+            "time_ms": result.time_taken * 1000}
+
+
+def run_jobs(jobs):
+    # worker entry point: the results of one micro-batch
+    return [run_job(*job) for job in jobs]
+
+
+class MicroBatcher:
+    """Collects puzzles from concurrent requests into batches for a process pool.
+
+    A batch is sent once batch_size puzzles are waiting or linger seconds
+    after its first puzzle arrived. At most max_in_flight batches run at
+    once; later puzzles wait in the queue.
+    """
+
+    def __init__(self, executor, batch_size=32, linger=0.002, max_in_flight=4):
+        self.executor = executor
+        self.batch_size = batch_size
+        self.linger = linger
+        self.queue = asyncio.Queue()
+        self.slots = asyncio.Semaphore(max_in_flight)
+        self.tasks = set()  # running batches, referenced until they finish
+        self.batches = 0
+
+    async def submit(self, job):
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((job, future))
+        return await future
+
+    def _drain(self, batch):
+        while len(batch) < self.batch_size and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+
+    async def run(self):
+        # background task: form batches for as long as the service runs
+        while True:
+            batch = [await self.queue.get()]
+            self._drain(batch)
+            if len(batch) < self.batch_size and self.linger:
+                await asyncio.sleep(self.linger)
+                self._drain(batch)
+            await self.slots.acquire()
+            task = asyncio.create_task(self._run_batch(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _run_batch(self, batch):
+        self.batches += 1
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self.executor, run_jobs, [job for job, _ in batch])
+        except Exception as error:  # a broken pool fails the requests instead of hanging them
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+        else:
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self.slots.release()
+
+
+class SolveService:
+    """The HTTP front end: request parsing, limits, batching and statistics.
+
+    max_concurrent requests are handled at once, up to max_waiting more
+    wait for a turn and any beyond that are answered 503 right away. A
+    request carries at most max_puzzles puzzles.
+    max_nodes and timeout bound every puzzle; a request may ask for less.
+    The puzzles of a batch run one after another in a worker, so the budget
+    also bounds how long one puzzle can delay the others in its batch.
+    """
+
+    def __init__(self, workers=None, method="propagation", max_nodes=200000, timeout=5.0, max_concurrent=64,
+                 max_waiting=256, max_puzzles=10000, batch_size=32, linger=0.002):
+        self.workers = workers or os.cpu_count() or 1
+        self.method = method
+        self.max_nodes = max_nodes
+        self.timeout = timeout
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.max_puzzles = max_puzzles
+        self.batch_size = batch_size
+        self.linger = linger
+        self.executor = None
+        self.batcher = None
+        self._batching = None
+        self.slots = None
+        self.active = 0  # requests being handled
+        self.waiting = 0  # requests waiting for a slot
+        self.counters = {"requests": 0, "rejected": 0, "puzzles": 0, BUDGET_EXCEEDED: 0}
+        self.latency = {endpoint: LatencyHistogram() for endpoint in ENDPOINTS}
+
+    async def start(self):
+        # create the pool and the batching task; call on the service's loop
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.batcher = MicroBatcher(self.executor, self.batch_size, self.linger, max_in_flight=self.workers * 2)
+        self._batching = asyncio.create_task(self.batcher.run())
+        self.slots = asyncio.Semaphore(self.max_concurrent)
+
+    def close(self):
+        self._batching.cancel()
+        self.executor.shutdown(cancel_futures=True)
+
+    def stats(self):
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "batches": self.batcher.batches,
+            **self.counters,
+            "latency": {endpoint: histogram.as_dict() for endpoint, histogram in self.latency.items()},
+        }
+
+    async def handle(self, reader, writer):
+        # one connection; HTTP/1.1 keep-alive unless the client asks to close
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "malformed request line"}, False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {"error": "malformed content-length"}, False)
+                    break
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {"error": f"bodies are limited to {MAX_BODY} bytes"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                try:
+                    status, payload = await self.dispatch(method, path, body)
+                except Exception as error:  # e.g. a broken pool: answer instead of dropping the connection
+                    status, payload = 500, {"error": f"internal error: {error!r}"}
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass  # the client went away or sent a line over the reader's limit
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+
+    async def dispatch(self, method, path, body):
+        """(status, JSON payload) for a request."""
+        if path == "/stats":
+            return (200, self.stats()) if method == "GET" else (405, {"error": "use GET"})
+        if path not in ENDPOINTS:
+            return 404, {"error": f"unknown endpoint {path}, expected /stats or one of {list(ENDPOINTS)}"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        if self.waiting >= self.max_waiting:
+            self.counters["rejected"] += 1
+            return 503, {"error": "too many concurrent requests, retry later"}
+
+        try:
+            request = json.loads(body or b"{}")
+            single = "puzzle" in request
+            puzzles = [request["puzzle"]] if single else request["puzzles"]
+            method_name = request.get("method", self.method)
+            max_nodes = int(request.get("max_nodes", self.max_nodes))
+            timeout = float(request.get("timeout", self.timeout))
+        except OverflowError:  # int() of an infinite max_nodes such as 1e400
+            return 400, {"error": BAD_BUDGET}
+        except (ValueError, TypeError, KeyError, AttributeError):
+            return 400, {"error": 'expected a JSON object with "puzzle" or "puzzles"'}
+        if max_nodes < 1 or not 0 < timeout < math.inf:  # also false for NaN
+            return 400, {"error": BAD_BUDGET}
+        max_nodes = min(max_nodes, self.max_nodes)
+        timeout = min(timeout, self.timeout)
+        if not isinstance(puzzles, list):
+            return 400, {"error": '"puzzles" must be a list of puzzle lines'}
+        if method_name not in METHODS:
+            return 400, {"error": f"unknown method {method_name!r}, expected one of {sorted(METHODS)}"}
+        if len(puzzles) > self.max_puzzles:
+            return 413, {"error": f"at most {self.max_puzzles} puzzles per request"}
+
+        self.counters["requests"] += 1
+        self.counters["puzzles"] += len(puzzles)
+        start = time.perf_counter()  # latency includes the wait for a slot
+        self.waiting += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            results = await asyncio.gather(*(
+                self.batcher.submit((path, puzzle, method_name, max_nodes, timeout)) for puzzle in puzzles))
+        finally:
+            self.active -= 1
+            self.slots.release()
+            self.latency[path].observe(time.perf_counter() - start)
+        self.counters[BUDGET_EXCEEDED] += sum(result["status"] == BUDGET_EXCEEDED for result in results)
+        return 200, {"result": results[0]} if single else {"results": results}
+
+
+async def serve(host="127.0.0.1", port=8080, ready=None, **options):
+    """Run the service until cancelled. ready, if given, is called with (server, service) once listening."""
+    service = SolveService(**options)
+    await service.start()
+    server = await asyncio.start_server(service.handle, host, port)
+    try:
+        if ready is not None:
+            ready(server, service)
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def start_in_thread(host="127.0.0.1", port=0, **options):
+    """Run the service on a daemon thread, for local clients and scripts.
+
+    Returns (base url, stop function). port=0 picks a free port.
+    """
+    started = threading.Event()
+    state = {}
+
+    def ready(server, service):
+        state["url"] = "http://%s:%d" % server.sockets[0].getsockname()[:2]
+        state["loop"] = asyncio.get_running_loop()
+        state["task"] = asyncio.current_task()
+        started.set()
+
+    def run():
+        try:
+            asyncio.run(serve(host, port, ready, **options))
+        except asyncio.CancelledError:
+            pass  # stopped
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    started.wait()
+
+    def stop():
+        state["loop"].call_soon_threadsafe(state["task"].cancel)
+        thread.join()
+
+    return state["url"], stop
+
+
+def request(url, payload=None, timeout=60):
+    """POST payload as JSON to url (GET if there is none). Returns (status, decoded reply)."""
+    data = None if payload is None else json.dumps(payload).encode()
+    message = urllib.request.Request(url, data, {"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(message, timeout=timeout) as reply:
+            return reply.status, json.loads(reply.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read() or b"null")
+
+
+def run_serve(args):
+    # "serve" command: run until interrupted
+    print(f"serving on http://{args.host}:{args.port}", file=sys.stderr)
+    try:
+        asyncio.run(serve(args.host, args.port, workers=args.workers, method=args.method, max_nodes=args.max_nodes,
+                          timeout=args.timeout, max_concurrent=args.max_concurrent, max_waiting=args.max_waiting,
+                          batch_size=args.batch_size))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def add_serve_arguments(parser):
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on (default: 8080)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="solver processes (default: all cores)")
+    parser.add_argument("-m", "--method", default="propagation", choices=sorted(METHODS),
+                        help="default solver method")
+    parser.add_argument("--max-nodes", type=int, default=200000, help="node budget of every puzzle")
+    parser.add_argument("--timeout", type=float, default=5.0, help="seconds allowed for every puzzle")
+    parser.add_argument("--max-concurrent", type=int, default=64, help="requests handled at once")
+    parser.add_argument("--max-waiting", type=int, default=256,
+                        help="requests that may wait for a turn; more get 503")
+    parser.add_argument("--batch-size", type=int, default=32, help="puzzles sent to a worker at a time")
+    parser.set_defaults(func=run_serve)
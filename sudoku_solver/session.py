@@ -0,0 +1,196 @@
+# a puzzle being edited one clue at a time. the session keeps, per unit, how
+# often each digit is placed and which digits are used, and the candidate
+# mask of every empty cell. setting or clearing a clue updates the counts of
+# the cell's three units and the masks of the cell and its peers, so the
+# consistency of the clues is known after every edit without a rescan.
+# whether the clues still have a solution needs a search, but a known
+# solution often answers it: a clue that agrees with it, or a removed clue,
+# leaves it a solution
+from array import array
+
+from .progress import Budget, BudgetExceeded
+from .propagation import Propagator, count_state_solutions
+from .tables import geometry, geometry_of
+
+CONFLICT = "conflict"  # a unit repeats a digit
+
+
+class Session:
+    """Clues of a 9x9 (or 16x16, 25x25) puzzle with incrementally kept candidates.
+
+    set(row, col, value) places a clue, or clears the cell with value 0.
+    consistent says at once whether no unit repeats a digit and every empty
+    cell has a candidate left; check() tells whether the clues have no, a
+    unique or several solutions.
+    """
+
+    __slots__ = ("tables", "values", "possibilities", "counts", "used", "repeats", "blocked", "solution", "status")
+
+    def __init__(self, grid=None, box=3):
+        tables = self.tables = geometry(box) if grid is None else geometry_of(grid)
+        side = tables.side
+        self.values = bytearray(tables.cells)
+        self.possibilities = array("H" if side <= 16 else "L", [tables.full_mask] * tables.cells)
+        self.counts = bytearray(len(tables.units) * side)  # placements of each digit in each unit
+        self.used = [0] * len(tables.units)  # digits placed in each unit
+        self.repeats = 0  # (unit, digit) pairs placed more than once
+        self.blocked = set()  # empty cells without a candidate
+        self.solution = None  # flat values of a solution of the clues, when one is known
+        self.status = None  # "none", "unique" or "multiple" once known
+        if grid is not None:
+            for row, values in enumerate(grid):
+                for col, value in enumerate(values):
+                    if value:
+                        self.set(row, col, value)
+
+    def set(self, row, col, value):
+        """Place value in a cell, or clear the cell with 0. Returns consistent."""
+        side = self.tables.side
+        if not 0 <= value <= side:
+            raise ValueError(f"a cell holds 0 to {side}, got {value}")
+        cell = row * side + col
+        old = self.values[cell]
+        if old == value:
+            return self.consistent
+        if old:
+            self._count(cell, old, -1)
+            # the known solution still solves the fewer clues, but may no
+            # longer be the only one; no solution may have become some
+            if self.status != "multiple":
+                self.status = None
+        if value:
+            self._count(cell, value, 1)
+            # more clues keep no solution at none and a unique one unique
+            # if it agrees; a disagreeing clue rules the solution out
+            if self.solution is not None and self.solution[cell] != value:
+                self.solution = None
+                self.status = None
+            elif self.status == "multiple":
+                self.status = None
+        self.values[cell] = value
+        self._refresh(cell)
+        for peer in self.tables.peers[cell]:
+            self._refresh(peer)
+        return self.consistent
+
+    def clear(self, row, col):
+        return self.set(row, col, 0)
+
+    def _count(self, cell, value, step):
+        # add step to the count of value in the units of cell
+        counts, used, side = self.counts, self.used, self.tables.side
+        bit = 1 << (value - 1)
+        for unit in self.tables.cell_units[cell]:
+            index = unit * side + value - 1
+            counts[index] += step
+            count = counts[index]
+            if step > 0:
+                if count == 1:
+                    used[unit] |= bit
+                elif count == 2:
+                    self.repeats += 1
+            elif count == 1:
+                self.repeats -= 1
+            elif count == 0:
+                used[unit] &= ~bit
+
+    def _refresh(self, cell):
+        # recompute the candidates of cell from the digits used in its units
+        if self.values[cell]:
+            self.possibilities[cell] = 0
+            self.blocked.discard(cell)
+            return
+        used = self.used
+        row, col, subgrid = self.tables.cell_units[cell]
+        mask = self.tables.full_mask & ~(used[row] | used[col] | used[subgrid])
+        self.possibilities[cell] = mask
+        if mask:
+            self.blocked.discard(cell)
+        else:
+            self.blocked.add(cell)
+
+    @property
+    def consistent(self):
+        return not self.repeats and not self.blocked
+
+    def conflict(self):
+        # index of the first unit that repeats a digit (numbered as in
+        # tables.py), or None
+        if not self.repeats:
+            return None
+        side = self.tables.side
+        for index, count in enumerate(self.counts):
+            if count > 1:
+                return index // side
+        return None
+
+    def blocked_cell(self):
+        # the first empty cell without a candidate, or None
+        return min(self.blocked) if self.blocked else None
+
+    def candidates(self, row, col):
+        mask = self.possibilities[row * self.tables.side + col]
+        return [digit for digit in range(1, self.tables.side + 1) if mask >> (digit - 1) & 1]
+
+    def clues(self):
+        return sum(1 for value in self.values if value)
+
+    def grid(self):
+        # the clues as grid[row][col]
+        side = self.tables.side
+        return [list(self.values[start:start + side]) for start in range(0, self.tables.cells, side)]
+
+    def solution_grid(self):
+        # a solution of the clues as grid[row][col], if one is known
+        if self.solution is None:
+            return None
+        side = self.tables.side
+        return [list(self.solution[start:start + side]) for start in range(0, self.tables.cells, side)]
+
+    def check(self, max_nodes=None, deadline=None, progress=None):
+        """CONFLICT, "none", "unique", "multiple" or "budget_exceeded" for the current clues.
+
+        A repeated digit or a cell without candidates answers at once, and
+        so does an earlier answer the edits since cannot have changed.
+        Otherwise the clues are searched from the kept candidates, bounded
+        by max_nodes and deadline as in solve().
+        """
+        if self.repeats:
+            return CONFLICT
+        if self.blocked:
+            return "none"
+        if self.status is None:
+            self._search(2, max_nodes, deadline, progress)
+        return self.status or "budget_exceeded"
+
+    def has_solution(self, max_nodes=None, deadline=None, progress=None):
+        """Whether the clues have a solution, or None if the budget ran out.
+
+        Cheaper than check(), as a known solution answers it and a search
+        stops at the first solution.
+        """
+        if not self.consistent:
+            return False
+        if self.solution is None and self.status is None:
+            self._search(1, max_nodes, deadline, progress)
+        if self.solution is not None:
+            return True
+        return False if self.status == "none" else None
+
+    def _search(self, limit, max_nodes, deadline, progress):
+        # count solutions up to limit from a copy of the kept state
+        state = Propagator(bytearray(self.values), array(self.possibilities.typecode, self.possibilities),
+                           self.tables)
+        if max_nodes is not None or deadline is not None:
+            progress = Budget(max_nodes, deadline, progress)
+        try:
+            count, solution, _ = count_state_solutions(state, limit, progress)
+        except BudgetExceeded:
+            return
+        self.solution = solution
+        if count == 0:
+            self.status = "none"
+        elif count >= 2:
+            self.status = "multiple"
+        elif limit >= 2:
+            self.status = "unique"
@@ -0,0 +1,137 @@
+import time
+from functools import partial
+
+from .backtracking import solve_backtracking
+from .bitmask import (
+    solve_iterative_with_bitmask,
+    solve_mrv_with_bitmask,
+    solve_sudoku_recursive_with_bitmask,
+)
+from .dlx import solve_with_dlx
+from .grid import check_grid, copy_grid, has_duplicates
+from .metrics import Metrics, measure_peak_memory
+from .mrv import solve_mrv
+from .progress import Budget, BudgetExceeded
+from .propagation import count_solutions_with_propagation, solve_with_propagation
+from .result import CountResult, SolveResult
+from .techniques import solve_with_techniques
+
+# solver engines, oldest generation first
+METHODS = {
+    "backtracking": solve_backtracking,
+    "mrv": solve_mrv,
+    "bitmask": solve_sudoku_recursive_with_bitmask,
+    "iterative": solve_iterative_with_bitmask,
+    "bitmask-mrv": solve_mrv_with_bitmask,
+    "propagation": solve_with_propagation,
+    "techniques": solve_with_techniques,
+    "dlx": solve_with_dlx,
+}
+
+# engines parameterized by box size, which also solve 16x16 and 25x25 grids
+ANY_SIZE_METHODS = ("iterative", "bitmask-mrv", "propagation", "techniques")
+
+# engines that reject clues repeating a digit while placing them; for the
+# others solve() checks first, as they would search every filling to find out
+REJECTS_REPEATS = ("iterative", "bitmask-mrv", "propagation", "techniques", "dlx")
+
+
+def solve(grid, method="propagation", progress=None, measure_memory=False, max_nodes=None, deadline=None,
+          diagonal=False, windoku=False, cages=()):
+    """Solve a grid (0 = empty) without modifying it and return a SolveResult.
+
+    Grids are 9x9, or also 16x16 and 25x25 with the ANY_SIZE_METHODS.
+    progress, if given, is called as progress(operations, depth) every few
+    thousand operations of the engine; raising SolveCancelled from it
+    abandons the solve. result.metrics holds the separate counters; with
+    measure_memory=True it also gets the peak allocation, measured with
+    tracemalloc at the price of a much slower solve.
+
+    max_nodes and deadline (a time.monotonic() value) bound the solve; they
+    are checked at the progress reports, so cost nothing in between. A solve
+    that runs past either comes back unsolved with budget_exceeded set and
+    the operations and depth reached so far. Clues that repeat a digit come
+    back unsolved at once, whatever the method. Raises ValueError for rows
+    of the wrong length and values outside 0..side.
+
+    diagonal, windoku and cages solve a variant with the propagation engine
+    (see variants.py): diagonal adds both main diagonals as units, windoku
+    the extra windows, and cages is a list of (cells, total) killer cages
+    with cells numbered row * side + col.
+    """
+    try:
+        engine = METHODS[method]
+    except KeyError:
+        raise ValueError(f"unknown solver method {method!r}, expected one of {sorted(METHODS)}") from None
+    if len(grid) != 9 and method not in ANY_SIZE_METHODS:
+        raise ValueError(f"method {method!r} only solves 9x9 grids, expected one of {list(ANY_SIZE_METHODS)}")
+    check_grid(grid)
+    if diagonal or windoku or cages:
+        if method != "propagation":
+            raise ValueError(f"variants are solved by the 'propagation' method, not {method!r}")
+        from .variants import solve_with_variants  # plain sudoku never loads the variant tables
+
+        engine = partial(solve_with_variants, diagonal=diagonal, windoku=windoku, cages=cages)
+
+    metrics = Metrics(method=method)
+    if method not in REJECTS_REPEATS and has_duplicates(grid):
+        return SolveResult(solved=False, grid=None, operations=0, max_depth=0, time_taken=0.0,
+                           method=method, metrics=metrics)
+
+    work = copy_grid(grid)
+    budget = None
+    if max_nodes is not None or deadline is not None:
+        budget = progress = Budget(max_nodes, deadline, progress)
+    start = time.perf_counter()
+    # engines that propagate also report their eliminations per rule
+    try:
+        if measure_memory:
+            outcome, metrics.peak_memory = measure_peak_memory(engine, work, progress, metrics)
+        else:
+            outcome = engine(work, progress, metrics)
+    except BudgetExceeded:
+        # the engine never got to fill in metrics, so keep what the reports said
+        time_taken = time.perf_counter() - start
+        metrics.nodes = budget.operations
+        metrics.max_depth = budget.max_depth
+        metrics.time_taken = time_taken
+        return SolveResult(solved=False, grid=None, operations=budget.operations, max_depth=budget.max_depth,
+                           time_taken=time_taken, method=method, metrics=metrics, budget_exceeded=True)
+    solved, operations, max_depth, *eliminations = outcome
+    time_taken = time.perf_counter() - start
+    metrics.solved = solved
+    metrics.time_taken = time_taken
+    return SolveResult(
+        solved=solved,
+        grid=work if solved else None,
+        operations=operations,
+        max_depth=max_depth,
+        time_taken=time_taken,
+        method=method,
+        eliminations=eliminations[0] if eliminations else {},
+        metrics=metrics,
+    )
+
+
+def count_solutions(grid, limit=2, progress=None, max_nodes=None, deadline=None):
+    """Count the solutions of a grid of any size up to limit and return a CountResult.
+
+    With the default limit of 2 this tells unique puzzles from ones with
+    no solution or several. progress, max_nodes and deadline work as for
+    solve(); a count that runs out of budget has status "budget_exceeded".
+    Clues that repeat a digit have status "none"; malformed grids raise
+    ValueError as in solve().
+    """
+    if limit < 2:
+        raise ValueError("limit must be at least 2 to tell unique puzzles apart")
+    check_grid(grid)
+    if max_nodes is not None or deadline is not None:
+        budget = progress = Budget(max_nodes, deadline, progress)
+    start = time.perf_counter()
+    try:
+        count, solution, operations = count_solutions_with_propagation(grid, limit, progress)
+    except BudgetExceeded:
+        return CountResult(0, "budget_exceeded", None, budget.operations, time.perf_counter() - start)
+    time_taken = time.perf_counter() - start
+    status = "none" if count == 0 else "unique" if count == 1 else "multiple"
+    return CountResult(count, status, solution, operations, time_taken)
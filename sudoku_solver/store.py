@@ -0,0 +1,346 @@
+# packed binary puzzle files. a store is a header and then one fixed-size
+# record per 9x9 grid: 4 bits per cell, row-major, high nibble first, so 41
+# bytes a puzzle instead of 82 as a text line. the records all have the same
+# size, so the offset of puzzle i is computed from the header rather than
+# looked up, and reads are slices of an mmap without copying. the nibbles of
+# a record are exactly the digits of its puzzle line read as hex, so packing
+# and unpacking are bytes.fromhex() and bytes.hex(). the last nibble is
+# spare and holds the record's status: 0 for a grid, else why there is none
+import mmap
+import os
+import struct
+import sys
+import time
+
+from .batch import BUDGET_EXCEEDED, INVALID, UNSOLVABLE, read_puzzles
+
+MAGIC = b"SDKS"
+VERSION = 1
+SIDE = 9  # 4 bits hold 0..15, enough for 9x9 boards only
+RECORD_SIZE = (SIDE * SIDE + 1) // 2
+
+# magic, version, side, kind, record size, puzzle count
+HEADER = struct.Struct("<4sHHHHQ")
+
+PUZZLES = 0
+SOLUTIONS = 1
+KIND_NAMES = {PUZZLES: "puzzles", SOLUTIONS: "solutions"}
+
+# record statuses, kept in the spare nibble. a record with a status other
+# than GRID is all zeros otherwise
+GRID = 0
+STATUS_OF_RESULT = {UNSOLVABLE: 1, INVALID: 2, BUDGET_EXCEEDED: 3}
+RESULT_OF_STATUS = {status: result for result, status in STATUS_OF_RESULT.items()}
+
+DIGIT_VALUE = bytes.maketrans(b"0123456789", bytes(range(10)))  # hex digit character to cell value
+LOW_NIBBLE = bytes(value & 0xF for value in range(256))  # translate table keeping the low nibble
+
+
+def pack_line(line, status=GRID):
+    # record of an 81-character puzzle line, '0' or '.' for empty cells
+    digits = line.strip().replace(".", "0")
+    if len(digits) != SIDE * SIDE or not (digits.isascii() and digits.isdigit()):
+        raise ValueError(f"a packed store holds 81-character 9x9 puzzle lines, got {line.strip()[:90]!r}")
+    return bytes.fromhex(digits + str(status))
+
+
+def pack_grid(grid, status=GRID):
+    # record of a 9x9 grid
+    if len(grid) != SIDE:
+        raise ValueError(f"a packed store holds 9x9 grids, got {len(grid)}x{len(grid)}")
+    return bytes.fromhex("".join(str(value) for row in grid for value in row) + str(status))
+
+
+def status_record(status):
+    # empty record carrying only a status
+    return bytes(RECORD_SIZE - 1) + bytes((status,))
+
+
+def unpack_grid(record):
+    # grid of a record (a grid of zeros for a status record)
+    values = record.hex().encode().translate(DIGIT_VALUE)
+    return [list(values[start:start + SIDE]) for start in range(0, SIDE * SIDE, SIDE)]
+
+
+def record_status(record):
+    return record[RECORD_SIZE - 1] & 0xF
+
+
+class StoreWriter:
+    """Writes grids to a packed store, buffering records in memory.
+
+    kind is PUZZLES or SOLUTIONS; the records are the same, the header says
+    which. The puzzle count in the header is filled in by close(). A store
+    whose writer never closed is still readable, its count taken from the
+    file size.
+
+    path may also be a binary file opened for writing, such as
+    sys.stdout.buffer. The writer leaves it open, and leaves the count at
+    0 if the file cannot seek back to the header.
+    """
+
+    __slots__ = ("file", "owned", "header", "kind", "count", "buffer", "buffer_records")
+
+    def __init__(self, path, kind=PUZZLES, buffer_records=65536):
+        self.owned = isinstance(path, (str, bytes, os.PathLike))
+        self.file = open(path, "wb") if self.owned else path
+        self.header = self.file.tell() if self.file.seekable() else None  # offset of the header
+        self.kind = kind
+        self.count = 0
+        self.buffer = []
+        self.buffer_records = buffer_records
+        self.file.write(HEADER.pack(MAGIC, VERSION, SIDE, kind, RECORD_SIZE, 0))
+
+    def _append(self, record):
+        self.buffer.append(record)
+        self.count += 1
+        if len(self.buffer) >= self.buffer_records:
+            self.flush()
+
+    def write_line(self, line):
+        """Append a puzzle line, or an INVALID status record if it is not a 9x9 puzzle line."""
+        try:
+            record = pack_line(line)
+        except ValueError:
+            record = status_record(STATUS_OF_RESULT[INVALID])
+        self._append(record)
+
+    def write_grid(self, grid):
+        self._append(pack_grid(grid))
+
+    def write_result(self, result):
+        """Append a batch result: a solution line, or one of INVALID, UNSOLVABLE and BUDGET_EXCEEDED."""
+        status = STATUS_OF_RESULT.get(result)
+        self._append(pack_line(result) if status is None else status_record(status))
+
+    def flush(self):
+        self.file.write(b"".join(self.buffer))
+        self.buffer.clear()
+
+    def close(self):
+        if self.file.closed or self.buffer is None:
+            return
+        self.flush()
+        self.buffer = None
+        if self.header is not None:
+            end = self.file.tell()
+            self.file.seek(self.header)
+            self.file.write(HEADER.pack(MAGIC, VERSION, SIDE, self.kind, RECORD_SIZE, self.count))
+            self.file.seek(end)
+        if self.owned:
+            self.file.close()
+        else:
+            self.file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class PuzzleStore:
+    """Read-only view of a packed store, mapped into memory.
+
+    store[i] is the grid of record i, line(i) its puzzle line and result(i)
+    the line or the status it was written with. records(start, stop) is a
+    memoryview of the packed records themselves, which copies nothing; an
+    engine that reads the nibbles directly (see vectorized.unpack_records)
+    never touches text at all.
+    """
+
+    __slots__ = ("path", "kind", "file", "map", "view")
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # an empty file cannot be mapped
+            self.file.close()
+            raise ValueError(f"{path} is not a packed puzzle store") from None
+        if len(self.map) < HEADER.size:
+            self.close()
+            raise ValueError(f"{path} is not a packed puzzle store")
+        magic, version, side, self.kind, record_size, _ = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION or side != SIDE or record_size != RECORD_SIZE:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} packed puzzle store")
+        count = (len(self.map) - HEADER.size) // RECORD_SIZE
+        self.view = memoryview(self.map)[HEADER.size:HEADER.size + count * RECORD_SIZE]
+
+    def __len__(self):
+        return len(self.view) // RECORD_SIZE
+
+    def record(self, index):
+        if not -len(self) <= index < len(self):
+            raise IndexError("puzzle index out of range")
+        start = index % len(self) * RECORD_SIZE
+        return self.view[start:start + RECORD_SIZE]
+
+    def records(self, start=0, stop=None):
+        """Memoryview of the packed records start..stop, without copying."""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        return self.view[start * RECORD_SIZE:max(start, stop) * RECORD_SIZE]
+
+    def __getitem__(self, index):
+        return unpack_grid(self.record(index))
+
+    def __iter__(self):
+        return self.grids()
+
+    def grids(self, start=0, stop=None):
+        # grids of records start..stop; status records come out as None. the
+        # block is converted to cell values with one hex() call
+        values = self.records(start, stop).hex().encode().translate(DIGIT_VALUE)
+        width = RECORD_SIZE * 2
+        for offset in range(0, len(values), width):
+            if values[offset + width - 1] == GRID:
+                yield [list(values[row:row + SIDE]) for row in range(offset, offset + SIDE * SIDE, SIDE)]
+            else:
+                yield None
+
+    def line(self, index):
+        return self.record(index).hex()[:SIDE * SIDE]
+
+    def result(self, index):
+        """Puzzle or solution line of a record, or the status it was written with."""
+        record = self.record(index)
+        status = record_status(record)
+        return record.hex()[:SIDE * SIDE] if status == GRID else RESULT_OF_STATUS.get(status, INVALID)
+
+    def results(self, start=0, stop=None):
+        # result() of records start..stop; one hex() call for the whole block
+        records = self.records(start, stop)
+        text = records.hex()
+        width = RECORD_SIZE * 2
+        for offset in range(0, len(text), width):
+            status = int(text[offset + width - 1], 16)
+            yield text[offset:offset + SIDE * SIDE] if status == GRID else RESULT_OF_STATUS.get(status, INVALID)
+
+    def close(self):
+        view = getattr(self, "view", None)
+        if view is not None:
+            view.release()
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class StoreSlice:
+    # puzzles start..stop of a store file, which is all a worker process
+    # needs to be sent: it maps the store itself instead of unpickling lines
+    __slots__ = ("path", "start", "stop")
+
+    def __init__(self, path, start, stop):
+        self.path = path
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getstate__(self):
+        return self.path, self.start, self.stop
+
+    def __setstate__(self, state):
+        self.path, self.start, self.stop = state
+
+    def grids(self):
+        with PuzzleStore(self.path) as store:
+            return list(store.grids(self.start, self.stop))
+
+    def boards(self):
+        # (n, 81) numpy array of the slice and the status of every record,
+        # unpacked straight from the map
+        from .vectorized import unpack_records
+
+        with PuzzleStore(self.path) as store:
+            records = store.records(self.start, self.stop)
+            try:
+                return unpack_records(records)
+            finally:
+                records.release()
+
+
+def is_store(path):
+    # whether path starts like a packed store (False for stdin and unreadable paths)
+    if path == "-":
+        return False
+    try:
+        with open(path, "rb") as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def pack_lines(lines, path, kind=PUZZLES):
+    """Write puzzle lines to a packed store and return the number written.
+
+    Blank lines and # comments are skipped; other lines that are not 9x9
+    puzzles become INVALID records, so record i is always puzzle line i.
+    """
+    with StoreWriter(path, kind) as writer:
+        for line in read_puzzles(lines):
+            writer.write_line(line)
+        return writer.count
+
+
+def unpack_lines(path, output):
+    # write the result() of every record of a store to output, one per line
+    with PuzzleStore(path) as store:
+        for start in range(0, len(store), 65536):
+            output.write("".join(result + "\n" for result in store.results(start, start + 65536)))
+        return len(store)
+
+
+def run_store(args):
+    # "store" command: pack lines into a store, unpack one, or describe one
+    start_time = time.perf_counter()
+    if args.action == "pack":
+        source = sys.stdin if args.input == "-" else open(args.input)
+        try:
+            # a store is binary, so "-" means the raw bytes of stdout
+            target = sys.stdout.buffer if args.output == "-" else args.output
+            count = pack_lines(source, target, SOLUTIONS if args.solutions else PUZZLES)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+    elif args.action == "unpack":
+        output = sys.stdout if args.output == "-" else open(args.output, "w")
+        try:
+            count = unpack_lines(args.input, output)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+    else:
+        with PuzzleStore(args.input) as store:
+            # the last byte of a record is its last cell and its status
+            statuses = bytes(store.records()[RECORD_SIZE - 1::RECORD_SIZE]).translate(LOW_NIBBLE)
+            print(f"{KIND_NAMES.get(store.kind, 'unknown')}: {len(store)} 9x9 grids, "
+                  f"{HEADER.size + len(store) * RECORD_SIZE} bytes")
+            for status in sorted(set(statuses)):
+                name = "grid" if status == GRID else RESULT_OF_STATUS.get(status, INVALID)
+                print(f"  {name}: {statuses.count(status)}")
+        return 0
+
+    elapsed = time.perf_counter() - start_time
+    rate = count / elapsed if elapsed else 0.0
+    print(f"{args.action}ed {count} puzzles in {elapsed:.3f} seconds ({rate:.0f} puzzles/sec)", file=sys.stderr)
+    return 0
+
+
+def add_store_arguments(parser):
+    parser.add_argument("action", choices=("pack", "unpack", "info"),
+                        help="pack puzzle lines into a store, unpack a store to lines, or describe a store")
+    parser.add_argument("input", help="puzzle file to pack ('-' for stdin), or the store to unpack or describe")
+    parser.add_argument("-o", "--output", default="-",
+                        help="where to write the store when packing, or the lines when unpacking "
+                             "(default: stdout)")
+    parser.add_argument("--solutions", action="store_true", help="mark a packed store as holding solutions")
+    parser.set_defaults(func=run_store)
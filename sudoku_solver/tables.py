@@ -0,0 +1,74 @@
+# precomputed index tables for the flat cell layout, cell = row * side + col.
+# boards are made of box x box subgrids, so side = box * box: 9x9 for box 3,
+# 16x16 for box 4 and 25x25 for box 5
+from functools import lru_cache
+
+
+class Geometry:
+    """Index tables of one board size, built once per box size by geometry()."""
+
+    __slots__ = ("box", "side", "cells", "full_mask", "row_of", "col_of", "subgrid_of",
+                 "units", "cell_units", "peers")
+
+    def __init__(self, box):
+        side = box * box
+        self.box = box
+        self.side = side
+        self.cells = side * side
+        self.full_mask = (1 << side) - 1
+        cells = range(self.cells)
+        self.row_of = [cell // side for cell in cells]
+        self.col_of = [cell % side for cell in cells]
+        self.subgrid_of = [(cell // (side * box)) * box + (cell % side) // box for cell in cells]
+
+        # the units: side rows, then side columns, then side subgrids
+        self.units = (
+            [tuple(row * side + col for col in range(side)) for row in range(side)]
+            + [tuple(row * side + col for row in range(side)) for col in range(side)]
+            + [tuple((box * (sub // box) + i) * side + box * (sub % box) + j for i in range(box) for j in range(box))
+               for sub in range(side)]
+        )
+
+        # row, column and subgrid unit of every cell
+        self.cell_units = [(self.row_of[cell], side + self.col_of[cell], 2 * side + self.subgrid_of[cell])
+                           for cell in cells]
+
+        # the cells that share a unit with each cell
+        self.peers = [
+            tuple(sorted({peer for unit in self.cell_units[cell] for peer in self.units[unit]} - {cell}))
+            for cell in cells
+        ]
+
+
+@lru_cache(maxsize=None)
+def geometry(box):
+    # shared tables for boards of box x box subgrids
+    return Geometry(box)
+
+
+@lru_cache(maxsize=None)
+def unit_positions(box):
+    # (unit, position of the cell in the unit) for the three units of every cell
+    tables = geometry(box)
+    return [tuple((unit, tables.units[unit].index(cell)) for unit in tables.cell_units[cell])
+            for cell in range(tables.cells)]
+
+
+def geometry_of(grid):
+    # tables for a square grid[row][col], or ValueError for other sizes
+    box = BOX_OF_SIDE.get(len(grid))
+    if box is None or any(len(row) != len(grid) for row in grid):
+        raise ValueError(f"expected a 4x4, 9x9, 16x16 or 25x25 grid, got {len(grid)} rows")
+    return geometry(box)
+
+
+BOX_OF_SIDE = {4: 2, 9: 3, 16: 4, 25: 5}
+
+# the standard 9x9 board
+STANDARD = geometry(3)
+ROW_OF = STANDARD.row_of
+COL_OF = STANDARD.col_of
+SUBGRID_OF = STANDARD.subgrid_of
+UNITS = STANDARD.units  # 9 rows, then 9 columns, then 9 subgrids
+CELL_UNITS = STANDARD.cell_units
+PEERS = STANDARD.peers  # the 20 peers of every cell
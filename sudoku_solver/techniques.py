@@ -0,0 +1,309 @@
+# elimination techniques beyond the singles and locked candidates of
+# propagation.py: naked and hidden subsets, fish (x-wing, swordfish) and
+# simple coloring. each works on the candidate masks of a Propagator and
+# removes candidates with eliminate(), so the trail undoes them like any
+# other change. they run only once the cheap rules are stuck, cheapest
+# first, and the search goes back to the cheap rules as soon as one of
+# them removes anything. every technique can be switched off and its time
+# is accounted, so the logic done before branching can be tuned against
+# the nodes it saves
+import time
+from functools import lru_cache
+from itertools import combinations
+
+from .propagation import RULES, Propagator
+from .tables import geometry, unit_positions
+
+# in the order they are tried, roughly by cost
+TECHNIQUES = (
+    "naked_pairs",
+    "hidden_pairs",
+    "x_wing",
+    "naked_triples",
+    "hidden_triples",
+    "swordfish",
+    "simple_coloring",
+    "naked_quads",
+    "hidden_quads",
+)
+
+# what the "techniques" engine enables by default, picked with
+# benchmark.benchmark_techniques: on 16x16 boards these two cut the nodes by
+# about 97% and the time per puzzle about tenfold, and more techniques cost
+# more than they save. on 9x9 boards no technique pays for its time, so the
+# plain propagation engine stays the faster choice there
+DEFAULT_TECHNIQUES = ("naked_triples", "hidden_quads")
+
+
+@lru_cache(maxsize=None)
+def peer_sets(box):
+    # the peers of every cell as a frozenset
+    return [frozenset(peers) for peers in geometry(box).peers]
+
+
+def unit_places(possibilities, tables):
+    # places[unit * side + digit - 1]: positions in the unit where digit can
+    # still go, from the candidate masks
+    side = tables.side
+    places = [0] * (len(tables.units) * side)
+    for cell, positions in enumerate(unit_positions(tables.box)):
+        mask = possibilities[cell]
+        while mask:
+            bit = mask & -mask
+            mask ^= bit
+            digit = bit.bit_length() - 1
+            for unit, position in positions:
+                places[unit * side + digit] |= 1 << position
+    return places
+
+
+# the scans below only find the patterns; the engine here removes every
+# candidate they rule out, hints.py explains the first one
+
+def find_naked_subsets(possibilities, units, size):
+    """(unit, cells, digit mask, empty cells of the unit) for every naked subset.
+
+    size cells of a unit with only size candidates between them: those
+    digits go nowhere else in the unit. The candidates are read as the
+    scan goes, so it sees what the caller removed in between.
+    """
+    for unit, cells in enumerate(units):
+        empty = [cell for cell in cells if possibilities[cell]]
+        if len(empty) <= size:
+            continue
+        small = [cell for cell in empty if possibilities[cell].bit_count() <= size]
+        for subset in combinations(small, size):
+            union = 0
+            for cell in subset:
+                union |= possibilities[cell]
+            if union.bit_count() == size:
+                yield unit, subset, union, empty
+
+
+def find_hidden_subsets(places, units, side, size):
+    """(unit, digits, position mask) for every hidden subset, digits 0-based.
+
+    size digits confined to size cells of a unit: those cells hold nothing
+    else. places is laid out as unit_places() returns it.
+    """
+    for unit in range(len(units)):
+        base = unit * side
+        open_digits = [digit for digit in range(side) if places[base + digit]]
+        if len(open_digits) <= size:
+            continue
+        few = [digit for digit in open_digits if places[base + digit].bit_count() <= size]
+        for subset in combinations(few, size):
+            union = 0
+            for digit in subset:
+                union |= places[base + digit]
+            if union.bit_count() == size:
+                yield unit, subset, union
+
+
+def find_fish(places, side, size):
+    """(base, digit, lines, crossing mask) for every fish, digit 0-based.
+
+    A digit confined to size columns within size rows can be removed from
+    the rest of those columns, and the same with rows and columns swapped
+    (size 2 is the x-wing, 3 the swordfish). base is 0 when lines are rows
+    and side when they are columns; the crossing lines are the units
+    side - base + line for the set bits of the mask.
+    """
+    for base in (0, side):
+        for digit in range(side):
+            lines = [line for line in range(side) if 2 <= places[(base + line) * side + digit].bit_count() <= size]
+            for subset in combinations(lines, size):
+                union = 0
+                for line in subset:
+                    union |= places[(base + line) * side + digit]
+                if union.bit_count() == size:
+                    yield base, digit, subset, union
+
+
+def _remove(state, name, cell, bits):
+    # eliminate bits from cell, counting them for name; False on a contradiction
+    removed = state.possibilities[cell] & bits
+    if not removed:
+        return True
+    state.counts[name] += removed.bit_count()
+    return state.eliminate(cell, removed)
+
+
+def naked_subsets(state, size, name):
+    possibilities = state.possibilities
+    for _, subset, union, empty in find_naked_subsets(possibilities, state.tables.units, size):
+        for cell in empty:
+            if cell not in subset and possibilities[cell] & union:
+                if not _remove(state, name, cell, union):
+                    return False
+    return True
+
+
+def hidden_subsets(state, size, name):
+    possibilities, tables = state.possibilities, state.tables
+    places = unit_places(possibilities, tables)
+    for unit, digits, union in find_hidden_subsets(places, tables.units, tables.side, size):
+        keep = 0
+        for digit in digits:
+            keep |= 1 << digit
+        cells = tables.units[unit]
+        for position in range(tables.side):
+            if union >> position & 1:
+                cell = cells[position]
+                if possibilities[cell] & ~keep and not _remove(state, name, cell, ~keep & tables.full_mask):
+                    return False
+    return True
+
+
+def fish(state, size, name):
+    possibilities, tables = state.possibilities, state.tables
+    side, units = tables.side, tables.units
+    for base, digit, lines, union in find_fish(unit_places(possibilities, tables), side, size):
+        bit = 1 << digit
+        cover = side - base  # the crossing lines: columns for rows, rows for columns
+        for crossing in range(side):
+            if union >> crossing & 1:
+                for position, cell in enumerate(units[cover + crossing]):
+                    if position not in lines and possibilities[cell] & bit:
+                        if not _remove(state, name, cell, bit):
+                            return False
+    return True
+
+
+def simple_coloring(state, name):
+    # for each digit, chains of conjugate pairs (the only two places of the
+    # digit in a unit) alternate between true and false. a color seen twice
+    # in one unit is false everywhere, and a cell that sees both colors of
+    # a chain cannot hold the digit
+    possibilities, tables = state.possibilities, state.tables
+    side, units = tables.side, tables.units
+    peers = peer_sets(tables.box)
+    places = unit_places(possibilities, tables)
+    for digit in range(side):
+        bit = 1 << digit
+        holders = [cell for cell in range(tables.cells) if possibilities[cell] & bit]
+        links = {}
+        for unit in range(3 * side):
+            positions = places[unit * side + digit]
+            if positions.bit_count() == 2:
+                first = units[unit][(positions & -positions).bit_length() - 1]
+                second = units[unit][positions.bit_length() - 1]
+                links.setdefault(first, []).append(second)
+                links.setdefault(second, []).append(first)
+        colored = set()
+        for start in links:
+            if start in colored:
+                continue
+            colors = ({start}, set())
+            colored.add(start)
+            stack = [(start, 0)]
+            while stack:
+                cell, color = stack.pop()
+                for other in links[cell]:
+                    if other not in colored:
+                        colored.add(other)
+                        colors[1 - color].add(other)
+                        stack.append((other, 1 - color))
+            # color wrap: two cells of one color see each other
+            for color in colors:
+                if any(peers[cell] & color for cell in color):
+                    for cell in color:
+                        if not _remove(state, name, cell, bit):
+                            return False
+                    break
+            else:
+                # color trap: an outside cell sees both colors
+                for cell in holders:
+                    if possibilities[cell] & bit and cell not in colors[0] and cell not in colors[1]:
+                        if peers[cell] & colors[0] and peers[cell] & colors[1]:
+                            if not _remove(state, name, cell, bit):
+                                return False
+    return True
+
+
+def _technique(name):
+    # the function applying the named technique to a state
+    if name == "simple_coloring":
+        return lambda state: simple_coloring(state, name)
+    size = {"pairs": 2, "triples": 3, "quads": 4}.get(name.split("_")[-1])
+    if name.startswith("naked_"):
+        return lambda state: naked_subsets(state, size, name)
+    if name.startswith("hidden_"):
+        return lambda state: hidden_subsets(state, size, name)
+    return lambda state: fish(state, 2 if name == "x_wing" else 3, name)
+
+
+TECHNIQUE_FUNCTIONS = {name: _technique(name) for name in TECHNIQUES}
+
+
+class TechniquePropagator(Propagator):
+    """Propagator that applies the TECHNIQUES enabled by use() when the basic rules are stuck.
+
+    calls and seconds count, per technique, how often it ran and the time
+    it took; its eliminations are counted in counts next to the basic rules.
+    """
+
+    __slots__ = ("techniques", "calls", "seconds")
+
+    def __init__(self, values, possibilities, tables=None):
+        super().__init__(values, possibilities, tables)
+        self.techniques = []  # none until use()
+        self.calls = {}
+        self.seconds = {}
+
+    def use(self, techniques):
+        """Enable only the given techniques (names from TECHNIQUES), tried in TECHNIQUES order."""
+        unknown = set(techniques) - set(TECHNIQUES)
+        if unknown:
+            raise ValueError(f"unknown techniques {sorted(unknown)}, expected some of {list(TECHNIQUES)}")
+        self.techniques = [(name, TECHNIQUE_FUNCTIONS[name]) for name in TECHNIQUES if name in techniques]
+        self.calls = {name: 0 for name, _ in self.techniques}
+        self.seconds = {name: 0.0 for name, _ in self.techniques}
+        for name in TECHNIQUES:
+            if name in self.calls:
+                self.counts.setdefault(name, 0)
+            else:
+                self.counts.pop(name, None)
+
+    def propagate(self):
+        # the basic rules to a fixpoint, then the techniques in order until
+        # one of them changes something, which sends it back to the rules
+        basic = Propagator.propagate
+        calls, seconds, perf_counter = self.calls, self.seconds, time.perf_counter
+        while True:
+            if not basic(self):
+                return False
+            for name, apply in self.techniques:
+                start = perf_counter()
+                consistent = apply(self)
+                seconds[name] += perf_counter() - start
+                calls[name] += 1
+                if not consistent:
+                    return False
+                if self.queue:
+                    break  # a candidate went; singles first again
+            else:
+                return True
+
+
+def solve_with_techniques(grid, progress=None, metrics=None, techniques=DEFAULT_TECHNIQUES):
+    """Solve grid in place like solve_with_propagation, with the given techniques enabled.
+
+    Returns (solved, operations, max_depth, eliminations); eliminations
+    counts the basic rules and every enabled technique. metrics, a Metrics,
+    also gets the seconds spent in each technique.
+    """
+    state = TechniquePropagator.from_grid(grid)
+    if state is None:
+        return False, 0, 0, {rule: 0 for rule in RULES + tuple(techniques)}
+    state.use(techniques)
+    solved = False
+    for _ in state.search(progress):
+        state.write_grid(grid)
+        solved = True
+        break
+    if metrics is not None:
+        live = state.depth if solved else 0
+        metrics.count(state.operations, 0, state.operations - live, state.max_depth, state.counts)
+        metrics.rule_seconds = dict(state.seconds)
+    return solved, state.operations, state.max_depth, state.counts
@@ -0,0 +1,234 @@
+# step-by-step solve traces in a compact append-only binary file. a 16-byte
+# header (magic, version, board side, event count) and the clues (one byte
+# per cell) are followed by fixed 8-byte records:
+#
+#   kind (u8), digit (u8), cell (u16), data (u32), little-endian
+#
+# PLACE      digit placed in cell (data: branch placements so far with
+#            propagation, recursion depth with bitmask)
+# ELIMINATE  candidates removed from cell (data: the removed mask)
+# BRANCH     the search branches on cell (data: its candidate mask)
+# BACKTRACK  the placement of digit in cell undone (data: as for PLACE)
+#
+# records are packed into a preallocated buffer and written in blocks, and
+# readers map the file instead of loading it, so traces of millions of events
+# never become python lists. recording happens only in TracingPropagator and
+# in the hooks solve_sudoku_recursive_with_bitmask installs when given a
+# writer; ordinary solves never see any of this
+import mmap
+import struct
+import sys
+from collections import Counter
+
+from .bitmask import solve_sudoku_recursive_with_bitmask
+from .grid import format_line, parse_line
+from .propagation import Propagator
+
+MAGIC = b"SDKT"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQ")
+RECORD = struct.Struct("<BBHI")
+ITER_BLOCK_RECORDS = 65536  # records copied out of the map at a time by TraceReader iteration
+
+PLACE, ELIMINATE, BRANCH, BACKTRACK = 1, 2, 3, 4
+KIND_NAMES = {PLACE: "place", ELIMINATE: "eliminate", BRANCH: "branch", BACKTRACK: "backtrack"}
+
+TRACE_METHODS = ("propagation", "bitmask")  # engines that can record a trace
+
+
+class TraceWriter:
+    """Append trace records for a solve of grid to the file at path."""
+
+    def __init__(self, path, grid, buffer_records=65536):
+        self.side = len(grid)
+        self.count = 0
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, self.side, 0))
+        self.file.write(bytes(value for row in grid for value in row))
+        self.buffer = bytearray(RECORD.size * buffer_records)
+        self.offset = 0
+
+    def record(self, kind, cell, digit=0, data=0):
+        RECORD.pack_into(self.buffer, self.offset, kind, digit, cell, data)
+        self.offset += RECORD.size
+        self.count += 1
+        if self.offset == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        self.file.write(memoryview(self.buffer)[:self.offset])
+        self.offset = 0
+
+    def close(self):
+        # write the remaining records and the final count into the header
+        if self.file.closed:
+            return
+        self.flush()
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, self.side, self.count))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TraceReader:
+    """Memory-mapped view of a trace file.
+
+    Supports len(), indexing and iteration over (kind, digit, cell, data)
+    tuples without reading the records into memory.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as source:
+            self.map = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.side, _ = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.map.close()
+            raise ValueError(f"{path} is not a version {VERSION} solve trace")
+        self.start = HEADER.size + self.side * self.side
+        # the records are counted from the file size, so a trace whose writer
+        # never got to close (and fill in the header count) still reads
+        self.count = (len(self.map) - self.start) // RECORD.size
+
+    @property
+    def grid(self):
+        # the clues the traced solve started from
+        side, cells = self.side, self.map[HEADER.size:self.start]
+        return [list(cells[row * side:row * side + side]) for row in range(side)]
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("trace index out of range")
+        return RECORD.unpack_from(self.map, self.start + index * RECORD.size)
+
+    def __iter__(self):
+        # records are unpacked from copied blocks rather than a view of the
+        # map, which would keep close() from unmapping it while an iteration
+        # is left unfinished
+        end = self.start + self.count * RECORD.size
+        step = RECORD.size * ITER_BLOCK_RECORDS
+        for offset in range(self.start, end, step):
+            yield from RECORD.iter_unpack(self.map[offset:min(offset + step, end)])
+
+    def close(self):
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TracingPropagator(Propagator):
+    """Propagator that writes every placement, elimination, branch and undo to a TraceWriter.
+
+    The records are derived from the trail after each base-class step, so
+    the untraced Propagator keeps its inner loops unchanged.
+    """
+
+    __slots__ = ("writer",)
+
+    def __init__(self, values, possibilities, tables=None):
+        super().__init__(values, possibilities, tables)
+        self.writer = None
+
+    def assign(self, cell, bit):
+        height = len(self.trail)
+        result = super().assign(cell, bit)
+        record, shift = self.writer.record, self.shift
+        record(PLACE, cell, bit.bit_length(), self.operations)
+        for entry in self.trail[height + 1:]:
+            record(ELIMINATE, entry >> shift, 0, bit)
+        return result
+
+    def eliminate(self, cell, bits):
+        removed = self.possibilities[cell] & bits
+        result = super().eliminate(cell, bits)
+        if removed:
+            self.writer.record(ELIMINATE, cell, 0, removed)
+        return result
+
+    def select_cell(self):
+        cell = super().select_cell()
+        if cell >= 0:
+            self.writer.record(BRANCH, cell, 0, self.possibilities[cell])
+        return cell
+
+    def undo(self, height):
+        # every cell filled since height is emptied again: those are the
+        # filled cells with a non-zero mask among the entries popped
+        values, shift, low = self.values, self.shift, (1 << self.shift) - 1
+        cleared = set()
+        for entry in reversed(self.trail[height:]):
+            cell = entry >> shift
+            if entry & low and values[cell] and cell not in cleared:
+                cleared.add(cell)
+                self.writer.record(BACKTRACK, cell, values[cell], self.operations)
+        super().undo(height)
+
+
+def record_trace(grid, path, method="propagation", progress=None):
+    """Solve a copy of grid while writing its trace to path. Returns (solved, events).
+
+    progress is passed on to the engine, so a recording can be cancelled
+    like any other solve; the records written until then stay readable.
+    """
+    grid = [list(row) for row in grid]
+    if method not in TRACE_METHODS:
+        raise ValueError(f"cannot trace method {method!r}, expected one of {list(TRACE_METHODS)}")
+    with TraceWriter(path, grid) as writer:
+        if method == "bitmask":
+            solved = solve_sudoku_recursive_with_bitmask(grid, progress, trace=writer)[0]
+        else:
+            state = TracingPropagator.from_grid(grid)
+            solved = False
+            if state is not None:
+                state.writer = writer
+                for _ in state.search(progress):
+                    solved = True
+                    break
+        return solved, writer.count
+
+
+def summarize(reader):
+    # events of each kind in a trace, streamed from the mapped file
+    kinds = Counter(kind for kind, _, _, _ in reader)
+    return {name: kinds[kind] for kind, name in KIND_NAMES.items()}
+
+
+def run_trace(args):
+    # "trace" command: record a solve, or summarize a recorded trace
+    if args.action == "record":
+        try:
+            grid = parse_line(args.puzzle)
+        except ValueError:
+            with open(args.puzzle) as source:
+                grid = parse_line(next(line for line in source if line.strip() and not line.startswith("#")))
+        solved, events = record_trace(grid, args.output, args.method)
+        print(f"{'solved' if solved else 'no solution'}, {events} events written to {args.output}", file=sys.stderr)
+        return 0 if solved else 1
+
+    with TraceReader(args.puzzle) as reader:
+        print(f"puzzle: {format_line(reader.grid)}")
+        print(f"events: {len(reader)}")
+        for name, count in summarize(reader).items():
+            print(f"{name:>10}: {count}")
+    return 0
+
+
+def add_trace_arguments(parser):
+    parser.add_argument("action", choices=("record", "info"), help="record a new trace or summarize one")
+    parser.add_argument("puzzle", help="record: puzzle line or file (its first puzzle); info: trace file")
+    parser.add_argument("-o", "--output", default="solve.trace", help="trace file to write (default: solve.trace)")
+    parser.add_argument("-m", "--method", default="propagation", choices=TRACE_METHODS)
+    parser.set_defaults(func=run_trace)
@@ -0,0 +1,137 @@
+# consistency checks of grids and claimed solutions with digit masks. a grid
+# is consistent when no row, column or subgrid repeats a digit, and a
+# solution also has every cell filled. the result names the first offending
+# unit, so a bad record says where it went wrong. files of puzzles are
+# checked in blocks, with numpy over whole blocks if --vectorized is given
+import sys
+import time
+from functools import lru_cache
+from operator import itemgetter
+
+from .batch import read_puzzles
+from .grid import parse_line
+from .tables import geometry, geometry_of
+
+VALID = "valid"
+INVALID = "invalid"  # not a puzzle line
+
+BLOCK_SIZE = 65536  # lines checked at a time by validate_lines
+BIT_OF_VALUE = [0] + [1 << value for value in range(1, 26)]  # digit bit, 0 for an empty cell
+
+
+@lru_cache(maxsize=None)
+def _unit_getters(box):
+    # one itemgetter per unit, picking the unit's cells out of a flat list
+    return [itemgetter(*unit) for unit in geometry(box).units]
+
+
+def find_conflict(grid, complete=False):
+    """Index into the board's units of the first unit that repeats a digit, or None.
+
+    With complete=True a unit with an empty cell is a conflict too, which
+    checks a claimed solution. A value outside 0..side makes its row a
+    conflict. Units are numbered as in tables.py: rows, columns, subgrids.
+    """
+    tables = geometry_of(grid)
+    side = tables.side
+    full = tables.full_mask << 1
+    bad_row = None
+    bits = []
+    for row, values in enumerate(grid):
+        for value in values:
+            if 0 <= value <= side:
+                bits.append(BIT_OF_VALUE[value])
+            else:
+                bits.append(0)
+                if bad_row is None:
+                    bad_row = row
+    # the bits of distinct digits add up without carries, so a unit repeats
+    # a digit exactly when its sum has fewer bits than it has filled cells
+    for index, get in enumerate(_unit_getters(tables.box)):
+        if index == bad_row:
+            return index
+        unit_bits = get(bits)
+        total = sum(unit_bits)
+        if total.bit_count() + unit_bits.count(0) != side or complete and total != full:
+            return index
+    return None
+
+
+def unit_name(unit, side=9):
+    # "row 3", "column 5" or "subgrid 9" (1-based) for a unit index
+    kind, number = divmod(unit, side)
+    return f"{('row', 'column', 'subgrid')[kind]} {number + 1}"
+
+
+def validate_lines(lines, complete=False, vectorized=False):
+    """Check puzzle lines, yielding VALID, INVALID or the name of the offending unit for each.
+
+    With vectorized=True (requires numpy) 9x9 lines are checked a block at
+    a time with vectorized.validate_array; other lines one by one.
+    """
+    block = []
+    for line in lines:
+        block.append(line)
+        if len(block) == BLOCK_SIZE:
+            yield from _validate_block(block, complete, vectorized)
+            block = []
+    if block:
+        yield from _validate_block(block, complete, vectorized)
+
+
+def _validate_block(lines, complete, vectorized):
+    # results of one block of lines, in order
+    results = [None] * len(lines)
+    if vectorized:
+        from .vectorized import parse_lines, validate_array
+
+        simple = [index for index, line in enumerate(lines)
+                  if len(line) == 81 and line.replace(".", "0").isdigit()]
+        if simple:
+            units = validate_array(parse_lines([lines[index] for index in simple]), complete)
+            for index, unit in zip(simple, units.tolist()):
+                results[index] = VALID if unit < 0 else unit_name(unit)
+    for index, line in enumerate(lines):
+        if results[index] is None:
+            try:
+                grid = parse_line(line)
+            except ValueError:
+                results[index] = INVALID
+                continue
+            unit = find_conflict(grid, complete)
+            results[index] = VALID if unit is None else unit_name(unit, len(grid))
+    return results
+
+
+def run_validate(args):
+    # "validate" command: one result line per puzzle line
+    source = sys.stdin if args.input == "-" else open(args.input)
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    valid = total = 0
+    start_time = time.perf_counter()
+    try:
+        for result in validate_lines(read_puzzles(source), args.solutions, args.vectorized):
+            total += 1
+            valid += result == VALID
+            output.write(result + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+
+    elapsed = time.perf_counter() - start_time
+    rate = total / elapsed if elapsed else 0.0
+    print(f"{valid}/{total} {'solutions' if args.solutions else 'grids'} valid in {elapsed:.3f} seconds "
+          f"({rate:.0f} per sec)", file=sys.stderr)
+    return 0 if valid == total else 1
+
+
+def add_validate_arguments(parser):
+    parser.add_argument("input", help="file of puzzle or solution lines ('-' for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="where to write the results (default: stdout)")
+    parser.add_argument("--solutions", action="store_true",
+                        help="the lines are claimed solutions: every cell must be filled")
+    parser.add_argument("--vectorized", action="store_true",
+                        help="check 9x9 lines in blocks with numpy (requires numpy)")
+    parser.set_defaults(func=run_validate)
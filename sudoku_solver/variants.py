@@ -0,0 +1,176 @@
+# sudoku variants on top of the propagation engine. extra all-different
+# units (the two diagonals, windoku windows) are appended to the units and
+# peers tables, so naked and hidden singles and the inner assign loop treat
+# them exactly like rows, columns and subgrids. killer cages are all-different
+# groups of cells with a fixed sum; they only add peers and are pruned with
+# precomputed tables of the digit combinations that reach each sum. plain
+# sudoku never goes through this module
+from functools import lru_cache
+from itertools import combinations
+
+from .propagation import RULES, Propagator
+from .solver import solve
+from .tables import BOX_OF_SIDE, Geometry
+
+
+def diagonal_units(side=9):
+    # the main diagonal and the anti-diagonal
+    return [tuple(i * side + i for i in range(side)), tuple(i * side + side - 1 - i for i in range(side))]
+
+
+def windoku_units(box=3):
+    # the extra windows of windoku: box x box squares one cell in from the
+    # edges with one cell between them, four of them on a 9x9 board
+    side = box * box
+    starts = [1 + k * (box + 1) for k in range(box - 1)]
+    return [tuple((top + i) * side + left + j for i in range(box) for j in range(box))
+            for top in starts for left in starts]
+
+
+@lru_cache(maxsize=None)
+def cage_combinations(side, size, total):
+    # candidate masks of the sets of size distinct digits that sum to total
+    return tuple(
+        sum(1 << (digit - 1) for digit in digits)
+        for digits in combinations(range(1, side + 1), size)
+        if sum(digits) == total
+    )
+
+
+class VariantGeometry(Geometry):
+    """Index tables of a board with extra all-different units and killer cages.
+
+    units and cell_units gain the extra units after the rows, columns and
+    subgrids; peers gain every cell that shares an extra unit or a cage.
+    cages is a list of (cells, total, combinations).
+    """
+
+    __slots__ = ("cages",)
+
+    def __init__(self, box, extra_units=(), cages=()):
+        super().__init__(box)
+        side = self.side
+        for unit in extra_units:
+            if len(unit) != side or len(set(unit)) != side:
+                raise ValueError(f"an extra unit must have {side} distinct cells, got {unit!r}")
+        self.cages = []
+        for cells, total in cages:
+            cells = tuple(cells)
+            if (not cells or len(set(cells)) != len(cells) or len(cells) > side
+                    or not all(0 <= cell < self.cells for cell in cells)):
+                raise ValueError(f"a cage must have 1 to {side} distinct cells of the board, got {cells!r}")
+            self.cages.append((cells, total, cage_combinations(side, len(cells), total)))
+
+        first = len(self.units)
+        self.units = self.units + [tuple(unit) for unit in extra_units]
+        cell_units = [list(units) for units in self.cell_units]
+        for index, unit in enumerate(self.units[first:], first):
+            for cell in unit:
+                cell_units[cell].append(index)
+        self.cell_units = [tuple(units) for units in cell_units]
+
+        peers = [set(cell_peers) for cell_peers in self.peers]
+        for group in list(self.units[first:]) + [cells for cells, _, _ in self.cages]:
+            for cell in group:
+                peers[cell].update(group)
+        self.peers = [tuple(sorted(cell_peers - {cell})) for cell, cell_peers in enumerate(peers)]
+
+
+class VariantPropagator(Propagator):
+    """Propagator that also keeps every killer cage on a digit combination
+    reaching its sum."""
+
+    __slots__ = ()
+
+    def __init__(self, values, possibilities, tables=None):
+        super().__init__(values, possibilities, tables)
+        self.counts["cage_combinations"] = 0
+
+    def _prune_cage(self, cells, combos):
+        # remove candidates no remaining combination of the cage can use
+        values, possibilities = self.values, self.possibilities
+        placed = empty = 0
+        filled = 0
+        for cell in cells:
+            mask = possibilities[cell]
+            if mask:
+                empty |= mask
+            else:
+                placed |= 1 << (values[cell] - 1)
+                filled += 1
+        if placed.bit_count() != filled:
+            return False  # a digit repeated inside the cage
+        if filled == len(cells):
+            return placed in combos
+        allowed = 0
+        for combo in combos:
+            if combo & placed == placed and not (combo ^ placed) & ~empty:
+                allowed |= combo ^ placed
+        if not allowed:
+            return False  # no combination fits the digits left
+        for cell in cells:
+            removed = possibilities[cell] & ~allowed
+            if removed:
+                self.counts["cage_combinations"] += removed.bit_count()
+                if not self.eliminate(cell, removed):
+                    return False
+        return True
+
+    def propagate(self):
+        """Alternate unit propagation and cage pruning until neither changes anything."""
+        propagate_units, prune_cage = super().propagate, self._prune_cage
+        cages = self.tables.cages
+        while True:
+            if not propagate_units():
+                return False
+            for cells, _, combos in cages:
+                if not prune_cage(cells, combos):
+                    return False
+            if not self.queue:
+                return True
+
+
+def variant_tables(size=9, diagonal=False, windoku=False, cages=()):
+    # VariantGeometry for a size x size board with the chosen constraints
+    if size not in BOX_OF_SIDE:
+        raise ValueError(f"expected a 4x4, 9x9, 16x16 or 25x25 board, got {size}x{size}")
+    box = BOX_OF_SIDE[size]
+    extra_units = []
+    if diagonal:
+        extra_units += diagonal_units(size)
+    if windoku:
+        extra_units += windoku_units(box)
+    return VariantGeometry(box, extra_units, cages)
+
+
+def solve_with_variants(grid, progress=None, metrics=None, diagonal=False, windoku=False, cages=()):
+    """Solve a variant grid in place. Returns (solved, operations, max_depth, eliminations).
+
+    The engine behind solve() when a variant option is given; the results
+    and progress and metrics arguments are those of solve_with_propagation,
+    and eliminations also counts the candidates cage pruning removed.
+    """
+    state = VariantPropagator.from_grid(grid, variant_tables(len(grid), diagonal, windoku, cages))
+    if state is None:
+        return False, 0, 0, dict.fromkeys(RULES + ("cage_combinations",), 0)
+    solved = False
+    for _ in state.search(progress):
+        state.write_grid(grid)
+        solved = True
+        break
+    if metrics is not None:
+        live = state.depth if solved else 0
+        metrics.count(state.operations, 0, state.operations - live, state.max_depth, state.counts)
+    return solved, state.operations, state.max_depth, state.counts
+
+
+def solve_variant(grid, diagonal=False, windoku=False, cages=(), **options):
+    """Solve a variant without modifying grid and return a SolveResult.
+
+    diagonal adds both main diagonals as units and windoku the extra
+    windows. cages is a list of (cells, total) killer cages, with cells as
+    flat indexes row * side + col; the digits of a cage never repeat.
+    Other keyword arguments (progress, measure_memory, max_nodes, deadline)
+    go to solve().
+    """
+    return solve(grid, diagonal=diagonal, windoku=windoku, cages=cages, **options)
@@ -0,0 +1,167 @@
+# vectorized propagation of many boards at once with numpy (an optional
+# dependency: nothing else in the package imports this module). boards are
+# the rows of an (N, 81) array and candidates are the same uint16 masks the
+# scalar engines use. naked and hidden singles are applied to every board in
+# one array operation per step; boards they cannot finish go to a scalar solver
+import numpy as np
+
+from .solver import METHODS
+from .tables import CELL_UNITS, UNITS
+
+FULL_MASK = (1 << 9) - 1
+
+UNIT_INDEX = np.array(UNITS, dtype=np.intp)  # (27, 9) cells of every unit
+CELL_UNIT_INDEX = np.array(CELL_UNITS, dtype=np.intp)  # (81, 3) units of every cell
+# position of every cell in UNIT_INDEX[9 * k:9 * k + 9].ravel(), for the
+# rows (k = 0), columns (k = 1) and subgrids (k = 2)
+CELL_POSITION = [np.argsort(UNIT_INDEX[9 * k:9 * k + 9].ravel()) for k in range(3)]
+
+BIT_OF_VALUE = np.array([0] + [1 << digit for digit in range(9)], dtype=np.uint16)
+VALUE_OF_BIT = np.zeros(1 << 9, dtype=np.uint8)
+VALUE_OF_BIT[BIT_OF_VALUE[1:]] = np.arange(1, 10, dtype=np.uint8)
+POPCOUNT = np.array([bin(mask).count("1") for mask in range(1 << 9)], dtype=np.uint8)
+
+
+def parse_lines(lines):
+    """(N, 81) uint8 array of boards from 81-character lines, '0' or '.' for empty cells."""
+    data = np.frombuffer("".join(line.strip() for line in lines).encode("ascii"), dtype=np.uint8)
+    if data.size % 81:
+        raise ValueError("every puzzle line must have exactly 81 characters")
+    boards = data.reshape(-1, 81).copy()
+    boards[boards == ord(".")] = ord("0")
+    boards -= ord("0")
+    if (boards > 9).any():
+        raise ValueError("puzzle lines may only contain digits and '.'")
+    return boards
+
+
+def unpack_records(records):
+    """Boards and statuses of the packed records of a store (see store.py).
+
+    Returns an (N, 81) uint8 array of boards and the (N,) status of every
+    record, 0 for a grid. records is any buffer of whole records, such as a
+    memoryview of a PuzzleStore; it is read in place, so the only copy made
+    is the result.
+    """
+    packed = np.frombuffer(records, dtype=np.uint8).reshape(-1, 41)
+    cells = np.empty((len(packed), 82), dtype=np.uint8)
+    np.right_shift(packed, 4, out=cells[:, 0::2])
+    np.bitwise_and(packed, 0xF, out=cells[:, 1::2])
+    return np.ascontiguousarray(cells[:, :81]), cells[:, 81].copy()
+
+
+def _propagate_step(values):
+    # one round of singles on a (n, 81) block of boards. returns the bits
+    # to place in every cell (0 where nothing is forced) and which boards
+    # are contradictory
+    count = len(values)
+    bits = BIT_OF_VALUE[values]
+    unit_bits = bits[:, UNIT_INDEX]  # (n, 27, 9)
+    placed = np.bitwise_or.reduce(unit_bits, axis=2)  # (n, 27)
+
+    # a digit placed twice in a unit
+    dead = ((unit_bits != 0).sum(axis=2) != POPCOUNT[placed]).any(axis=1)
+
+    # candidates: digits not yet placed in the row, column or subgrid
+    seen = (placed[:, CELL_UNIT_INDEX[:, 0]] | placed[:, CELL_UNIT_INDEX[:, 1]]
+            | placed[:, CELL_UNIT_INDEX[:, 2]])
+    empty = values == 0
+    candidates = np.where(empty, FULL_MASK & ~seen, 0).astype(np.uint16)
+    dead |= (empty & (candidates == 0)).any(axis=1)
+
+    # naked singles: a cell with one candidate
+    naked = (candidates != 0) & ((candidates & (candidates - 1)) == 0)
+
+    # hidden singles: a digit with one place left in a unit
+    unit_candidates = candidates[:, UNIT_INDEX]  # (n, 27, 9)
+    once = np.zeros((count, 27), dtype=np.uint16)
+    twice = np.zeros((count, 27), dtype=np.uint16)
+    for k in range(9):
+        mask = unit_candidates[:, :, k]
+        twice |= once & mask
+        once |= mask
+    dead |= ((once | placed) != FULL_MASK).any(axis=1)  # a digit with no place left
+    hidden_in_unit = unit_candidates & (once & ~twice)[:, :, None]
+    hidden = np.zeros((count, 81), dtype=np.uint16)
+    for k in range(3):
+        hidden |= hidden_in_unit[:, 9 * k:9 * k + 9, :].reshape(count, 81)[:, CELL_POSITION[k]]
+    dead |= ((hidden & (hidden - 1)) != 0).any(axis=1)  # one cell forced to two digits
+
+    forced = np.where(naked, candidates, hidden)
+    forced[dead] = 0
+    return forced, dead
+
+
+def validate_array(boards, complete=False, block_size=65536):
+    """First offending unit of every board in an (N, 81) or (N, 9, 9) array.
+
+    Returns an (N,) int array: -1 for a consistent board, otherwise the
+    index of the first unit (rows, then columns, then subgrids) that
+    repeats a digit, or with complete=True also misses one. A value above 9
+    makes its row the offending unit. Boards are checked block_size at a
+    time to bound the temporary arrays.
+    """
+    values = np.asarray(boards).reshape(-1, 81)
+    result = np.empty(len(values), dtype=np.intp)
+    for start in range(0, len(values), block_size):
+        block = values[start:start + block_size]
+        out_of_range = (block > 9) | (block < 0)
+        bits = BIT_OF_VALUE[np.where(out_of_range, 0, block)]
+        unit_bits = bits[:, UNIT_INDEX]  # (n, 27, 9)
+        placed = np.bitwise_or.reduce(unit_bits, axis=2)  # (n, 27)
+        # a digit placed twice shows up as fewer mask bits than filled cells
+        bad = (unit_bits != 0).sum(axis=2) != POPCOUNT[placed]
+        if complete:
+            bad |= placed != FULL_MASK
+        bad[:, :9] |= out_of_range.reshape(-1, 9, 9).any(axis=2)
+        result[start:start + len(block)] = np.where(bad.any(axis=1), bad.argmax(axis=1), -1)
+    return result
+
+
+def propagate_array(boards):
+    """Apply singles to an (N, 81) array of boards until nothing changes.
+
+    Returns (values, dead): the propagated boards as a new uint8 array and
+    a boolean array marking boards whose clues are contradictory.
+    """
+    values = np.array(boards, dtype=np.uint8).reshape(-1, 81)
+    dead = np.zeros(len(values), dtype=bool)
+    active = np.arange(len(values))  # boards that changed in the last step
+    while len(active):
+        block = values[active]
+        forced, block_dead = _propagate_step(block)
+        dead[active[block_dead]] = True
+        changed = forced.any(axis=1)
+        cells = forced != 0
+        block[cells] = VALUE_OF_BIT[forced[cells]]
+        values[active] = block
+        active = active[changed]
+    return values, dead
+
+
+def solve_array(boards, fallback="propagation"):
+    """Solve an (N, 81) array of boards.
+
+    Returns (solutions, solved): solved boards as a uint8 array (unsolvable
+    rows are left as propagated) and a boolean array of which were solved.
+    Boards left incomplete by propagation are finished by the scalar
+    fallback engine, one of the solve() methods.
+    """
+    engine = METHODS[fallback]
+    values, dead = propagate_array(boards)
+    solved = ~dead & (values != 0).all(axis=1)
+
+    for index in np.flatnonzero(~dead & ~solved):
+        grid = values[index].reshape(9, 9).tolist()
+        if engine(grid)[0]:
+            values[index] = np.array(grid, dtype=np.uint8).ravel()
+            solved[index] = True
+    return values, solved
+
+
+def solve_many(grids, fallback="propagation"):
+    """Solve a list of 9x9 grids. Returns the solved grids, None where unsolvable."""
+    if not grids:
+        return []
+    solutions, solved = solve_array(np.array(grids, dtype=np.uint8).reshape(-1, 81), fallback)
+    return [solution.reshape(9, 9).tolist() if ok else None for solution, ok in zip(solutions, solved)]
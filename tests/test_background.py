@@ -0,0 +1,45 @@
+# BackgroundSolve: results, errors and cancelling a solve or a count from
+# another thread
+import time
+
+from sudoku_solver import count_solutions, parse_line, solve
+from sudoku_solver.background import BackgroundSolve
+from sudoku_solver.benchmark import load_corpus
+
+EMPTY = [[0] * 9 for _ in range(9)]
+
+
+def wait(job, condition, seconds=10):
+    end = time.monotonic() + seconds
+    while not condition(job):
+        assert time.monotonic() < end, "the background solve did not get there in time"
+        time.sleep(0.001)
+
+
+def test_result():
+    grid = parse_line(load_corpus("hard")[0])
+    job = BackgroundSolve(solve, grid).start()
+    wait(job, BackgroundSolve.done)
+    assert job.result.solved
+    assert job.result.grid == solve(grid).grid
+    assert not job.cancelled
+    assert job.error is None
+    assert job.elapsed() == job.time_taken
+
+
+def test_error_is_kept():
+    job = BackgroundSolve(solve, [[0] * 9]).start()
+    wait(job, BackgroundSolve.done)
+    assert isinstance(job.error, ValueError)
+    assert job.result is None
+
+
+def test_cancel_stops_a_count():
+    # every filling of an empty grid is a solution, so this never ends alone
+    job = BackgroundSolve(count_solutions, EMPTY, 10 ** 9).start()
+    wait(job, lambda job: job.operations > 0)
+    job.cancel()
+    wait(job, BackgroundSolve.done)
+    assert job.cancelled
+    assert job.result is None
+    assert job.error is None
@@ -0,0 +1,76 @@
+# batch solving: results line up with the input, in order or tagged with
+# their index, bad lines are reported rather than solved, and puzzles over
+# their budget go to the fallback
+import pytest
+
+from sudoku_solver import MetricsTotals, format_line, parse_line, solve
+from sudoku_solver.batch import BUDGET_EXCEEDED, INVALID, UNSOLVABLE, count_lines, solve_batch, solve_lines
+from sudoku_solver.benchmark import load_corpus
+
+DUPLICATES = ["55" + "0" * 79, "5" + "0" * 8 + "5" + "0" * 71, "5" + "0" * 9 + "5" + "0" * 70]
+
+
+def expected(lines):
+    results = []
+    for line in lines:
+        try:
+            result = solve(parse_line(line))
+        except ValueError:
+            results.append(INVALID)
+            continue
+        results.append(format_line(result.grid) if result.solved else UNSOLVABLE)
+    return results
+
+
+def test_solve_lines_marks_bad_lines():
+    lines = load_corpus("easy")[:5] + ["not a puzzle", DUPLICATES[0]]
+    assert solve_lines(lines) == expected(lines)
+    assert solve_lines(lines)[-2:] == [INVALID, UNSOLVABLE]
+
+
+@pytest.mark.parametrize("method", ["backtracking", "mrv", "bitmask"])
+def test_repeated_clues_are_unsolvable(method):
+    assert solve_lines(DUPLICATES, method) == [UNSOLVABLE] * 3
+    assert solve_lines(DUPLICATES, method, max_nodes=100) == [UNSOLVABLE] * 3
+
+
+def test_ordered_output_matches_the_input():
+    lines = load_corpus("easy") + ["x"] + load_corpus("hard")
+    results = list(solve_batch(lines, workers=2, chunk_size=7))
+    assert [index for index, _ in results] == list(range(len(lines)))
+    assert [result for _, result in results] == expected(lines)
+
+
+def test_unordered_output_covers_every_puzzle():
+    lines = load_corpus("easy") + load_corpus("hard")
+    results = list(solve_batch(lines, workers=2, chunk_size=5, ordered=False))
+    assert sorted(index for index, _ in results) == list(range(len(lines)))
+    assert [result for _, result in sorted(results)] == expected(lines)
+
+
+def test_count_lines():
+    unique = load_corpus("hard")[0]
+    assert count_lines([unique, "0" * 81, DUPLICATES[0], "x"]) == ["unique", "multiple", "none", INVALID]
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        list(solve_batch(load_corpus("easy"), method="guessing"))
+
+
+def test_budget_without_fallback():
+    puzzles = load_corpus("hard")
+    totals = MetricsTotals()
+    results = solve_lines(puzzles, "bitmask", totals=totals, max_nodes=1000)
+    assert BUDGET_EXCEEDED in results
+    assert totals.solves == len(puzzles)
+    assert totals.solved == sum(result != BUDGET_EXCEEDED for result in results)
+
+
+def test_fallback_counts_each_puzzle_once():
+    puzzles = load_corpus("hard")
+    totals = MetricsTotals()
+    results = solve_lines(puzzles, "bitmask", totals=totals, max_nodes=1000, fallback="propagation")
+    assert totals.solves == len(puzzles)
+    assert totals.solved == len(puzzles)
+    assert results == expected(puzzles)
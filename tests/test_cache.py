@@ -0,0 +1,67 @@
+# the canonical form is the same for every symmetric copy of a puzzle
+import random
+
+import pytest
+
+from sudoku_solver.benchmark import load_corpus
+from sudoku_solver.cache import SolveCache, apply_transform, canonical_form, invert_transform
+from sudoku_solver.grid import parse_line
+
+
+def shuffled(grid, rng):
+    # grid under a random relabeling, row and column permutation within
+    # bands and stacks, band and stack permutation and transposition
+    def order():
+        bands = rng.sample(range(3), 3)
+        return [band * 3 + offset for band in bands for offset in rng.sample(range(3), 3)]
+
+    labels = [0] + rng.sample(range(1, 10), 9)
+    rows, cols = order(), order()
+    result = [[labels[grid[row][col]] for col in cols] for row in rows]
+    if rng.random() < 0.5:
+        result = [list(column) for column in zip(*result)]
+    return result
+
+
+@pytest.mark.parametrize("corpus", ["easy", "hard", "17clue"])
+def test_canonical_form_is_invariant(corpus):
+    rng = random.Random(corpus)
+    for line in load_corpus(corpus)[:10]:
+        grid = parse_line(line)
+        canonical = canonical_form(grid)
+        if canonical is None:
+            continue  # too many ties to be worth caching
+        for _ in range(5):
+            assert canonical_form(shuffled(grid, rng))[0] == canonical[0]
+
+
+def test_transform_round_trip():
+    grid = parse_line(load_corpus("hard")[0])
+    _, transform = canonical_form(grid)
+    assert invert_transform(apply_transform(grid, transform), transform) == grid
+
+
+def test_sparse_grids_are_not_searched():
+    assert canonical_form([[0] * 9 for _ in range(9)]) is None
+    cache = SolveCache()
+    result = cache.solve([[0] * 9 for _ in range(9)])
+    assert result.solved
+    assert cache.skipped == 1
+
+
+def test_other_sizes_are_rejected():
+    with pytest.raises(ValueError):
+        canonical_form(parse_line(load_corpus("16x16")[0]))
+
+
+def test_cache_answers_a_symmetric_copy():
+    rng = random.Random(1)
+    grid = next(grid for grid in map(parse_line, load_corpus("hard")) if canonical_form(grid) is not None)
+    cache = SolveCache()
+    first = cache.solve(grid)
+    copy = shuffled(grid, rng)
+    second = cache.solve(copy)
+    assert second.method == "cache"
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert all(copy[row][col] in (0, second.grid[row][col]) for row in range(9) for col in range(9))
+    assert first.solved and second.solved
@@ -0,0 +1,46 @@
+# generated puzzles are unique, graded as asked and reproducible by seed
+import random
+
+import pytest
+
+from sudoku_solver import count_solutions, has_duplicates, parse_line, solve
+from sudoku_solver.generator import DIFFICULTIES, generate, generate_many, random_solution, rate
+
+
+def test_random_solution_is_complete_and_valid():
+    grid = random_solution(random.Random(3))
+    assert all(value for row in grid for value in row)
+    assert not has_duplicates(grid)
+
+
+@pytest.mark.parametrize("difficulty", DIFFICULTIES)
+def test_generate_reaches_the_difficulty(difficulty):
+    grid, level, operations = generate(random.Random(difficulty), difficulty)
+    assert level == difficulty
+    assert count_solutions(grid).status == "unique"
+    assert rate(grid)[:2] == (True, difficulty)
+    assert (operations > 0) == (difficulty == "expert")
+
+
+def test_puzzles_are_minimal():
+    grid, _, _ = generate(random.Random(5))
+    for row in range(9):
+        for col in range(9):
+            if grid[row][col]:
+                value, grid[row][col] = grid[row][col], 0
+                assert count_solutions(grid).status == "multiple"
+                grid[row][col] = value
+
+
+def test_rate_tells_unique_from_multiple():
+    solution = solve(parse_line("0" * 81)).grid
+    assert rate(solution)[:2] == (True, "easy")
+    assert not rate([[0] * 9 for _ in range(9)])[0]
+
+
+def test_same_seed_same_puzzles_with_any_workers():
+    one = list(generate_many(6, "medium", seed=42, workers=1, chunk_size=2))
+    two = list(generate_many(6, "medium", seed=42, workers=2, chunk_size=4))
+    assert one == two
+    assert [level for _, level in one] == ["medium"] * 6
+    assert len({line for line, _ in one}) == 6
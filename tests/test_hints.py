@@ -0,0 +1,38 @@
+# every hint agrees with the unique solution of its puzzle
+import pytest
+
+from sudoku_solver import parse_line, solve
+from sudoku_solver.benchmark import load_corpus
+from sudoku_solver.hints import HintEngine, next_placement
+
+
+@pytest.mark.parametrize("corpus", ["easy", "hard", "17clue"])
+def test_hints_follow_the_solution(corpus):
+    for line in load_corpus(corpus)[:5]:
+        grid = parse_line(line)
+        solution = solve(grid).grid
+        engine = HintEngine(grid)
+        for _ in range(200):
+            hint = engine.next_hint()
+            if hint is None:
+                break
+            assert hint.technique != "contradiction"
+            assert hint.explanation
+            for row, col, digit in hint.placements:
+                assert solution[row][col] == digit
+            for row, col, digit in hint.eliminations:
+                assert solution[row][col] != digit
+            engine.apply(hint)
+
+
+def test_next_placement_ends_with_a_placement():
+    hints = next_placement(parse_line(load_corpus("hard")[1]))
+    assert hints and hints[-1].placements
+    assert all(not hint.placements for hint in hints[:-1])
+    # none of the techniques gets anywhere on this one
+    assert next_placement(parse_line(load_corpus("hard")[0])) == []
+
+
+def test_repeated_clues_are_rejected():
+    with pytest.raises(ValueError):
+        HintEngine(parse_line("55" + "0" * 79))
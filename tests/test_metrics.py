@@ -0,0 +1,64 @@
+# structured solve metrics: the same units for every engine, summed totals,
+# and memory measurement that leaves a caller's tracemalloc session alone
+import json
+import tracemalloc
+
+import pytest
+
+from sudoku_solver import METHODS, Metrics, MetricsTotals, parse_line, solve
+from sudoku_solver.benchmark import benchmark, load_corpus
+from sudoku_solver.metrics import measure_peak_memory
+
+EASY = load_corpus("easy")[:5]
+
+
+@pytest.mark.parametrize("method", ["backtracking", "bitmask", "iterative"])
+def test_row_major_engines_count_the_same_nodes(method):
+    # the three row-major generations make the same guesses in the same
+    # order, whatever else their operation counts include
+    grid = parse_line(EASY[0])
+    assert solve(grid, method).metrics.nodes == solve(grid, "iterative").metrics.nodes
+
+
+def test_metrics_of_a_solve():
+    result = solve(parse_line(load_corpus("hard")[0]))
+    metrics = result.metrics
+    assert metrics.method == "propagation"
+    assert metrics.solved
+    assert metrics.nodes > 0
+    assert metrics.backtracks <= metrics.nodes
+    assert set(metrics.propagations) == {"naked_singles", "hidden_singles", "locked_candidates"}
+    assert metrics.peak_memory is None
+    assert json.loads(metrics.to_json()) == metrics.as_dict()
+
+
+def test_totals_add_up():
+    totals = MetricsTotals()
+    results = [solve(parse_line(line)) for line in EASY]
+    for result in results:
+        totals.add(result.metrics)
+    assert totals.solves == totals.solved == len(EASY)
+    assert totals.nodes == sum(result.metrics.nodes for result in results)
+    merged = MetricsTotals().add(totals).add(Metrics(nodes=3))
+    assert (merged.solves, merged.solved, merged.nodes) == (len(EASY) + 1, len(EASY), totals.nodes + 3)
+
+
+def test_measure_memory_keeps_a_running_trace():
+    tracemalloc.start()
+    try:
+        result = solve(parse_line(EASY[0]), measure_memory=True)
+        assert result.metrics.peak_memory > 0
+        assert tracemalloc.is_tracing()
+        _, peak = measure_peak_memory(lambda: bytearray(100000))
+        assert peak >= 100000
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+def test_benchmark_reports_metrics_nodes():
+    for method in METHODS:
+        entry = benchmark(method, EASY, memory=False)
+        nodes = sum(solve(parse_line(line), method).metrics.nodes for line in EASY) / len(EASY)
+        assert entry["mean_nodes"] == nodes
+        assert entry["solved"] == len(EASY)
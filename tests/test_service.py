@@ -0,0 +1,105 @@
+# request validation of the solve service
+import asyncio
+import json
+import re
+
+import pytest
+
+from sudoku_solver.benchmark import load_corpus
+from sudoku_solver.service import MAX_BODY, SolveService, request, start_in_thread
+
+
+@pytest.mark.parametrize("body", [
+    b"not json",
+    b"[1, 2]",
+    b'{"puzzle": "0", "max_nodes": "many"}',
+    b'{"puzzle": "0", "max_nodes": 1e400}',
+    b'{"puzzle": "0", "max_nodes": 0}',
+    b'{"puzzle": "0", "timeout": NaN}',
+    b'{"puzzle": "0", "timeout": Infinity}',
+    b'{"puzzle": "0", "timeout": -1}',
+    b'{"puzzles": "0"}',
+    b'{"puzzle": "0", "method": "guessing"}',
+])
+def test_bad_requests_get_400(body):
+    status, payload = asyncio.run(SolveService(workers=1).dispatch("POST", "/solve", body))
+    assert status == 400
+    assert "error" in payload
+
+
+def test_unknown_endpoints_and_methods():
+    service = SolveService(workers=1)
+    assert asyncio.run(service.dispatch("POST", "/nothing", b"{}"))[0] == 404
+    assert asyncio.run(service.dispatch("GET", "/solve", b"{}"))[0] == 405
+
+
+def test_service_round_trip():
+    url, stop = start_in_thread(workers=1)
+    try:
+        line = load_corpus("hard")[0]
+        status, reply = request(url + "/solve", {"puzzle": line})
+        assert status == 200
+        assert reply["result"]["status"] == "solved"
+        assert len(reply["result"]["solution"]) == 81
+        status, reply = request(url + "/solve", {"puzzles": ["55" + "0" * 79], "method": "bitmask"})
+        assert (status, reply["results"][0]["status"]) == (200, "unsolvable")
+        status, reply = request(url + "/count", {"puzzles": [line, "55" + "0" * 79]})
+        assert status == 200
+        assert [result["status"] for result in reply["results"]] == ["unique", "none"]
+        # infinite budgets used to drop the connection without a reply
+        status, reply = request(url + "/solve", {"puzzle": line, "max_nodes": json.loads("1e400")})
+        assert status == 400
+    finally:
+        stop()
+
+
+class Writer:
+    # stands in for the StreamWriter of a connection, keeping what is sent
+    def __init__(self):
+        self.sent = b""
+        self.closed = False
+
+    def write(self, data):
+        self.sent += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def exchange(service, data):
+    # the status codes handle() replies with for the raw request bytes
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        writer = Writer()
+        await service.handle(reader, writer)
+        assert writer.closed
+        return re.findall(rb"HTTP/1\.1 (\d+)", writer.sent)
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("length, status", [
+    (b"-5", b"400"),
+    (b"many", b"400"),
+    (b"%d" % (MAX_BODY + 1), b"413"),
+])
+def test_bad_content_length_is_answered(length, status):
+    data = b"POST /solve HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n{}"
+    assert exchange(SolveService(workers=1), data) == [status]
+
+
+def test_dispatch_errors_get_500(monkeypatch):
+    service = SolveService(workers=1)
+
+    async def broken(method, path, body):
+        raise RuntimeError("the pool is gone")
+
+    monkeypatch.setattr(service, "dispatch", broken)
+    request_bytes = b"POST /solve HTTP/1.1\r\nContent-Length: 2\r\n\r\n{}"
+    # the connection stays usable after the error
+    assert exchange(service, request_bytes * 2) == [b"500", b"500"]
@@ -0,0 +1,34 @@
+# incremental clue checks agree with a full count after every edit
+import random
+
+from sudoku_solver import count_solutions, parse_line, solve
+from sudoku_solver.benchmark import load_corpus
+from sudoku_solver.session import CONFLICT, Session
+
+
+def test_random_edits_match_count_solutions():
+    rng = random.Random(7)
+    puzzle = parse_line(load_corpus("easy")[0])
+    solution = solve(puzzle).grid
+    session = Session()
+    for _ in range(300):
+        row, col = rng.randrange(9), rng.randrange(9)
+        choice = rng.random()
+        value = 0 if choice < 0.3 else solution[row][col] if choice < 0.9 else rng.randint(1, 9)
+        session.set(row, col, value)
+        grid = session.grid()
+        status = session.check()
+        if status == CONFLICT:
+            assert not session.consistent
+            continue
+        assert status == count_solutions(grid).status
+
+
+def test_conflict_is_found_and_cleared():
+    session = Session()
+    session.set(0, 0, 5)
+    assert not session.set(0, 8, 5)
+    assert session.check() == CONFLICT
+    assert session.conflict() == 0  # row 1
+    assert session.clear(0, 8)
+    assert session.check() == "multiple"
@@ -0,0 +1,65 @@
+# solve() and count_solutions(): malformed grids raise, clues that repeat a
+# digit give up at once whatever the method, and every method agrees
+import pytest
+
+from sudoku_solver import METHODS, count_solutions, parse_line, solve
+from sudoku_solver.benchmark import load_corpus
+
+REPEATED_IN_ROW = "55" + "0" * 79
+REPEATED_IN_COLUMN = "5" + "0" * 8 + "5" + "0" * 71
+REPEATED_IN_SUBGRID = "5" + "0" * 9 + "5" + "0" * 70
+DUPLICATES = [REPEATED_IN_ROW, REPEATED_IN_COLUMN, REPEATED_IN_SUBGRID]
+
+
+@pytest.mark.parametrize("method", sorted(METHODS))
+@pytest.mark.parametrize("line", DUPLICATES)
+def test_solve_rejects_repeated_clues(method, line):
+    result = solve(parse_line(line), method, max_nodes=1000)
+    assert not result.solved
+    assert result.grid is None
+    assert not result.budget_exceeded
+    assert result.operations == 0
+
+
+@pytest.mark.parametrize("line", DUPLICATES)
+def test_count_solutions_rejects_repeated_clues(line):
+    result = count_solutions(parse_line(line))
+    assert result.status == "none"
+    assert result.count == 0
+
+
+@pytest.mark.parametrize("method", sorted(METHODS))
+def test_solve_rejects_values_out_of_range(method):
+    grid = parse_line(load_corpus("easy")[0])
+    grid[0][grid[0].index(0)] = 10
+    with pytest.raises(ValueError):
+        solve(grid, method)
+    grid[0][grid[0].index(10)] = -1
+    with pytest.raises(ValueError):
+        solve(grid, method)
+
+
+@pytest.mark.parametrize("method", sorted(METHODS))
+def test_solve_rejects_ragged_rows(method):
+    grid = parse_line(load_corpus("easy")[0])
+    grid[4].pop()
+    with pytest.raises(ValueError):
+        solve(grid, method)
+    with pytest.raises(ValueError):
+        solve(grid[:8], method)
+
+
+def test_count_solutions_rejects_malformed_grids():
+    grid = parse_line(load_corpus("easy")[0])
+    grid[8].append(0)
+    with pytest.raises(ValueError):
+        count_solutions(grid)
+    with pytest.raises(ValueError):
+        count_solutions([[0] * 9 for _ in range(8)] + [[0] * 8 + [10]])
+
+
+@pytest.mark.parametrize("method", sorted(METHODS))
+def test_every_method_solves_the_same_puzzle(method):
+    grid = parse_line(load_corpus("easy")[0])
+    expected = solve(grid).grid
+    assert solve(grid, method).grid == expected
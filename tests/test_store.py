@@ -0,0 +1,104 @@
+# packed puzzle stores: lines and results survive a pack and unpack
+import io
+import pickle
+
+import pytest
+
+from sudoku_solver.batch import BUDGET_EXCEEDED, INVALID, UNSOLVABLE
+from sudoku_solver.benchmark import load_corpus
+from sudoku_solver.grid import format_line, parse_line
+from sudoku_solver.store import (
+    GRID,
+    RECORD_SIZE,
+    STATUS_OF_RESULT,
+    PuzzleStore,
+    StoreSlice,
+    StoreWriter,
+    pack_grid,
+    pack_line,
+    pack_lines,
+    unpack_grid,
+    unpack_lines,
+)
+
+
+def test_record_round_trip():
+    line = load_corpus("hard")[0]
+    grid = parse_line(line)
+    record = pack_line(line)
+    assert len(record) == RECORD_SIZE
+    assert record == pack_grid(grid)
+    assert unpack_grid(record) == grid
+
+
+def test_pack_rejects_other_sizes():
+    with pytest.raises(ValueError):
+        pack_line(load_corpus("16x16")[0])
+
+
+def test_store_round_trip(tmp_path):
+    lines = load_corpus("easy") + load_corpus("hard")
+    path = tmp_path / "puzzles.sdk"
+    assert pack_lines(["# comment", ""] + lines + ["not a puzzle"], path) == len(lines) + 1
+    with PuzzleStore(path) as store:
+        assert len(store) == len(lines) + 1
+        assert [format_line(grid) for grid in store.grids(0, len(lines))] == \
+            [format_line(parse_line(line)) for line in lines]
+        assert store[3] == parse_line(lines[3])
+        assert store.result(len(lines)) == INVALID
+        assert list(store.grids(len(lines)))[0] is None
+    output = io.StringIO()
+    assert unpack_lines(path, output) == len(lines) + 1
+    assert output.getvalue().splitlines() == [line.replace(".", "0") for line in lines] + [INVALID]
+
+
+def test_results_keep_their_status(tmp_path):
+    solution = "".join(str(value) for row in [[(row * 3 + row // 3 + col) % 9 + 1 for col in range(9)]
+                                                for row in range(9)] for value in row)
+    results = [solution, UNSOLVABLE, INVALID, BUDGET_EXCEEDED]
+    path = tmp_path / "solutions.sdk"
+    with StoreWriter(path) as writer:
+        for result in results:
+            writer.write_result(result)
+    with PuzzleStore(path) as store:
+        assert list(store.results()) == results
+
+
+def test_writer_accepts_an_unseekable_stream(tmp_path):
+    class Stream(io.BytesIO):
+        def seekable(self):
+            return False
+
+    stream = Stream()
+    lines = load_corpus("hard")
+    assert pack_lines(lines, stream) == len(lines)
+    assert not stream.closed
+    path = tmp_path / "piped.sdk"
+    path.write_bytes(stream.getvalue())
+    with PuzzleStore(path) as store:
+        assert len(store) == len(lines)
+        assert store[0] == parse_line(lines[0])
+
+
+def test_unpack_records_matches_the_scalar_reader(tmp_path):
+    pytest.importorskip("numpy")
+    from sudoku_solver.vectorized import unpack_records
+
+    lines = load_corpus("hard") + ["not a puzzle"]
+    path = tmp_path / "puzzles.sdk"
+    pack_lines(lines, path)
+    with PuzzleStore(path) as store:
+        records = store.records()
+        try:
+            boards, statuses = unpack_records(records)
+        finally:
+            records.release()
+        assert boards.shape == (len(lines), 81)
+        assert boards[:-1].tolist() == [[value for row in grid for value in row] for grid in store.grids(0, len(lines) - 1)]
+        assert statuses.tolist() == [GRID] * (len(lines) - 1) + [STATUS_OF_RESULT[INVALID]]
+
+    # a slice travels to a worker as its path and range, and maps the store there
+    part = pickle.loads(pickle.dumps(StoreSlice(path, 2, 5)))
+    assert len(part) == 3
+    assert part.grids() == [parse_line(line) for line in lines[2:5]]
+    assert part.boards()[0].tolist() == boards[2:5].tolist()
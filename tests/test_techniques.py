@@ -0,0 +1,34 @@
+# the optional elimination techniques: each alone, and all together, solve
+# correctly and report only the techniques that were enabled
+import pytest
+
+from sudoku_solver import copy_grid, parse_line, solve
+from sudoku_solver.benchmark import load_corpus
+from sudoku_solver.metrics import Metrics
+from sudoku_solver.propagation import RULES
+from sudoku_solver.techniques import TECHNIQUES, solve_with_techniques
+
+
+@pytest.mark.parametrize("techniques", [()] + [(name,) for name in TECHNIQUES] + [TECHNIQUES])
+def test_techniques_solve_correctly(techniques):
+    for line in load_corpus("hard") + load_corpus("adversarial"):
+        grid = parse_line(line)
+        work = copy_grid(grid)
+        metrics = Metrics(method="techniques")
+        solved, _, _, eliminations = solve_with_techniques(work, None, metrics, techniques)
+        assert solved
+        assert work == solve(grid).grid
+        assert set(eliminations) == set(RULES) | set(techniques)
+        assert set(metrics.rule_seconds) == set(techniques)
+
+
+def test_unknown_technique():
+    with pytest.raises(ValueError):
+        solve_with_techniques(parse_line(load_corpus("hard")[0]), techniques=("guessing",))
+
+
+def test_techniques_method_on_16x16():
+    grid = parse_line(load_corpus("16x16")[0])
+    result = solve(grid, "techniques")
+    assert result.solved
+    assert result.grid == solve(grid).grid
@@ -0,0 +1,61 @@
+# solve traces: a recorded trace replays to the solution, readers can be
+# closed in the middle of an iteration, and recording can be cancelled
+import pytest
+
+from sudoku_solver import parse_line, solve
+from sudoku_solver.benchmark import load_corpus
+from sudoku_solver.progress import SolveCancelled
+from sudoku_solver.trace import BACKTRACK, PLACE, TRACE_METHODS, TraceReader, record_trace, summarize
+
+
+def replay(reader):
+    # the board after applying every placement and backtrack of a trace
+    side = reader.side
+    values = [value for row in reader.grid for value in row]
+    for kind, digit, cell, _ in reader:
+        if kind == PLACE:
+            values[cell] = digit
+        elif kind == BACKTRACK:
+            values[cell] = 0
+    return [values[row * side:row * side + side] for row in range(side)]
+
+
+@pytest.mark.parametrize("method", TRACE_METHODS)
+def test_replay_reaches_the_solution(tmp_path, method):
+    grid = parse_line(load_corpus("hard")[3])
+    path = tmp_path / "solve.trace"
+    solved, events = record_trace(grid, path, method)
+    assert solved
+    with TraceReader(path) as reader:
+        assert reader.grid == grid
+        assert len(reader) == events
+        assert list(reader) == [reader[index] for index in range(len(reader))]
+        assert reader[-1] == reader[len(reader) - 1]
+        assert sum(summarize(reader).values()) == events
+        assert replay(reader) == solve(grid).grid
+
+
+def test_close_after_leaving_an_iteration(tmp_path):
+    path = tmp_path / "solve.trace"
+    record_trace(parse_line(load_corpus("hard")[3]), path)
+    reader = TraceReader(path)
+    records = iter(reader)
+    first = next(records)
+    assert first == reader[0]
+    reader.close()  # used to raise BufferError while the iteration held a view of the map
+    records.close()
+    with TraceReader(path) as reader:
+        assert next(iter(reader)) == first
+
+
+def test_cancelled_recording_keeps_its_records(tmp_path):
+    path = tmp_path / "solve.trace"
+
+    def cancel(operations, depth):
+        raise SolveCancelled
+
+    with pytest.raises(SolveCancelled):
+        record_trace(parse_line(load_corpus("hard")[3]), path, progress=cancel)
+    with TraceReader(path) as reader:
+        assert len(reader) > 0
+        assert len(list(reader)) == len(reader)
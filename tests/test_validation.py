@@ -0,0 +1,103 @@
+# validation: the first offending unit of a grid or claimed solution, line
+# by line and with the numpy blocks, which must agree
+import pytest
+
+from sudoku_solver import format_line, parse_line, solve
+from sudoku_solver import validation
+from sudoku_solver.__main__ import main
+from sudoku_solver.benchmark import load_corpus
+from sudoku_solver.validation import INVALID, VALID, find_conflict, unit_name, validate_lines
+
+PUZZLES = load_corpus("easy") + load_corpus("hard")
+SOLUTION = format_line(solve(parse_line(PUZZLES[0])).grid)
+
+
+def with_cell(line, cell, value):
+    return line[:cell] + value + line[cell + 1:]
+
+
+def bad_lines():
+    # one line for each kind of result
+    swapped = SOLUTION[1] + SOLUTION[0] + SOLUTION[2:]  # breaks columns 1 and 2 only
+    return [
+        PUZZLES[0],
+        SOLUTION,
+        "55" + "0" * 79,  # row 1
+        "5" + "0" * 8 + "5" + "0" * 71,  # column 1
+        "5" + "0" * 9 + "5" + "0" * 70,  # subgrid 1
+        swapped,
+        with_cell(SOLUTION, 40, "0"),
+        "123",
+        "x" * 81,
+    ]
+
+
+def test_find_conflict():
+    for line in PUZZLES:
+        assert find_conflict(parse_line(line)) is None
+    assert find_conflict(parse_line(SOLUTION), complete=True) is None
+    assert find_conflict(parse_line(PUZZLES[0]), complete=True) is not None
+    assert find_conflict(parse_line("55" + "0" * 79)) == 0
+    assert find_conflict(parse_line("5" + "0" * 8 + "5" + "0" * 71)) == 9
+    assert find_conflict(parse_line("5" + "0" * 9 + "5" + "0" * 70)) == 18
+
+
+def test_out_of_range_values_flag_their_row():
+    grid = parse_line(PUZZLES[0])
+    grid[4][4] = 10
+    assert find_conflict(grid) == 4
+    grid[4][4] = -1
+    assert find_conflict(grid) == 4
+
+
+def test_larger_boards():
+    grid = [[0] * 16 for _ in range(16)]
+    assert find_conflict(grid) is None
+    grid[0][0] = grid[15][0] = 16
+    assert unit_name(find_conflict(grid), 16) == "column 1"
+
+
+def test_validate_lines():
+    results = list(validate_lines(bad_lines()))
+    assert results == [VALID, VALID, "row 1", "column 1", "subgrid 1", "column 1", VALID, INVALID, INVALID]
+    complete = list(validate_lines(bad_lines(), complete=True))
+    assert complete[1] == VALID
+    assert complete[0] != VALID
+    assert complete[6] == "row 5"
+
+
+def test_blocks_keep_the_order(monkeypatch):
+    monkeypatch.setattr(validation, "BLOCK_SIZE", 4)
+    lines = bad_lines() * 3
+    monkeypatch.undo()
+    expected = list(validate_lines(lines))
+    monkeypatch.setattr(validation, "BLOCK_SIZE", 4)
+    assert list(validate_lines(lines)) == expected
+
+
+@pytest.mark.parametrize("complete", [False, True])
+def test_vectorized_matches_line_by_line(complete):
+    pytest.importorskip("numpy")
+    lines = bad_lines() + PUZZLES
+    assert list(validate_lines(lines, complete, vectorized=True)) == list(validate_lines(lines, complete))
+
+
+def test_validate_array_flags_out_of_range_rows():
+    np = pytest.importorskip("numpy")
+    from sudoku_solver.vectorized import parse_lines, validate_array
+
+    boards = parse_lines([PUZZLES[0], SOLUTION])
+    boards[0, 40] = 10
+    assert validate_array(boards).tolist() == [4, -1]
+    assert validate_array(boards.astype(np.int64)).tolist() == [4, -1]
+    assert validate_array(boards, complete=True).tolist() == [0, -1]  # the puzzle's first row has blanks
+
+
+def test_command_exit_status(tmp_path, capsys):
+    good = tmp_path / "good.txt"
+    good.write_text(SOLUTION + "\n")
+    assert main(["validate", str(good), "--solutions"]) == 0
+    bad = tmp_path / "bad.txt"
+    bad.write_text("\n".join(bad_lines()) + "\n")
+    assert main(["validate", str(bad)]) == 1
+    assert capsys.readouterr().out.splitlines()[1:] == list(validate_lines(bad_lines()))
@@ -0,0 +1,117 @@
+# variants: the extra units and cages hold in every solution, impossible
+# cages come back unsolved, and variants go through solve() like plain grids
+import pytest
+
+from sudoku_solver import parse_line, solve
+from sudoku_solver.benchmark import load_corpus
+from sudoku_solver.variants import diagonal_units, solve_variant, windoku_units
+
+EMPTY = [[0] * 9 for _ in range(9)]
+
+
+def all_different(grid, units):
+    flat = [value for row in grid for value in row]
+    return all(len({flat[cell] for cell in unit}) == len(unit) for unit in units)
+
+
+def is_sudoku(grid):
+    rows = [[r * 9 + c for c in range(9)] for r in range(9)]
+    columns = [[r * 9 + c for r in range(9)] for c in range(9)]
+    boxes = [[(b // 3 * 3 + i // 3) * 9 + b % 3 * 3 + i % 3 for i in range(9)] for b in range(9)]
+    return all_different(grid, rows + columns + boxes)
+
+
+def domino_cages(solution):
+    # horizontal pairs of cells with the totals of a known solution, and the
+    # last cell of each row alone
+    cages = []
+    for row in range(9):
+        for col in range(0, 9, 2):
+            cells = [row * 9 + col + offset for offset in range(2) if col + offset < 9]
+            cages.append((cells, sum(solution[cell // 9][cell % 9] for cell in cells)))
+    return cages
+
+
+def test_diagonal():
+    result = solve(EMPTY, diagonal=True)
+    assert result.solved
+    assert is_sudoku(result.grid)
+    assert all_different(result.grid, diagonal_units())
+
+
+def test_windoku():
+    result = solve(EMPTY, windoku=True)
+    assert result.solved
+    assert is_sudoku(result.grid)
+    assert all_different(result.grid, windoku_units())
+
+
+def test_killer_keeps_cage_totals():
+    solution = solve(parse_line(load_corpus("easy")[0])).grid
+    cages = domino_cages(solution)
+    result = solve(EMPTY, cages=cages)
+    assert result.solved
+    assert is_sudoku(result.grid)
+    for cells, total in cages:
+        assert sum(result.grid[cell // 9][cell % 9] for cell in cells) == total
+        assert len({result.grid[cell // 9][cell % 9] for cell in cells}) == len(cells)
+    assert "cage_combinations" in result.eliminations
+
+
+@pytest.mark.parametrize("cages", [
+    [((0, 1), 2)],  # two distinct digits never add up to 2
+    [((0, 1, 2), 30)],
+])
+def test_impossible_cage(cages):
+    result = solve(EMPTY, cages=cages)
+    assert not result.solved
+    assert result.grid is None
+
+
+def test_cage_that_contradicts_a_clue():
+    grid = [row[:] for row in EMPTY]
+    grid[0][0] = 9
+    result = solve(grid, cages=[((0, 1), 10)])
+    assert result.solved
+    assert result.grid[0][1] == 1
+    assert not solve(grid, cages=[((0, 1), 5)]).solved
+
+
+def test_variants_fill_metrics_and_honour_budgets():
+    result = solve(EMPTY, diagonal=True, windoku=True)
+    assert result.solved
+    assert result.metrics.solved
+    assert result.metrics.nodes == result.operations
+    assert result.metrics.propagations == result.eliminations
+    assert all_different(result.grid, diagonal_units() + windoku_units())
+
+    # a cage of one clue changes nothing, so the puzzle keeps its search
+    grid = parse_line(load_corpus("hard")[3])
+    col = grid[0].index(next(value for value in grid[0] if value))
+    cages = [((col,), grid[0][col])]
+    assert solve(grid, cages=cages).operations == solve(grid).operations > 64
+    reports = []
+    stopped = solve(grid, cages=cages, max_nodes=10, progress=lambda *report: reports.append(report))
+    assert stopped.budget_exceeded
+    assert not stopped.solved
+    assert stopped.metrics.nodes == stopped.operations > 0
+    assert reports
+
+
+def test_solve_variant_matches_solve():
+    cages = [((0, 1, 9), 6)]
+    expected = solve(EMPTY, diagonal=True, cages=cages)
+    result = solve_variant(EMPTY, diagonal=True, cages=cages)
+    assert result.solved
+    assert result.grid == expected.grid
+    assert result.metrics.nodes == expected.metrics.nodes
+    assert EMPTY == [[0] * 9 for _ in range(9)]  # the grid passed in is left alone
+
+
+def test_variants_reject_other_methods_and_bad_cages():
+    with pytest.raises(ValueError):
+        solve(EMPTY, "dlx", diagonal=True)
+    with pytest.raises(ValueError):
+        solve(EMPTY, cages=[((0, 81), 10)])
+    with pytest.raises(ValueError):
+        solve(EMPTY, cages=[((0, 0), 10)])
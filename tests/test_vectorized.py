@@ -0,0 +1,51 @@
+# the numpy engine agrees with the scalar solver, board for board
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from sudoku_solver import format_line, parse_line, solve  # noqa: E402
+from sudoku_solver.batch import UNSOLVABLE, solve_lines  # noqa: E402
+from sudoku_solver.benchmark import load_corpus  # noqa: E402
+from sudoku_solver.vectorized import parse_lines, propagate_array, solve_array, solve_many  # noqa: E402
+
+LINES = load_corpus("easy") + load_corpus("hard") + load_corpus("17clue")
+
+
+def test_parse_lines_matches_parse_line():
+    boards = parse_lines(LINES)
+    assert boards.shape == (len(LINES), 81)
+    assert boards.tolist() == [sum(parse_line(line), []) for line in LINES]
+
+
+def test_parse_lines_rejects_bad_lines():
+    with pytest.raises(ValueError):
+        parse_lines(["1" * 80])
+    with pytest.raises(ValueError):
+        parse_lines(["x" * 81])
+
+
+def test_solve_many_matches_the_scalar_solver():
+    grids = [parse_line(line) for line in LINES]
+    assert solve_many(grids) == [solve(grid).grid for grid in grids]
+
+
+def test_propagation_keeps_the_clues_and_flags_contradictions():
+    boards = parse_lines(LINES[:10] + ["55" + "0" * 79])
+    values, dead = propagate_array(boards)
+    clues = boards != 0
+    assert (values[clues] == boards[clues]).all()
+    assert dead.tolist() == [False] * 10 + [True]
+
+
+def test_solve_array_reports_unsolvable_boards():
+    boards = parse_lines([LINES[0], "55" + "0" * 79, LINES[1]])
+    solutions, solved = solve_array(boards)
+    assert solved.tolist() == [True, False, True]
+    assert format_line(solutions[0].reshape(9, 9).tolist()) == format_line(solve(parse_line(LINES[0])).grid)
+
+
+def test_batch_vectorized_matches_plain_batch():
+    lines = LINES + ["55" + "0" * 79, "not a puzzle", load_corpus("16x16")[0]]
+    results = solve_lines(lines, "propagation", vectorized=True)
+    assert results == solve_lines(lines, "propagation")
+    assert results[-3] == UNSOLVABLE